@@ -1,10 +1,21 @@
 import os
 
+# The "> " prompt is shown right away: the rest of this file (imports, graph connection, chain) is loaded in
+# background while the first question is typed (see bootstrap.py)
+if __name__ == "__main__":
+    from bootstrap import run_chat
+    run_chat(__file__, chain="cypher_chain", input_key="query", output_key="result", answer_prefix=None)
+
 from dotenv import load_dotenv
-from langchain.chains.graph_qa.cypher import GraphCypherQAChain
 from langchain.prompts import PromptTemplate
-from langchain_community.graphs import Neo4jGraph
 from langchain_openai import ChatOpenAI
+from neo4j import READ_ACCESS
+
+from cypher_cache import CypherCache
+from cypher_chain import CypherQAChain
+from cypher_guardrails import ResultGuard
+from cypher_validation import CypherValidator
+from schema_cache import load_graph
 
 load_dotenv()
 
@@ -12,11 +23,9 @@ llm = ChatOpenAI(
     openai_api_key=os.getenv("OPENAI_KEY")
 )
 
-graph = Neo4jGraph(
-    url=os.getenv("NEO_4J_URL"),
-    username=os.getenv("NEO_4J_USER"),
-    password=os.getenv("NEO_4J_PW")
-)
+# The schema is read from a snapshot on disk while the graph doesn't change (see schema_cache.py)
+# The chain only reads: its queries can go to the read replicas of a cluster (see neo4j_pool.py)
+graph = load_graph(access_mode=READ_ACCESS)
 
 # The previous lesson we saw the LLM could provide inexact or not valid queries
 # Add an instruction to the prompt to tell the LLM to only use relationships and properties already present in the schema
@@ -49,10 +58,19 @@ cypher_generation_prompt = PromptTemplate(
     input_variables=["schema", "question"],
 )
 
-cypher_chain = GraphCypherQAChain.from_llm(
+cypher_chain = CypherQAChain.from_llm(
     llm,
     graph=graph,
     cypher_prompt=cypher_generation_prompt,
+    # Questions already answered reuse their query instead of generating a new one (see cypher_cache.py)
+    cypher_cache=CypherCache(".cypher_cache.sqlite3"),
+    # Only the labels and relationships relevant to the question go in the prompt
+    use_compact_schema=True,
+    # Generated queries are checked against the schema and with EXPLAIN before running them,
+    # and the LLM gets one chance to fix an invalid one (see cypher_validation.py)
+    cypher_validator=CypherValidator(graph, llm=llm, max_repairs=1),
+    # Big results are capped while streaming them from the database, and summarized for the answer
+    result_guard=ResultGuard(max_rows=50, context_rows=10),
     verbose=True
 )
 
@@ -62,7 +80,3 @@ cypher_chain = GraphCypherQAChain.from_llm(
 #
 # Also, when asked for a question not regarding the graph ("Hello, how are you?")
 # He enters the chain with an invalid query "I'm here to help with Neo4j queries. What is your question related to movies?" and it breaks
-while True:
-    q = input("> ")
-    response = cypher_chain.invoke({"query": q})
-    print(response["result"])
@@ -1,10 +1,24 @@
 import os
 
+# The "> " prompt is shown right away: the rest of this file (imports, graph connection, chain) is loaded in
+# background while the first question is typed (see bootstrap.py)
+if __name__ == "__main__":
+    from bootstrap import run_chat
+    run_chat(__file__, chain="cypher_chain", input_key="query", output_key="result", answer_prefix=None)
+
 from dotenv import load_dotenv
-from langchain.chains.graph_qa.cypher import GraphCypherQAChain
 from langchain.prompts import PromptTemplate
-from langchain_community.graphs import Neo4jGraph
-from langchain_openai import ChatOpenAI
+from langchain_openai import ChatOpenAI, OpenAIEmbeddings
+from neo4j import READ_ACCESS
+
+from cypher_cache import CypherCache
+from embedding_cache import CachedEmbeddings
+from cypher_chain import CypherQAChain
+from cypher_examples import CypherExampleStore
+from cypher_guardrails import ResultGuard
+from cypher_validation import CypherValidator
+from intent_router import EntityIndex, IntentRouter
+from schema_cache import load_graph
 
 load_dotenv()
 
@@ -12,14 +26,24 @@ llm = ChatOpenAI(
     openai_api_key=os.getenv("OPENAI_KEY")
 )
 
-graph = Neo4jGraph(
-    url=os.getenv("NEO_4J_URL"),
-    username=os.getenv("NEO_4J_USER"),
-    password=os.getenv("NEO_4J_PW")
-)
+# The schema is read from a snapshot on disk while the graph doesn't change (see schema_cache.py)
+# The chain only reads: its queries can go to the read replicas of a cluster (see neo4j_pool.py)
+graph = load_graph(access_mode=READ_ACCESS)
 
 # Few shots means providing examples to the LLM
 # Like before, but also add examples of queries
+#
+# The examples are not hardcoded in the template anymore: they come from a store of question -> Cypher pairs,
+# and only the 3 most similar to the question are put in the prompt (see cypher_examples.py).
+# So the examples can grow (also with the queries that worked) without making every prompt bigger
+example_store = CypherExampleStore(
+    CachedEmbeddings(
+        OpenAIEmbeddings(openai_api_key=os.getenv("OPENAI_KEY")),
+        cache_dir=".embedding_cache"
+    ),
+    path=".cypher_examples.jsonl"
+)
+
 CYPHER_GENERATION_TEMPLATE = """
 You are an expert Neo4j Developer translating user questions into Cypher to answer questions about movies and provide recommendations.
 Convert the user's question based on the schema.
@@ -36,9 +60,7 @@ Do not include any text except the generated Cypher statement.
 
 
 Examples:
-Find movies and genres:
-MATCH (m:Movie)-[:IN_GENRE]->(g)
-RETURN m.title, g.name
+{examples}
 
 Schema: {schema}
 Question: {question}
@@ -46,19 +68,31 @@ Question: {question}
 
 cypher_generation_prompt = PromptTemplate(
     template=CYPHER_GENERATION_TEMPLATE,
-    input_variables=["schema", "question"],
+    input_variables=["schema", "question", "examples"],
 )
 
-cypher_chain = GraphCypherQAChain.from_llm(
+cypher_chain = CypherQAChain.from_llm(
     llm,
     graph=graph,
     cypher_prompt=cypher_generation_prompt,
+    # Questions like "What movies did Tom Hanks act in?" run a templated query directly, without the LLM
+    # (the actor names and movie titles are loaded once from the graph, see intent_router.py)
+    intent_router=IntentRouter(EntityIndex.load(graph)),
+    # Questions already answered reuse their query instead of generating a new one (see cypher_cache.py)
+    cypher_cache=CypherCache(".cypher_cache.sqlite3"),
+    # Only the labels and relationships relevant to the question go in the prompt
+    use_compact_schema=True,
+    # Generated queries are checked against the schema and with EXPLAIN before running them,
+    # and the LLM gets one chance to fix an invalid one (see cypher_validation.py)
+    cypher_validator=CypherValidator(graph, llm=llm, max_repairs=1),
+    # Big results are capped while streaming them from the database, and summarized for the answer
+    result_guard=ResultGuard(max_rows=50, context_rows=10),
+    # The 3 examples most similar to the question fill {examples}, and the queries that worked become new examples
+    example_store=example_store,
+    example_k=3,
+    learn_examples=True,
     verbose=True
 )
 
 # This should help when asking "What movies has Tom Hanks directed and what are the genres?"
 # In any case, the LLM seems to forget some (or maybe a lot of) instructions
-while True:
-    q = input("> ")
-    response = cypher_chain.invoke({"query": q})
-    print(response["result"])
@@ -1,15 +1,33 @@
 import os
+import re
+
+# The "> " prompt is shown right away: the rest of this file (imports, clients, agent) is loaded in background
+# while the first question is typed (see bootstrap.py). chat_server.py imports this file to serve the same agent
+if __name__ == "__main__":
+    from bootstrap import run_chat
+
+    def show_prompt(script):
+        print("Agent prompt is: ")
+        script.agent_prompt.pretty_print()
+
+    run_chat(__file__, on_load=show_prompt)
 
 from dotenv import load_dotenv
-from langchain import hub
-from langchain.agents import AgentExecutor, create_react_agent, create_tool_calling_agent
-from langchain.chains.conversation.memory import ConversationBufferMemory
+from langchain.agents import create_tool_calling_agent
 from langchain.chains.llm import LLMChain
 from langchain.prompts import PromptTemplate
 from langchain.tools import Tool
 from langchain_community.tools import YouTubeSearchTool
-from langchain_openai import ChatOpenAI
-import requests
+from langchain_openai import ChatOpenAI, OpenAIEmbeddings
+
+from chat_history_store import open_chat_history
+from embedding_cache import CachedEmbeddings
+from parallel_agent import ParallelAgentExecutor, create_parallel_react_agent
+from prompt_registry import load_prompt
+from semantic_memory import SemanticHistoryMemory
+from swapi_client import hydrate
+from swapi_tools import make_resource_tools
+from tool_budget import ObservationBudget
 
 # This is a challenge to create a chatbot about anything I want
 # I choose to create a LLM to which I can chat about Star Wars
@@ -40,7 +58,23 @@ prompt = PromptTemplate(
 )
 
 # Conversational memory
-memory = ConversationBufferMemory(
+# Only the last ~1000 tokens of the conversation go in the prompts verbatim,
+# the older messages are summarized in background (see summary_memory.py)
+# They are also indexed by embedding: the 3 earlier exchanges most related to the question
+# are recalled in the prompt too (see semantic_memory.py)
+memory = SemanticHistoryMemory(
+    llm=llm,
+    max_token_limit=1000,
+    embeddings=CachedEmbeddings(
+        OpenAIEmbeddings(
+            openai_api_key=os.getenv("OPENAI_KEY")
+        ),
+        cache_dir=".embedding_cache"
+    ),
+    k=3,
+    # The messages are saved on disk (or on Neo4j), so the conversation survives a restart.
+    # Only the last 50 messages are loaded back (see chat_history_store.py)
+    chat_memory=open_chat_history(os.getenv("CHAT_SESSION_ID", "star-wars"), last_n=50),
     memory_key="chat_history",
     return_messages=True
 )
@@ -53,48 +87,14 @@ chat_chain = LLMChain(
 )
 
 
-def filmTool(query):
-    values = query.split(",")
-    movieUrl = values[0]
-    movieTitle = values[1]
-
-    req = ""
-    if movieUrl:
-        req = requests.get(movieUrl)
-    elif movieTitle:
-        req = requests.get(
-            url="https://swapi.dev/api/films/",
-            params={"search": movieTitle}
-        )
-    else:
-        raise "Malformed query"
-
-    if not req.status_code == 200:
-        raise "Request error"
-    response = req.text
-    return response
-
-
-def characterTool(query):
-    values = query.split(",")
-    characterUrl = values[0]
-    characterName = values[1]
-
-    req = ""
-    if characterUrl:
-        req = requests.get(characterUrl)
-    elif characterName:
-        req = requests.get(
-            url="https://swapi.dev/api/people/",
-            params={"search": characterName}
-        )
-    else:
-        raise "Malformed query"
-
-    if not req.status_code == 200:
-        raise "Request error"
-    response = req.text
-    return response
+def batchResourceTool(query):
+    # A film has lists of urls (characters, planets, ...). Resolving them one by one with the search tools
+    # costs one LLM round-trip per url, here they are all fetched concurrently in a single tool call
+    urls = [url for url in re.split(r"[\s,]+", query) if url.startswith("http")]
+    if not urls:
+        raise ValueError("Malformed query")
+
+    return hydrate(urls)
 
 
 # Create the search tools
@@ -105,114 +105,57 @@ tools = [
     #     func=chat_chain.run,
     #     return_direct=True
     # ),
+    # One search tool for each resource type: films, people, planets, species, starships and vehicles
+    # They are all generated from the same factory, see swapi_tools.py
+    *make_resource_tools(),
     Tool.from_function(
-        name="Film Search",
+        name="Resource Batch Lookup",
         description="""
-        Use when need to find movie details given their title or url.
+        Use when need to get the details of several resources given their urls,
+        for example all the characters, planets, starships, vehicles or species urls of a film.
+        Prefer this tool to calling the other tools once per url.
 
         Input:
-        The input for this tool should be a comma separated list,
-        where the first element is the movie url, or empty character if not available,
-        and the second element is the movie title, or empty character if not available.
-        Use this tool only if at least once of the tuple elements is available.
-        Do not use this tool if none of the tuple elements are available.
+        The input for this tool should be a comma separated list of resource urls.
 
         Output:
-        This tool returns a stringified JSON with the following properties:
-        "count": Total number of Films matched. Films are paginated
-        "next": If not None, is the url to retrieve the next page of the results
-        "previous": If not None, is the url to retrieve the previous page of the results. This value should be ignored
-        "results": Is a stringified list of Films.
-
-        Each film has the following attributes:
-
-        title (of type string): The title of this film
-        episode_id (of type integer): The episode number of this film.
-        opening_crawl (of type string): The opening paragraphs at the beginning of this film.
-        director (of type string): The name of the director of this film.
-        producer (of type string): The name(s) of the producer(s) of this film. Comma separated.
-        release_date (of type date) : The ISO 8601 date format of film release at original creator country.
-        species (of type array): An array of species resource URLs that are in this film.
-        starships (of type array): An array of starship resource URLs that are in this film.
-        vehicles (of type array): An array of vehicle resource URLs that are in this film.
-        characters (of type array): An array of people resource URLs that are in this film.
-        planets (of type array): An array of planet resource URLs that are in this film.
-        url (of type string): the hypermedia URL of this resource.
-        created (of type string): the ISO 8601 date format of the time that this resource was created.
-        edited (of type string): the ISO 8601 date format of the time that this resource was edited.
+        This tool returns a stringified JSON object where each key is a resource type
+        ("films", "people", "planets", "species", "starships", "vehicles")
+        and each value is the list of the matching resources, with the same attributes described in the other tools.
+        If some urls could not be retrieved, the "errors" key maps each of them to the error message.
         """,
-        func=filmTool,
-        return_direct=False
-    ),
-    Tool.from_function(
-        name="Character Search",
-        description="""
-        Use when need to find details about characters given their url or name.
-
-        Input:
-        The input for this tool should be a comma separated list,
-        where the first element is the character url, or empty character if not available,
-        and the second element is the character name, or empty character if not available.
-        Use this tool only if at least once of the tuple elements is available.
-        Do not use this tool if none of the tuple elements are available.
-
-        Output:
-        This tool returns a stringified JSON with the following properties:
-        "count": Total number of Characters matched. Characters are paginated
-        "next": If not None, is the url to retrieve the next page of the results
-        "previous": If not None, is the url to retrieve the previous page of the results. This value should be ignored
-        "results": Is a stringified list of Characters.
-
-        Each Character has the following attributes:
-
-        name (of type string): The name of this person.
-        birth_year (of type string): The birth year of the person, using the in-universe standard of BBY or ABY - Before the Battle of Yavin or After the Battle of Yavin. The Battle of Yavin is a battle that occurs at the end of Star Wars episode IV: A New Hope.
-        eye_color (of type string): The eye color of this person. Will be "unknown" if not known or "n/a" if the person does not have an eye.
-        gender (of type string): The gender of this person. Either "Male", "Female" or "unknown", "n/a" if the person does not have a gender.
-        hair_color (of type string): The hair color of this person. Will be "unknown" if not known or "n/a" if the person does not have hair.
-        height (of type string): The height of the person in centimeters.
-        mass (of type string): The mass of the person in kilograms.
-        skin_color (of type string): The skin color of this person.
-        homeworld (of type string): The URL of a planet resource, a planet that this person was born on or inhabits.
-        films (of type array): An array of film resource URLs that this person has been in.
-        species (of type array): An array of species resource URLs that this person belongs to.
-        starships (of type array): An array of starship resource URLs that this person has piloted.
-        vehicles (of type array): An array of vehicle resource URLs that this person has piloted.
-        url (of type string): the hypermedia URL of this resource.
-        created (of type string): the ISO 8601 date format of the time that this resource was created.
-        edited (of type string): the ISO 8601 date format of the time that this resource was edited.
-        """,
-        func=characterTool,
+        func=batchResourceTool,
         return_direct=False
     )
 ]
 
+# Every observation is capped to a token budget before it gets into the agent scratchpad (see tool_budget.py)
+tools = ObservationBudget(max_tokens=1000).wrap_all(tools)
+
 
 # Then, pull from "Langchain hub" a pre-made agent
 # This agent instructs the model to use the tools at disposal to answer the question
-agent_prompt = hub.pull("hwchase17/react-chat")
+# The prompt is read from the local copy in the prompts folder, the hub is only called the first time
+# (python prompt_registry.py pull hwchase17/react-chat to get a new version, see prompt_registry.py)
+agent_prompt = load_prompt("hwchase17/react-chat")
 
-agent = create_react_agent(llm, tools, prompt=agent_prompt)
+# The agent can also ask for several independent tool calls in the same step (see parallel_agent.py)
+agent = create_parallel_react_agent(llm, tools, agent_prompt)
 
-# agent_prompt = hub.pull("hwchase17/openai-tools-agent")
+# agent_prompt = load_prompt("hwchase17/openai-tools-agent")
 
 # agent = create_tool_calling_agent(llm, tools, prompt=agent_prompt)
 
-print("Agent prompt is: ")
-agent_prompt.pretty_print()
+# The agent prompt is printed before the first answer (show_prompt at the top)
 
 
-agent_executor = AgentExecutor(
+agent_executor = ParallelAgentExecutor(
     agent=agent,
     tools=tools,
     memory=memory,
+    # The tool calls of the same step run at the same time, at most 4 of them
+    max_concurrency=4,
     max_interations=3,
     verbose=True,
     handle_parsing_errors=True
 )
-
-
-while True:
-    q = input("> ")
-    response = agent_executor.invoke({"input": q})
-    print(response["output"])
@@ -1,14 +1,18 @@
 from dotenv import load_dotenv
-from langchain.chains.conversation.memory import ConversationBufferMemory
 from langchain.chains.llm import LLMChain
 from langchain_openai import ChatOpenAI
 from langchain.prompts import PromptTemplate
 import os
+from chat_history_store import open_chat_history
+from streaming import StreamingPrinter
+from summary_memory import RollingSummaryMemory
 
 load_dotenv()
 
 chat_llm = ChatOpenAI(
-    openai_api_key=os.getenv("OPENAI_KEY")
+    openai_api_key=os.getenv("OPENAI_KEY"),
+    # The tokens are sent as soon as they are generated, so the loop below can print them (see streaming.py)
+    streaming=True
 )
 
 
@@ -25,7 +29,15 @@ Question: {question}
 """, input_variables=["chat_history", "context", "question"])
 
 # There are different memory types depending on the case, but in this tutorial the `ConversationBufferMemory` is used
-memory = ConversationBufferMemory(
+# UPDATE: the buffer replays the whole conversation in every prompt, so it's replaced by a memory that keeps
+# only the last ~1000 tokens verbatim, and summarizes the older messages in background (see summary_memory.py)
+memory = RollingSummaryMemory(
+    # The model that writes the summary
+    llm=chat_llm,
+    max_token_limit=1000,
+    # The messages are saved on disk (or on Neo4j), so the conversation survives a restart.
+    # Only the last 50 messages are loaded back (see chat_history_store.py)
+    chat_memory=open_chat_history(os.getenv("CHAT_SESSION_ID", "surf"), last_n=50),
     # This is the prompt variable that needs to be populated with the chat history
     memory_key="chat_history",
     # This is the prompt variable that is populated with the user's question. This will be added to the memory
@@ -71,11 +83,14 @@ print(response["text"])
 
 
 # Experimenting with a loop
+# The answer is printed while it's generated (see streaming.py)
+printer = StreamingPrinter()
 while True:
     question = input("> ")
+    printer.start()
     response = chat_chain.invoke({
         "context": current_weather,
         "question": question
-    })
+    }, config={"callbacks": [printer]})
 
-    print(response["text"])
+    printer.finish(response["text"])
@@ -1,13 +1,21 @@
+import os
+
+# The "> " prompt is shown right away: the rest of this file (imports, clients, agent) is loaded in background
+# while the first question is typed (see bootstrap.py)
+if __name__ == "__main__":
+    from bootstrap import run_chat
+    run_chat(__file__)
+
 from dotenv import load_dotenv
 from langchain_openai import ChatOpenAI
 from langchain.prompts import PromptTemplate
 from langchain.chains.llm import LLMChain
-from langchain.chains.conversation.memory import ConversationBufferMemory
-from langchain.agents import AgentExecutor, create_react_agent
 from langchain.tools import Tool
-from langchain import hub
-import os
 from langchain_community.tools import YouTubeSearchTool
+from tool_budget import ObservationBudget
+from parallel_agent import ParallelAgentExecutor, create_parallel_react_agent
+from prompt_registry import load_prompt
+from summary_memory import RollingSummaryMemory
 
 # Agents wrap a LLM and gives it a set of "tools" that the model can access to retrieve data
 # Example of tools are APIs, data sources (I think dbs) or functionality (file system access maybe?)
@@ -31,7 +39,11 @@ prompt = PromptTemplate(
     input_variables=["chat_history", "input"],
 )
 
-memory = ConversationBufferMemory(
+# Only the last ~1000 tokens of the conversation go in the prompts verbatim,
+# the older messages are summarized in background (see summary_memory.py)
+memory = RollingSummaryMemory(
+    llm=llm,
+    max_token_limit=1000,
     memory_key="chat_history",
     return_messages=True
 )
@@ -71,11 +83,17 @@ tools = [
 
 ]
 
+# Every observation is capped to a token budget before it gets into the agent scratchpad (see tool_budget.py)
+tools = ObservationBudget(max_tokens=1000).wrap_all(tools)
+
 # Then, pull from "Langchain hub" a pre-made agent
 # This agent instructs the model to use the tools at disposal to answer the question
-agent_prompt = hub.pull("hwchase17/react-chat")
+# The prompt is read from the local copy in the prompts folder, the hub is only called the first time
+# (python prompt_registry.py pull hwchase17/react-chat to get a new version, see prompt_registry.py)
+agent_prompt = load_prompt("hwchase17/react-chat")
 
-agent = create_react_agent(
+# The agent can also ask for several independent tool calls in the same step (see parallel_agent.py)
+agent = create_parallel_react_agent(
     # The agent uses the previously initialized chat model
     llm,
     # The agent uses the tools
@@ -85,10 +103,12 @@ agent = create_react_agent(
 )
 
 # I think the Agent executor wrap the agent allowing to chat with him
-agent_executor = AgentExecutor(
+agent_executor = ParallelAgentExecutor(
     agent=agent,
     tools=tools,
     memory=memory,
+    # The tool calls of the same step run at the same time, at most 4 of them
+    max_concurrency=4,
     # This prevents the model from running too long or entering an infinite loop
     max_interations=3,
     # Used for debugging, prints on the console the tool execution, like which tool has been picked, which inout is passed, which output returns
@@ -104,7 +124,3 @@ agent_executor = AgentExecutor(
 
 # I also note that the resulting links are the two first links found when using an incognito window and searching
 # ""The Searchers" trailer" on Youtube navigation bar
-while True:
-    q = input("> ")
-    response = agent_executor.invoke({"input": q})
-    print(response["output"])
@@ -1,15 +1,16 @@
-import os
+import asyncio
+
 from dotenv import load_dotenv
-from langchain_community.graphs import Neo4jGraph
+
+from neo4j_pool import get_pool
+from schema_cache import load_graph
 
 load_dotenv()
 
 # Neo4jGraph from langchain is a wrapper to the neo4j package
-graph = Neo4jGraph(
-    url=os.getenv("NEO_4J_URL"),
-    username=os.getenv("NEO_4J_USER"),
-    password=os.getenv("NEO_4J_PW")
-)
+# When created, it reads the database schema with several queries. load_graph() creates it without them,
+# reusing the schema saved on disk by the last run if the graph didn't change (see schema_cache.py)
+graph = load_graph()
 
 result = graph.query("""
 MATCH (m:Movie{title: 'Toy Story'}) 
@@ -19,3 +20,26 @@ RETURN m.title, m.plot, m.poster
 print(result)
 
 print(graph.schema)
+
+# The graph uses the driver shared by the whole process (see neo4j_pool.py): Neo4jVector, the Cypher chains
+# and the scripts all borrow connections from the same pool.
+# Independent queries can also run at the same time, each one on its own connection
+pool = get_pool()
+movie, cast = pool.run_concurrently(
+    lambda: pool.query("MATCH (m:Movie {title: $title}) RETURN m.title, m.year", {"title": "Toy Story"}),
+    lambda: pool.query("MATCH (a:Actor)-[:ACTED_IN]->(:Movie {title: $title}) RETURN a.name", {"title": "Toy Story"}),
+)
+print(movie, cast)
+
+
+# The same with the async driver, for code that already runs in an event loop
+async def movie_and_cast(title):
+    try:
+        return await pool.aquery_all(
+            ("MATCH (m:Movie {title: $title}) RETURN m.title, m.year", {"title": title}),
+            ("MATCH (a:Actor)-[:ACTED_IN]->(:Movie {title: $title}) RETURN a.name", {"title": title}),
+        )
+    finally:
+        await pool.aclose()
+
+print(asyncio.run(movie_and_cast("Toy Story")))
@@ -2,9 +2,11 @@ import os
 
 from dotenv import load_dotenv
 from langchain.chains.retrieval_qa.base import RetrievalQA
-from langchain_community.vectorstores.neo4j_vector import Neo4jVector
 from langchain_openai import ChatOpenAI, OpenAIEmbeddings
 
+from embedding_cache import CachedEmbeddings
+from local_vector_search import open_movie_plot_store
+
 # NOTE: This lesson does not refer to Labradors
 
 # Retrievers are chains that allow to retrieve unstructured documents (aka text) given an unstructured query
@@ -19,25 +21,20 @@ load_dotenv()
 # Neo4jVector is a vector store that can generate embeddings and store/retrieve them on Neo4j
 
 # The embedding provider is used to generate a vector embedding of each query (and I suppose of each data if needed)
-embedding_provider = OpenAIEmbeddings(
-    openai_api_key=os.getenv("OPENAI_KEY")
+# The provider is wrapped by a cache, so a query that was already embedded doesn't call OpenAI again
+# (see embedding_cache.py). The vectors are also kept on disk, in the .embedding_cache folder
+embedding_provider = CachedEmbeddings(
+    OpenAIEmbeddings(
+        openai_api_key=os.getenv("OPENAI_KEY")
+    ),
+    cache_dir=".embedding_cache"
 )
 
-movie_plot_vector = Neo4jVector.from_existing_index(
-    embedding_provider,
-    url=os.getenv("NEO_4J_URL"),
-    username=os.getenv("NEO_4J_USER"),
-    password=os.getenv("NEO_4J_PW"),
-    # This is the name of the index created on a past lesson online
-    index_name="moviePlots",
-    # This is the node property that contains the embedding. Like m.embedding where m is a Movie node
-    embedding_node_property="embedding",
-    # This is the node property that contains the text (ie the movie plot)
-    # Don't know why this is necessary, since the embedding should be sufficient.
-    # I suppose this is used to generate an embedding when creating or updating a node
-    # Also, this is used to populate "doc.page_content" on each result
-    text_node_property="plot",
-)
+# The vector store comes from open_movie_plot_store() (see local_vector_search.py):
+# - VECTOR_BACKEND=neo4j (the default) is a Neo4jVector on the moviePlots index of the lesson,
+#   on the shared driver of neo4j_pool.py
+# - VECTOR_BACKEND=local is a local copy of the index, that returns the same documents without going to the database
+movie_plot_vector = open_movie_plot_store(embedding_provider)
 
 # Search for similarity with the query
 # What I suppose it happens is that an embedding of the query is generated
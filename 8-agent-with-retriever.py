@@ -1,17 +1,27 @@
 import os
 
+# The "> " prompt is shown right away: the rest of this file (imports, clients, agent) is loaded in background
+# while the first question is typed (see bootstrap.py). chat_server.py imports this file to serve the same agent
+if __name__ == "__main__":
+    from bootstrap import run_chat
+    run_chat(__file__)
+
 from dotenv import load_dotenv
-from langchain import hub
-from langchain.agents import AgentExecutor, create_react_agent
 from langchain.chains.retrieval_qa.base import RetrievalQA
-from langchain.chains.conversation.memory import ConversationBufferMemory
 from langchain.chains.llm import LLMChain
 from langchain.prompts import PromptTemplate
 from langchain.tools import Tool
 from langchain_community.tools import YouTubeSearchTool
-from langchain_community.vectorstores.neo4j_vector import Neo4jVector
 from langchain_openai import ChatOpenAI, OpenAIEmbeddings
 
+from bootstrap import Lazy
+from embedding_cache import CachedEmbeddings
+from local_vector_search import open_movie_plot_store
+from parallel_agent import ParallelAgentExecutor, create_parallel_react_agent
+from prompt_registry import load_prompt
+from summary_memory import RollingSummaryMemory
+from tool_budget import ObservationBudget
+
 load_dotenv()
 
 # Initialize the LLM
@@ -31,7 +41,11 @@ prompt = PromptTemplate(
 )
 
 # Create the conversational memory
-memory = ConversationBufferMemory(
+# Only the last ~1000 tokens of the conversation go in the prompts verbatim,
+# the older messages are summarized in background (see summary_memory.py)
+memory = RollingSummaryMemory(
+    llm=llm,
+    max_token_limit=1000,
     memory_key="chat_history",
     return_messages=True
 )
@@ -49,27 +63,24 @@ youtube = YouTubeSearchTool()
 
 
 # Also, create the Retriever to use as tool
-embedding_provider = OpenAIEmbeddings(
-    openai_api_key=os.getenv("OPENAI_KEY")
-)
-
-movie_plot_vector = Neo4jVector.from_existing_index(
-    embedding_provider,
-    url=os.getenv("NEO_4J_URL"),
-    username=os.getenv("NEO_4J_USER"),
-    password=os.getenv("NEO_4J_PW"),
-    index_name="moviePlots",
-    embedding_node_property="embedding",
-    text_node_property="plot",
+# The provider is wrapped by a cache, so a query that was already embedded doesn't call OpenAI again
+# (see embedding_cache.py). The vectors are also kept on disk, in the .embedding_cache folder
+embedding_provider = CachedEmbeddings(
+    OpenAIEmbeddings(
+        openai_api_key=os.getenv("OPENAI_KEY")
+    ),
+    cache_dir=".embedding_cache"
 )
 
-plot_retriever = RetrievalQA.from_llm(
+# The moviePlots index on Neo4j, or its local copy when VECTOR_BACKEND=local (see local_vector_search.py)
+# It's opened the first time the tool is used, not at startup: many questions don't need it (see bootstrap.py)
+plot_retriever = Lazy(lambda: RetrievalQA.from_llm(
     llm=llm,
-    retriever=movie_plot_vector.as_retriever(),
+    retriever=open_movie_plot_store(embedding_provider).as_retriever(),
     # These two flags allow for better understanding what's happening, by verbosing the output and populating "source_documents" with matched documents
     verbose=True,
     return_source_documents=True
-)
+))
 
 # Tools expect a single query input and a single output key.
 # Since RetrievalQA chain returns multiple outputs ("result" and "source_documents"), it needs to be wrapped
@@ -110,22 +121,30 @@ tools = [
     )
 ]
 
+# Every observation is capped to a token budget before it gets into the agent scratchpad (see tool_budget.py)
+tools = ObservationBudget(max_tokens=1000).wrap_all(tools)
+
 
 # Then, pull from "Langchain hub" a pre-made agent
 # This agent instructs the model to use the tools at disposal to answer the question
-agent_prompt = hub.pull("hwchase17/react-chat")
+# The prompt is read from the local copy in the prompts folder, the hub is only called the first time
+# (python prompt_registry.py pull hwchase17/react-chat to get a new version, see prompt_registry.py)
+agent_prompt = load_prompt("hwchase17/react-chat")
 
-agent = create_react_agent(
+# The agent can also ask for several independent tool calls in the same step (see parallel_agent.py)
+agent = create_parallel_react_agent(
     llm,
     tools,
     agent_prompt
 )
 
 # I think the Agent executor wrap the agent allowing to chat with him
-agent_executor = AgentExecutor(
+agent_executor = ParallelAgentExecutor(
     agent=agent,
     tools=tools,
     memory=memory,
+    # The tool calls of the same step run at the same time, at most 4 of them
+    max_concurrency=4,
     max_interations=3,
     verbose=True,
     handle_parsing_errors=True
@@ -140,7 +159,3 @@ agent_executor = AgentExecutor(
 # So I'm not entirely sure what calls are made when choosing the tool, and what happens when the tools answers back
 # My question is: if the tool does not find the right movie and returns garbage,
 # why (and by who) the field results["result"] is pupolated with "I think you're referring to Return to the Future"?
-while True:
-    q = input("> ")
-    response = agent_executor.invoke({"input": q})
-    print(response["output"])
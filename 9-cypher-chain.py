@@ -1,10 +1,22 @@
 import os
 
+# The "> " prompt is shown right away: the rest of this file (imports, graph connection, chain) is loaded in
+# background while the first question is typed (see bootstrap.py)
+if __name__ == "__main__":
+    from bootstrap import run_chat
+    run_chat(__file__, chain="cypher_chain", input_key="query", output_key="result", answer_prefix=None)
+
 from dotenv import load_dotenv
-from langchain.chains.graph_qa.cypher import GraphCypherQAChain
 from langchain.prompts import PromptTemplate
-from langchain_community.graphs import Neo4jGraph
 from langchain_openai import ChatOpenAI
+from neo4j import READ_ACCESS
+
+from cypher_cache import CypherCache
+from cypher_chain import CypherQAChain
+from cypher_guardrails import ResultGuard
+from cypher_validation import CypherValidator
+from intent_router import EntityIndex, IntentRouter
+from schema_cache import load_graph
 
 load_dotenv()
 
@@ -13,13 +25,18 @@ llm = ChatOpenAI(
     openai_api_key=os.getenv("OPENAI_KEY")
 )
 
-# Initialize the graph connection
-graph = Neo4jGraph(
-    url=os.getenv("NEO_4J_URL"),
-    username=os.getenv("NEO_4J_USER"),
-    password=os.getenv("NEO_4J_PW")
+# The answer is written by a streaming model, so the loop below can print it while it's generated (see streaming.py)
+# The Cypher generation keeps the normal one: the query is not shown to the user
+answer_llm = ChatOpenAI(
+    openai_api_key=os.getenv("OPENAI_KEY"),
+    streaming=True
 )
 
+# Initialize the graph connection
+# The schema is read from a snapshot on disk while the graph doesn't change (see schema_cache.py)
+# The chain only reads: its queries can go to the read replicas of a cluster (see neo4j_pool.py)
+graph = load_graph(access_mode=READ_ACCESS)
+
 # Create the prompt template that will be used to generate Cypher queries
 # This takes the database schema as input and the question for which a cypher query needs to be generated
 CYPHER_GENERATION_TEMPLATE = """
@@ -37,10 +54,23 @@ cypher_generation_prompt = PromptTemplate(
 
 # Create a chain that writes cypher queries
 # I suppose that this automatically populates the prompt variables
-cypher_chain = GraphCypherQAChain.from_llm(
+cypher_chain = CypherQAChain.from_llm(
     llm,
+    qa_llm=answer_llm,
     graph=graph,
     cypher_prompt=cypher_generation_prompt,
+    # Questions like "What movies did Tom Hanks act in?" run a templated query directly, without the LLM
+    # (the actor names and movie titles are loaded once from the graph, see intent_router.py)
+    intent_router=IntentRouter(EntityIndex.load(graph)),
+    # Questions already answered reuse their query instead of generating a new one (see cypher_cache.py)
+    cypher_cache=CypherCache(".cypher_cache.sqlite3"),
+    # Only the labels and relationships relevant to the question go in the prompt
+    use_compact_schema=True,
+    # Generated queries are checked against the schema and with EXPLAIN before running them,
+    # and the LLM gets one chance to fix an invalid one (see cypher_validation.py)
+    cypher_validator=CypherValidator(graph, llm=llm, max_repairs=1),
+    # Big results are capped while streaming them from the database, and summarized for the answer
+    result_guard=ResultGuard(max_rows=50, context_rows=10),
     verbose=True
 )
 
@@ -72,7 +102,3 @@ cypher_chain = GraphCypherQAChain.from_llm(
 #
 # In addition, this breaks if I ask for something not translatable to a query, like
 # "What did I just ask?"
-while True:
-    q = input("> ")
-    response = cypher_chain.invoke({"query": q})
-    print(response["result"])
@@ -0,0 +1,72 @@
+import asyncio
+import time
+from typing import Any, List, Optional
+
+from langchain.prompts import PromptTemplate
+from langchain.tools import Tool
+from langchain_core.language_models.llms import LLM
+
+from parallel_agent import ParallelAgentExecutor, create_parallel_react_agent
+
+# A ReAct agent with fake LLM and tools, to load test chat_server.py without OpenAI, Neo4j or SWAPI
+#
+# The agent loop is the real one (create_parallel_react_agent + ParallelAgentExecutor, as in the chatbots),
+# only the backends are replaced: the LLM and the tool just wait for a fixed latency and return canned text.
+# Every question costs two LLM calls and one tool call, like a simple lookup in 12-star-wars-chatbot.py.
+
+STUB_PROMPT = PromptTemplate.from_template("""You are a stub assistant.
+
+{tools}
+
+Use one of [{tool_names}].
+
+Begin!
+
+Previous conversation history:
+{chat_history}
+
+New input: {input}
+{agent_scratchpad}""")
+
+
+class StubLLM(LLM):
+    latency: float = 0.2
+    """Seconds waited by every call"""
+
+    @property
+    def _llm_type(self):
+        return "stub"
+
+    def _answer(self, prompt):
+        # First step: call the tool. After its observation (in the scratchpad, after the input): answer
+        if "Observation:" in prompt.split("New input:")[-1]:
+            return "Thought: Do I need to use a tool? No\nFinal Answer: Here is what the stub search found."
+        return "Thought: Do I need to use a tool? Yes\nAction: Stub Search\nAction Input: the question"
+
+    def _call(self, prompt: str, stop: Optional[List[str]] = None, run_manager=None, **kwargs: Any) -> str:
+        time.sleep(self.latency)
+        return self._answer(prompt)
+
+    async def _acall(self, prompt: str, stop: Optional[List[str]] = None, run_manager=None, **kwargs: Any) -> str:
+        await asyncio.sleep(self.latency)
+        return self._answer(prompt)
+
+
+def build_stub_agent(llm_latency=0.2, tool_latency=0.1):
+    def search(query):
+        time.sleep(tool_latency)
+        return f"Stub result for {query}"
+
+    async def asearch(query):
+        await asyncio.sleep(tool_latency)
+        return f"Stub result for {query}"
+
+    tools = [
+        Tool(name="Stub Search", description="Searches anything. Input is a string.", func=search, coroutine=asearch),
+    ]
+    llm = StubLLM(latency=llm_latency)
+    return ParallelAgentExecutor(
+        agent=create_parallel_react_agent(llm, tools, STUB_PROMPT),
+        tools=tools,
+        handle_parsing_errors=True,
+    )
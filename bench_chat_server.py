@@ -0,0 +1,96 @@
+import argparse
+import asyncio
+import statistics
+import time
+
+import aiohttp
+from aiohttp import web
+
+from agent_stub import StubLLM, build_stub_agent
+from chat_history_store import open_chat_history
+from chat_server import ChatServer
+
+# Load test of chat_server.py: many users chatting at the same time.
+# By default the server runs in-process with the stub agent of agent_stub.py (fake LLM and tool latencies),
+# so the numbers show only what the server adds: concurrency limits, queueing and backpressure.
+# With --url it targets a server that is already running instead.
+#
+# Usage: python bench_chat_server.py --sessions 50 --messages 4 --max-concurrency 16
+
+
+def _percentile(values, percentile):
+    values = sorted(values)
+    return values[min(len(values) - 1, max(0, round(len(values) * percentile / 100) - 1))]
+
+
+async def _user(http, url, session_id, messages, latencies, statuses):
+    # A user sends a message, waits for the answer, then sends the next one
+    for i in range(messages):
+        start = time.perf_counter()
+        async with http.post(f"{url}/chat", json={"session_id": session_id, "message": f"question {i}"}) as response:
+            await response.read()
+            statuses[response.status] = statuses.get(response.status, 0) + 1
+            if response.status == 200:
+                latencies.append(time.perf_counter() - start)
+
+
+async def _run(url, sessions, messages):
+    latencies, statuses = [], {}
+    connector = aiohttp.TCPConnector(limit=0)
+    async with aiohttp.ClientSession(connector=connector) as http:
+        start = time.perf_counter()
+        await asyncio.gather(*(
+            _user(http, url, f"user-{i}", messages, latencies, statuses) for i in range(sessions)
+        ))
+        elapsed = time.perf_counter() - start
+    return latencies, statuses, elapsed
+
+
+async def _bench(args):
+    runner = None
+    url = args.url
+    if not url:
+        server = ChatServer(
+            build_stub_agent(llm_latency=args.llm_ms / 1000, tool_latency=args.tool_ms / 1000),
+            StubLLM(latency=args.llm_ms / 1000),
+            max_concurrency=args.max_concurrency,
+            max_pending=args.max_pending,
+            # Nothing to persist for a load test
+            history_factory=lambda session_id: open_chat_history(session_id, backend="memory"),
+        )
+        runner = web.AppRunner(server.app(), handler_cancellation=True)
+        await runner.setup()
+        site = web.TCPSite(runner, "127.0.0.1", 0)
+        await site.start()
+        url = f"http://127.0.0.1:{runner.addresses[0][1]}"
+
+    try:
+        latencies, statuses, elapsed = await _run(url, args.sessions, args.messages)
+    finally:
+        if runner:
+            await runner.cleanup()
+
+    print(f"{args.sessions} sessions x {args.messages} messages against {args.url or 'the stub agent'}"
+          f" (LLM {args.llm_ms} ms, tool {args.tool_ms} ms, max concurrency {args.max_concurrency})")
+    print(f"responses by status: {dict(sorted(statuses.items()))}")
+    if latencies:
+        ms = [t * 1000 for t in latencies]
+        print(f"throughput {len(latencies) / elapsed:7.1f} answers/s   "
+              f"p50 {statistics.median(ms):7.1f} ms   p99 {_percentile(ms, 99):7.1f} ms")
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--url", default=None, help="Server to test, instead of the in-process stub")
+    parser.add_argument("--sessions", type=int, default=50)
+    parser.add_argument("--messages", type=int, default=4)
+    parser.add_argument("--max-concurrency", type=int, default=16)
+    parser.add_argument("--max-pending", type=int, default=64)
+    parser.add_argument("--llm-ms", type=float, default=200.0, help="Latency of each stub LLM call")
+    parser.add_argument("--tool-ms", type=float, default=100.0, help="Latency of each stub tool call")
+    args = parser.parse_args()
+    asyncio.run(_bench(args))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,66 @@
+import argparse
+import statistics
+import time
+
+import requests
+
+from swapi_client import SwapiClient
+from swapi_stub import SwapiStubServer
+
+# Compares the latency of a SWAPI tool call made with a bare `requests.get` (what 12-star-wars-chatbot.py did)
+# against the pooled keep-alive client of swapi_client.py.
+# It runs against the local stub server, so the numbers depend only on the connection handling.
+#
+# Usage: python bench_swapi_client.py --calls 50 --handshake-ms 20
+
+
+def _people_urls(base_url, calls):
+    # Mimic an agent following the "characters" urls of a film one after the other
+    return [f"{base_url}people/{(i % 16) + 1}/" for i in range(calls)]
+
+
+def _measure(fetch, urls):
+    timings = []
+    for url in urls:
+        start = time.perf_counter()
+        fetch(url)
+        timings.append(time.perf_counter() - start)
+    return timings
+
+
+def _report(label, timings):
+    ms = sorted(t * 1000 for t in timings)
+    p95 = ms[max(0, int(len(ms) * 0.95) - 1)]
+    print(f"{label:<24} mean {statistics.mean(ms):7.2f} ms   p50 {statistics.median(ms):7.2f} ms   p95 {p95:7.2f} ms")
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--calls", type=int, default=50)
+    parser.add_argument("--handshake-ms", type=float, default=20.0,
+                        help="Simulated cost of opening a new connection")
+    args = parser.parse_args()
+
+    with SwapiStubServer(handshake_delay=args.handshake_ms / 1000) as stub:
+        urls = _people_urls(stub.base_url, args.calls)
+
+        # Before: a new connection for every call
+        def bare_get(url):
+            req = requests.get(url)
+            req.raise_for_status()
+            return req.text
+
+        before = _measure(bare_get, urls)
+
+        # After: one pooled session, so only the first call pays for the connection
+        with SwapiClient(base_url=stub.base_url) as client:
+            after = _measure(client.get_text, urls)
+
+    print(f"{args.calls} tool calls, simulated handshake {args.handshake_ms} ms")
+    _report("bare requests.get", before)
+    _report("pooled SwapiClient", after)
+    print(f"speedup (mean): {statistics.mean(before) / statistics.mean(after):.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,136 @@
+import argparse
+import os
+import statistics
+import tempfile
+import time
+
+import numpy as np
+
+from local_vector_search import LOCAL_INDEX_DIR, LocalVectorIndex, LocalVectorStore, _normalize
+
+# Recall and latency of the vector search backends
+#
+# The exact brute-force search of the local index is the ground truth. Against it are measured:
+# - the IVF index of the local backend (with a few nprobe values)
+# - the moviePlots index on Neo4j (with --neo4j, needs an exported index, see local_vector_search.py)
+# The queries are made from the embeddings of some movies of the catalog, so no OpenAI call is needed: each one is
+# moved by random noise (--noise, relative to its norm) and its source movie is left out of the results,
+# otherwise every search finds the query's own vector first and the recall looks better than it is.
+#
+# Without an exported index, --synthetic builds a random clustered catalog to compare brute force and IVF:
+#
+#   python bench_vector_search.py --synthetic 50000 --dimensions 1536
+#   python bench_vector_search.py --neo4j
+
+
+def _synthetic_index(directory, count, dimensions, clusters=200, seed=0):
+    rng = np.random.default_rng(seed)
+    centers = rng.normal(size=(clusters, dimensions)).astype(np.float32)
+    vectors = centers[rng.integers(0, clusters, size=count)] + 0.5 * rng.normal(size=(count, dimensions)).astype(np.float32)
+    _normalize(vectors).astype(np.float32).tofile(os.path.join(directory, "vectors.f32"))
+    index = LocalVectorIndex(
+        np.memmap(os.path.join(directory, "vectors.f32"), dtype=np.float32, mode="r", shape=(count, dimensions)),
+        [f"plot {i}" for i in range(count)],
+        [{"title": f"Movie {i}"} for i in range(count)],
+    )
+    return index
+
+
+def _queries(index, count, noise, seed=1):
+    # [(source row, query vector)]: a catalog vector plus gaussian noise of norm `noise` times its own
+    rng = np.random.default_rng(seed)
+    rows = rng.choice(len(index), size=min(count, len(index)), replace=False)
+    queries = []
+    for row in rows:
+        vector = np.array(index.vectors[row], dtype=np.float32)
+        direction = rng.normal(size=vector.shape).astype(np.float32)
+        vector += noise * np.linalg.norm(vector) * direction / np.linalg.norm(direction)
+        queries.append((int(row), vector))
+    return queries
+
+
+def _timed(search, queries):
+    timings, results = [], []
+    for query in queries:
+        start = time.perf_counter()
+        results.append(search(query))
+        timings.append(time.perf_counter() - start)
+    return timings, results
+
+
+def _recall(results, truth):
+    return statistics.mean(len(set(r) & set(t)) / len(t) for r, t in zip(results, truth))
+
+
+def _report(label, timings, recall):
+    ms = sorted(t * 1000 for t in timings)
+    p95 = ms[max(0, int(len(ms) * 0.95) - 1)]
+    print(f"{label:<22} recall {recall:6.3f}   p50 {statistics.median(ms):8.3f} ms   p95 {p95:8.3f} ms")
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--synthetic", type=int, default=0, help="Size of a random catalog to use instead of the export")
+    parser.add_argument("--dimensions", type=int, default=1536)
+    parser.add_argument("--dir", default=LOCAL_INDEX_DIR)
+    parser.add_argument("--queries", type=int, default=100)
+    parser.add_argument("--noise", type=float, default=0.3, help="Noise added to the query vectors, relative to their norm")
+    parser.add_argument("--k", type=int, default=4)
+    parser.add_argument("--ivf-lists", type=int, default=None)
+    parser.add_argument("--nprobe", type=int, nargs="*", default=[1, 4, 16])
+    parser.add_argument("--neo4j", action="store_true", help="Also measure the moviePlots index on Neo4j")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        if args.synthetic:
+            index = _synthetic_index(tmp, args.synthetic, args.dimensions)
+        else:
+            index = LocalVectorIndex.load(args.dir)
+        if index.ivf is None:
+            index.build_ivf(n_lists=args.ivf_lists)
+
+        queries = _queries(index, args.queries, args.noise)
+        print(f"{len(index)} vectors, {index.vectors.shape[1]} dimensions, {len(queries)} queries "
+              f"(noise {args.noise}), k={args.k}, {len(index.ivf.lists)} IVF lists")
+
+        def rows_of(nprobe):
+            def search(item):
+                # One more result, in case the source movie is among them
+                source, query = item
+                return [row for row, _ in index.search(query, k=args.k + 1, nprobe=nprobe) if row != source][:args.k]
+
+            return search
+
+        timings, truth = _timed(rows_of(None), queries)
+        _report("local brute force", timings, 1.0)
+        for nprobe in args.nprobe:
+            timings, results = _timed(rows_of(nprobe), queries)
+            _report(f"local IVF nprobe={nprobe}", timings, _recall(results, truth))
+
+        if args.neo4j and not args.synthetic:
+            from langchain_community.embeddings import FakeEmbeddings
+
+            from local_vector_search import open_movie_plot_store
+
+            # Queries are vectors already, the provider is only probed by Neo4jVector for the dimensions.
+            # The documents are compared by title, both backends put it in the metadata
+            probe = FakeEmbeddings(size=index.vectors.shape[1])
+            store = open_movie_plot_store(embedding_provider=probe, backend="neo4j")
+            local = LocalVectorStore(index, embedding=None)
+
+            def titles_of(store):
+                def search(item):
+                    source, query = item
+                    documents = store.similarity_search_by_vector(query.tolist(), k=args.k + 1)
+                    titles = [document.metadata.get("title") for document in documents]
+                    return [title for title in titles if title != index.metadatas[source].get("title")][:args.k]
+
+                return search
+
+            _, truth_titles = _timed(titles_of(local), queries)
+            timings, results = _timed(titles_of(store), queries)
+            _report("neo4j moviePlots", timings, _recall(results, truth_titles))
+
+
+if __name__ == "__main__":
+    main()
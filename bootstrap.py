@@ -0,0 +1,203 @@
+import argparse
+import importlib.util
+import os
+import re
+import subprocess
+import sys
+import threading
+import time
+
+# Fast startup for the chatbot scripts
+#
+# Starting a chatbot imported langchain, langchain_community, langchain_openai and neo4j, then built the clients
+# (ChatOpenAI, OpenAIEmbeddings, the Neo4j connection and its schema, the vector index, the tools) before showing
+# the first "> ": seconds of waiting before even typing. This module only uses the standard library, and:
+# - Lazy(factory) is an object built on first use, once, also when several threads ask for it at the same time.
+#   warm_up() starts building it in a background thread
+# - run_chat(__file__, ...) is the REPL of a script: it shows "> " right away, while the script (its imports,
+#   clients and connections) is loaded in a background thread as a module. While the first question is typed
+#   the agent gets ready, at worst the first answer waits for the rest of the loading.
+#   The scripts call it at the top, before their heavy imports, when they run as the main script
+#
+#   python bootstrap.py profile 12-star-wars-chatbot.py   (python -X importtime report of loading the script)
+#   python bootstrap.py startup 12-star-wars-chatbot.py   (time to the "> " prompt vs time to a loaded agent)
+
+
+class Lazy:
+    def __init__(self, factory, name=None):
+        self.factory = factory
+        self.name = name or getattr(factory, "__name__", "lazy")
+        self._lock = threading.Lock()
+        self._value = None
+        self._built = False
+        self._error = None
+
+    @property
+    def built(self):
+        return self._built
+
+    def get(self):
+        if not self._built:
+            with self._lock:
+                if not self._built:
+                    if self._error is not None:
+                        raise self._error
+                    try:
+                        self._value = self.factory()
+                    except BaseException as e:
+                        # A warm-up that failed fails the first use too, instead of building it again
+                        self._error = e
+                        raise
+                    self._built = True
+        return self._value
+
+    def warm_up(self):
+        def build():
+            try:
+                self.get()
+            except BaseException:
+                pass
+
+        threading.Thread(target=build, name=f"warm-up-{self.name}", daemon=True).start()
+        return self
+
+    def bind(self, method):
+        # A function calling the method of the object, that doesn't build it before the first call
+        # (like the func of a Tool: the client is created when the tool is used the first time)
+        def call(*args, **kwargs):
+            return getattr(self.get(), method)(*args, **kwargs)
+
+        return call
+
+    def __getattr__(self, name):
+        if name.startswith("_"):
+            raise AttributeError(name)
+        return getattr(self.get(), name)
+
+
+def load_script(path, name=None):
+    # Runs a script as a module: its `if __name__ == "__main__":` blocks don't run
+    name = name or "script_" + re.sub(r"\W", "_", os.path.splitext(os.path.basename(path))[0])
+    spec = importlib.util.spec_from_file_location(name, path)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+def run_chat(
+    path, chain="agent_executor", input_key="input", output_key="output", answer_prefix="Final Answer:", on_load=None,
+):
+    # on_load(module) runs once the script is loaded, before the first answer (not while the question is typed)
+    script = Lazy(lambda: load_script(path), name=os.path.basename(path)).warm_up()
+    printer = None
+    while True:
+        try:
+            q = input("> ")
+        except EOFError:
+            raise SystemExit(0)
+        # The first question waits for the script to be loaded, if it isn't yet
+        module = script.get()
+        if printer is None:
+            if on_load is not None:
+                on_load(module)
+            # The answer is printed while it's generated, with a line for each tool call (see streaming.py)
+            from streaming import StreamingPrinter
+            printer = StreamingPrinter(answer_prefix=answer_prefix)
+        printer.start()
+        response = getattr(module, chain).invoke({input_key: q}, config={"callbacks": [printer]})
+        printer.finish(response[output_key])
+
+
+# Reports
+
+IMPORTTIME_LINE = re.compile(r"import time:\s+(\d+) \|\s+(\d+) \|\s+(\S+)")
+
+
+def importtime(path):
+    # python -X importtime writes a line for every imported module on stderr: self and cumulative microseconds
+    code = f"import bootstrap; bootstrap.load_script({os.path.abspath(path)!r})"
+    start = time.perf_counter()
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", code], capture_output=True, text=True,
+        cwd=os.path.dirname(os.path.abspath(__file__)),
+    )
+    elapsed = time.perf_counter() - start
+    modules = []
+    for line in result.stderr.splitlines():
+        match = IMPORTTIME_LINE.match(line)
+        if match:
+            self_us, cumulative_us, name = match.groups()
+            modules.append((name, int(self_us), int(cumulative_us)))
+    return modules, elapsed, result
+
+
+def profile(path, top):
+    modules, elapsed, result = importtime(path)
+    if result.returncode != 0:
+        print(f"Loading {path} failed: {result.stderr.strip().splitlines()[-1]}")
+    imports_s = sum(module[1] for module in modules) / 1e6
+    print(f"{path}: loaded in {elapsed:.2f} s, {len(modules)} modules imported in {imports_s:.2f} s")
+
+    # Top level packages, by the time spent importing them (all their submodules)
+    packages = {}
+    for name, self_us, _ in modules:
+        package = name.split(".")[0]
+        packages[package] = packages.get(package, 0) + self_us
+    print(f"\nTop {top} packages by import time:")
+    for package, us in sorted(packages.items(), key=lambda item: -item[1])[:top]:
+        print(f"  {us / 1000:9.1f} ms  {package}")
+
+    print(f"\nTop {top} modules by self time:")
+    for name, self_us, cumulative_us in sorted(modules, key=lambda module: -module[1])[:top]:
+        print(f"  {self_us / 1000:9.1f} ms  (cumulative {cumulative_us / 1000:9.1f} ms)  {name}")
+
+
+def time_to_prompt(path):
+    # Starts the script and waits for the "> " prompt on its stdout
+    start = time.perf_counter()
+    process = subprocess.Popen(
+        [sys.executable, os.path.abspath(path)], stdin=subprocess.PIPE, stdout=subprocess.PIPE, stderr=subprocess.DEVNULL,
+        cwd=os.path.dirname(os.path.abspath(path)),
+    )
+    output = b""
+    try:
+        while not output.endswith(b"> "):
+            char = process.stdout.read(1)
+            if not char:
+                return None
+            output += char
+        return time.perf_counter() - start
+    finally:
+        process.kill()
+        process.wait()
+
+
+def startup(path, runs):
+    prompt_times = [time_to_prompt(path) for _ in range(runs)]
+    load_times = [importtime(path)[1] for _ in range(runs)]
+    if None in prompt_times:
+        print(f"{path} exited before showing the prompt")
+    else:
+        print(f'time to "> "           median {sorted(prompt_times)[runs // 2] * 1000:8.1f} ms')
+    print(f"time to a loaded agent median {sorted(load_times)[runs // 2] * 1000:8.1f} ms")
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    profile_parser = subparsers.add_parser("profile", help="python -X importtime report of loading a script")
+    profile_parser.add_argument("script")
+    profile_parser.add_argument("--top", type=int, default=15)
+    startup_parser = subparsers.add_parser("startup", help="Time to the prompt of a chatbot script")
+    startup_parser.add_argument("script")
+    startup_parser.add_argument("--runs", type=int, default=3)
+    args = parser.parse_args()
+
+    if args.command == "profile":
+        profile(args.script, args.top)
+    else:
+        startup(args.script, args.runs)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,286 @@
+import atexit
+import json
+import logging
+import os
+import queue
+import sqlite3
+import threading
+import time
+import uuid
+
+from dotenv import load_dotenv
+from langchain_core.chat_history import BaseChatMessageHistory, InMemoryChatMessageHistory
+from langchain_core.messages import message_to_dict, messages_from_dict
+
+# Persistent chat history, shared by processes
+#
+# The memories of 4-memory.py and 12-star-wars-chatbot.py only lived in RAM: a restart lost the conversation,
+# and two processes (like two workers of chat_server.py) couldn't share a session.
+# PersistentChatHistory is a chat message history (the `chat_memory` of a langchain memory) on top of a store:
+# - the store is an append-only log of messages: every message gets a sequence number (increasing in its session)
+#   and a unique id, nothing is overwritten or dropped
+# - writes don't block the conversation: the messages are queued and a background thread writes them in batches
+# - reads are lazy: only the last `last_n` messages of the session are loaded, the first time they are needed.
+#   After that, sync() (called once per turn by the memory, see summary_memory.py) only reads the messages added
+#   since the last one seen: the messages written by other processes serving the same session show up too.
+#   Only the last `last_n` messages are kept in RAM. The messages still queued in this process come last
+# - every message has an id (its unique id in the store), so the memory can tell them apart (see summary_memory.py)
+# Two stores: SqliteHistoryStore (embedded, a single file, WAL so several processes can use it)
+# and Neo4jHistoryStore, that keeps the messages in the movie graph database through the shared driver.
+#
+# CHAT_HISTORY_BACKEND (sqlite, neo4j or memory) and CHAT_HISTORY_PATH select the store from the .env file.
+
+load_dotenv()
+
+CHAT_HISTORY_BACKEND = os.getenv("CHAT_HISTORY_BACKEND", "sqlite")
+CHAT_HISTORY_PATH = os.getenv("CHAT_HISTORY_PATH", ".chat_history.sqlite3")
+
+logger = logging.getLogger(__name__)
+
+
+def _row(session_id, uid, created_at, message):
+    return {
+        "session_id": session_id, "uid": uid, "created_at": created_at, "data": json.dumps(message_to_dict(message)),
+    }
+
+
+class SqliteHistoryStore:
+    # load() and load_since() return the rows in order: [{"seq", "uid", "data"}]
+
+    def __init__(self, path=CHAT_HISTORY_PATH):
+        self.path = path
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        with self._conn:
+            if path != ":memory:":
+                self._conn.execute("PRAGMA journal_mode=WAL")
+            # The sequence is the autoincrement key: two messages with the same timestamp are both kept
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS chat_messages ("
+                " seq INTEGER PRIMARY KEY AUTOINCREMENT,"
+                " session_id TEXT NOT NULL,"
+                " uid TEXT NOT NULL UNIQUE,"
+                " created_at INTEGER NOT NULL,"
+                " data TEXT NOT NULL)"
+            )
+            self._conn.execute(
+                "CREATE INDEX IF NOT EXISTS chat_messages_session ON chat_messages (session_id, seq)"
+            )
+
+    def append(self, rows):
+        with self._lock, self._conn:
+            self._conn.executemany(
+                "INSERT INTO chat_messages (session_id, uid, created_at, data)"
+                " VALUES (:session_id, :uid, :created_at, :data)",
+                rows,
+            )
+
+    def _rows(self, query, params):
+        with self._lock:
+            rows = self._conn.execute(query, params).fetchall()
+        return [{"seq": seq, "uid": uid, "data": json.loads(data)} for seq, uid, data in rows]
+
+    def load(self, session_id, last_n):
+        return self._rows(
+            "SELECT seq, uid, data FROM ("
+            " SELECT seq, uid, data FROM chat_messages WHERE session_id = ? ORDER BY seq DESC LIMIT ?"
+            ") ORDER BY seq",
+            (session_id, last_n),
+        )
+
+    def load_since(self, session_id, seq):
+        return self._rows(
+            "SELECT seq, uid, data FROM chat_messages WHERE session_id = ? AND seq > ? ORDER BY seq", (session_id, seq)
+        )
+
+    def clear(self, session_id):
+        with self._lock, self._conn:
+            self._conn.execute("DELETE FROM chat_messages WHERE session_id = ?", (session_id,))
+
+
+class Neo4jHistoryStore:
+    # (:ChatSession {id, seq})-[:HAS_MESSAGE]->(:ChatMessage {session_id, seq, uid, created_at, data})
+    # The labels don't clash with the movie graph, and the index makes loading the last messages cheap.
+    # The sequence is a counter on the session node: the writes of a session lock it, so the numbers are unique
+    APPEND_QUERY = """
+    UNWIND $rows AS row
+    MERGE (s:ChatSession {id: row.session_id})
+    SET s.seq = coalesce(s.seq, 0) + 1
+    CREATE (s)-[:HAS_MESSAGE]->(:ChatMessage {
+        session_id: row.session_id, seq: s.seq, uid: row.uid, created_at: row.created_at, data: row.data
+    })
+    """
+    LOAD_QUERY = """
+    MATCH (m:ChatMessage {session_id: $session_id})
+    WITH m ORDER BY m.seq DESC LIMIT $last_n
+    RETURN m.seq AS seq, m.uid AS uid, m.data AS data
+    ORDER BY seq
+    """
+    LOAD_SINCE_QUERY = """
+    MATCH (m:ChatMessage {session_id: $session_id})
+    WHERE m.seq > $seq
+    RETURN m.seq AS seq, m.uid AS uid, m.data AS data
+    ORDER BY seq
+    """
+    CLEAR_QUERY = "MATCH (s:ChatSession {id: $session_id}) OPTIONAL MATCH (s)-[:HAS_MESSAGE]->(m) DETACH DELETE s, m"
+    INDEX_QUERIES = [
+        "CREATE CONSTRAINT chat_session_id IF NOT EXISTS FOR (s:ChatSession) REQUIRE s.id IS UNIQUE",
+        "CREATE CONSTRAINT chat_message_uid IF NOT EXISTS FOR (m:ChatMessage) REQUIRE m.uid IS UNIQUE",
+        "CREATE INDEX chat_message_session IF NOT EXISTS FOR (m:ChatMessage) ON (m.session_id, m.seq)",
+    ]
+
+    def __init__(self, pool=None):
+        from neo4j_pool import get_pool
+
+        self.pool = pool or get_pool()
+        for query in self.INDEX_QUERIES:
+            self.pool.query(query, write=True)
+
+    def append(self, rows):
+        self.pool.query(self.APPEND_QUERY, {"rows": rows}, write=True)
+
+    def _rows(self, query, params):
+        return [{"seq": row["seq"], "uid": row["uid"], "data": json.loads(row["data"])}
+                for row in self.pool.query(query, params)]
+
+    def load(self, session_id, last_n):
+        return self._rows(self.LOAD_QUERY, {"session_id": session_id, "last_n": last_n})
+
+    def load_since(self, session_id, seq):
+        return self._rows(self.LOAD_SINCE_QUERY, {"session_id": session_id, "seq": seq})
+
+    def clear(self, session_id):
+        self.pool.query(self.CLEAR_QUERY, {"session_id": session_id}, write=True)
+
+
+class BatchWriter:
+    # Background thread that writes the queued messages of every session, at most `batch_size` per write,
+    # waiting up to `flush_interval` seconds for a batch to fill
+    def __init__(self, store, batch_size=100, flush_interval=0.5):
+        self.store = store
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self._queue = queue.Queue()
+        self._thread = threading.Thread(target=self._run, name="chat-history-writer", daemon=True)
+        self._thread.start()
+        # Whatever is still queued is written before the process exits
+        atexit.register(self.flush)
+
+    def put(self, rows):
+        for row in rows:
+            self._queue.put(row)
+
+    def _run(self):
+        while True:
+            batch = [self._queue.get()]
+            deadline = time.monotonic() + self.flush_interval
+            while len(batch) < self.batch_size:
+                try:
+                    batch.append(self._queue.get(timeout=max(0, deadline - time.monotonic())))
+                except queue.Empty:
+                    break
+            try:
+                self.store.append(batch)
+            except Exception:
+                logger.exception("Could not save %d chat messages", len(batch))
+            finally:
+                for _ in batch:
+                    self._queue.task_done()
+
+    def flush(self):
+        self._queue.join()
+
+
+class PersistentChatHistory(BaseChatMessageHistory):
+    def __init__(self, session_id, store, writer=None, last_n=50):
+        self.session_id = session_id
+        self.store = store
+        self.writer = writer
+        self.last_n = last_n
+        self._lock = threading.Lock()
+        # Messages read from the store, and the sequence number of the last one
+        self._stored = None
+        self._last_seq = 0
+        # Messages added here and not read back from the store yet: {uid: message}
+        self._pending = {}
+
+    def _read(self, rows):
+        for row in rows:
+            # A message of this process that was written meanwhile: now it has its place in the sequence
+            self._pending.pop(row["uid"], None)
+            message = messages_from_dict([row["data"]])[0]
+            message.id = message.id or row["uid"]
+            self._stored.append(message)
+            self._last_seq = row["seq"]
+        # Bounded: the oldest messages go, and the window starts from a human message
+        del self._stored[:-self.last_n]
+        while self._stored and self._stored[0].type != "human":
+            self._stored.pop(0)
+
+    def _load(self):
+        if self._stored is None:
+            # First use: only the end of the conversation
+            self._stored = []
+            self._read(self.store.load(self.session_id, self.last_n))
+
+    def sync(self):
+        # Reads what was added since the last read, also by other processes serving the same session
+        with self._lock:
+            if self._stored is None:
+                self._load()
+            else:
+                self._read(self.store.load_since(self.session_id, self._last_seq))
+
+    @property
+    def messages(self):
+        # No query after the first load: the new messages of other processes come with sync()
+        with self._lock:
+            self._load()
+            return self._stored + list(self._pending.values())
+
+    def add_messages(self, messages):
+        rows = []
+        with self._lock:
+            for message in messages:
+                uid = uuid.uuid4().hex
+                if message.id is None:
+                    message = message.copy(update={"id": uid})
+                self._pending[uid] = message
+                rows.append(_row(self.session_id, uid, time.time_ns(), message))
+        if self.writer is not None:
+            self.writer.put(rows)
+        else:
+            self.store.append(rows)
+
+    def clear(self):
+        if self.writer is not None:
+            self.writer.flush()
+        self.store.clear(self.session_id)
+        with self._lock:
+            self._stored = []
+            self._last_seq = 0
+            self._pending = {}
+
+
+_stores = {}
+_stores_lock = threading.Lock()
+
+
+def _store_and_writer(backend, path):
+    # One store (connection) and one writer thread per backend, shared by all the sessions of the process
+    key = (backend, path if backend == "sqlite" else None)
+    with _stores_lock:
+        if key not in _stores:
+            store = SqliteHistoryStore(path) if backend == "sqlite" else Neo4jHistoryStore()
+            _stores[key] = (store, BatchWriter(store))
+        return _stores[key]
+
+
+def open_chat_history(session_id, backend=None, path=None, last_n=50):
+    backend = backend or CHAT_HISTORY_BACKEND
+    if backend == "memory":
+        return InMemoryChatMessageHistory()
+    if backend not in ("sqlite", "neo4j"):
+        raise ValueError(f"Unknown chat history backend: {backend}")
+    store, writer = _store_and_writer(backend, path or CHAT_HISTORY_PATH)
+    return PersistentChatHistory(session_id, store, writer=writer, last_n=last_n)
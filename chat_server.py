@@ -0,0 +1,329 @@
+import argparse
+import asyncio
+import json
+import logging
+import time
+from collections import OrderedDict
+
+from aiohttp import WSMsgType, web
+
+from bootstrap import load_script
+from chat_history_store import open_chat_history
+from streaming import StreamingPrinter
+from summary_memory import RollingSummaryMemory
+
+# Multi-session chat server for the agents of 8-agent-with-retriever.py and 12-star-wars-chatbot.py
+#
+# The scripts are single-user stdin loops with one global memory. Here the same agent executor is served over
+# HTTP and WebSocket by an asyncio server (aiohttp), to many users at once:
+# - every session (session_id) has its own memory, the agent is invoked with that session's chat_history
+#   (persisted in the store of chat_history_store.py). It's a RollingSummaryMemory (summary_memory.py): the prompt
+#   stays bounded however long the session, the older messages are summarized by `llm` in background.
+#   The memory reads and writes the history store: it runs in a worker thread, not on the event loop
+# - at most `session_concurrency` requests per session run at the same time (1: the turns of a conversation are
+#   ordered), and at most `max_concurrency` in the whole server
+# - backpressure: when `max_pending` requests are already running or waiting, new ones are refused right away
+#   with 503 and a Retry-After, instead of queueing forever
+# - cancellation: a request is an asyncio task running agent_executor.ainvoke. It is cancelled when the client
+#   disconnects, when it takes longer than `request_timeout`, when the WebSocket sends {"type": "cancel"},
+#   or when the server shuts down. The cancellation reaches the LLM calls, which are awaited
+#   (sync tools run in threads, and finish in background)
+#
+#   python chat_server.py --agent 12 --port 8080
+#   curl -X POST localhost:8080/chat -d '{"session_id": "luke", "message": "Who is Yoda?"}'
+#
+# Over WebSocket (/ws?session_id=luke) the client sends {"message": "..."} and receives the progress of the tools
+# and the tokens of the answer as they are generated ({"type": "delta"}), then {"type": "answer"}.
+# Note: the scripts are imported as they are, with their module-level objects:
+# - in 8-agent-with-retriever.py the "Movie Chat" tool has its own memory, shared by every session
+# - 12-star-wars-chatbot.py builds a SemanticHistoryMemory on the fixed "star-wars" session (CHAT_SESSION_ID),
+#   used by its agent_executor and chat_chain. The server replaces the memory of the executor, but that history is
+#   still opened on import, and chat_chain (if a tool used it) would write every session's turns into "star-wars"
+
+logger = logging.getLogger(__name__)
+
+AGENT_SCRIPTS = {
+    "8": "8-agent-with-retriever.py",
+    "12": "12-star-wars-chatbot.py",
+}
+
+
+class ServerBusy(Exception):
+    pass
+
+
+class Session:
+    def __init__(self, session_id, concurrency, memory):
+        self.id = session_id
+        self.memory = memory
+        self.semaphore = asyncio.Semaphore(concurrency)
+        self.tasks = set()
+        self.last_used = time.monotonic()
+
+
+class _QueueWriter:
+    # File-like object for StreamingPrinter: the callbacks run in worker threads, the text goes to an asyncio queue
+    def __init__(self, loop, queue):
+        self.loop = loop
+        self.queue = queue
+
+    def write(self, text):
+        self.loop.call_soon_threadsafe(self.queue.put_nowait, text)
+
+    def flush(self):
+        pass
+
+
+class ChatServer:
+    def __init__(
+        self,
+        agent_executor,
+        llm,
+        max_concurrency=16,
+        session_concurrency=1,
+        max_pending=64,
+        request_timeout=120.0,
+        max_sessions=1000,
+        session_ttl=60 * 60,
+        answer_prefix="Final Answer:",
+        history_factory=open_chat_history,
+        memory_tokens=1000,
+    ):
+        # Sessions have their own memory: the one of the script is not used
+        # (a new executor with the same fields, pydantic's copy() would drop the excluded ones like callbacks)
+        self.agent = type(agent_executor)(**{
+            name: getattr(agent_executor, name) for name in agent_executor.__fields__ if name != "memory"
+        })
+        self.semaphore = asyncio.Semaphore(max_concurrency)
+        self.session_concurrency = session_concurrency
+        self.max_pending = max_pending
+        self.request_timeout = request_timeout
+        self.max_sessions = max_sessions
+        self.session_ttl = session_ttl
+        self.answer_prefix = answer_prefix
+        # The histories are in a shared store (see chat_history_store.py): several server processes can serve
+        # the same sessions, and they survive a restart
+        self.history_factory = history_factory
+        # The model that writes the summaries of the sessions, and the tokens of their recent messages in the prompt
+        self.llm = llm
+        self.memory_tokens = memory_tokens
+        self.sessions = OrderedDict()
+        self.pending = 0
+        self.completed = 0
+        self.rejected = 0
+        self.cancelled = 0
+
+    def memory(self, session_id):
+        return RollingSummaryMemory(
+            llm=self.llm,
+            max_token_limit=self.memory_tokens,
+            chat_memory=self.history_factory(session_id),
+            memory_key="chat_history",
+            return_messages=True,
+        )
+
+    def session(self, session_id):
+        session = self.sessions.pop(session_id, None) or Session(
+            session_id, self.session_concurrency, self.memory(session_id)
+        )
+        session.last_used = time.monotonic()
+        self.sessions[session_id] = session
+        # Least recently used sessions go first, never the ones with requests in flight
+        now = time.monotonic()
+        for old in list(self.sessions.values()):
+            if len(self.sessions) <= self.max_sessions and now - old.last_used < self.session_ttl:
+                break
+            if not old.tasks and old is not session:
+                del self.sessions[old.id]
+        return session
+
+    async def ask(self, session_id, message, callbacks=None):
+        if self.pending >= self.max_pending:
+            self.rejected += 1
+            raise ServerBusy()
+        session = self.session(session_id)
+        task = asyncio.current_task()
+        self.pending += 1
+        session.tasks.add(task)
+        try:
+            loop = asyncio.get_running_loop()
+            async with session.semaphore, self.semaphore:
+                # The history store is read (and written) in a thread: the event loop keeps serving other sessions
+                variables = await loop.run_in_executor(None, session.memory.load_memory_variables, {"input": message})
+                history = variables["chat_history"]
+                response = await asyncio.wait_for(
+                    self.agent.ainvoke(
+                        {"input": message, "chat_history": history}, config={"callbacks": callbacks or []}
+                    ),
+                    self.request_timeout,
+                )
+            # Only completed turns get into the memory
+            await loop.run_in_executor(
+                None, session.memory.save_context, {"input": message}, {"output": response["output"]}
+            )
+            self.completed += 1
+            return response["output"]
+        except asyncio.CancelledError:
+            self.cancelled += 1
+            raise
+        finally:
+            self.pending -= 1
+            session.tasks.discard(task)
+
+    # HTTP
+
+    async def handle_chat(self, request):
+        try:
+            body = await request.json()
+        except ValueError:
+            raise web.HTTPBadRequest(text="The body is not valid JSON")
+        if not isinstance(body, dict):
+            raise web.HTTPBadRequest(text="The body must be a JSON object")
+        session_id, message = body.get("session_id"), body.get("message")
+        if not session_id or not message:
+            raise web.HTTPBadRequest(text="session_id and message are required")
+        try:
+            output = await self.ask(session_id, message)
+        except ServerBusy:
+            raise web.HTTPServiceUnavailable(text="Too many requests in progress", headers={"Retry-After": "1"})
+        except asyncio.TimeoutError:
+            raise web.HTTPGatewayTimeout(text="The agent took too long to answer")
+        return web.json_response({"session_id": session_id, "output": output})
+
+    async def handle_delete_session(self, request):
+        session = self.sessions.pop(request.match_info["session_id"], None)
+        for task in session.tasks if session else ():
+            task.cancel()
+        return web.json_response({"deleted": session is not None})
+
+    async def handle_stats(self, request):
+        return web.json_response({
+            "sessions": len(self.sessions),
+            "pending": self.pending,
+            "completed": self.completed,
+            "rejected": self.rejected,
+            "cancelled": self.cancelled,
+        })
+
+    # WebSocket
+
+    async def handle_ws(self, request):
+        session_id = request.query.get("session_id")
+        if not session_id:
+            raise web.HTTPBadRequest(text="session_id is required")
+        ws = web.WebSocketResponse(heartbeat=30)
+        await ws.prepare(request)
+        current = None
+
+        async for msg in ws:
+            if msg.type != WSMsgType.TEXT:
+                continue
+            try:
+                data = json.loads(msg.data)
+            except ValueError:
+                data = None
+            if not isinstance(data, dict):
+                # A bad frame is answered, the connection stays open
+                await ws.send_json({"type": "error", "error": "The message is not a JSON object"})
+                continue
+            if data.get("type") == "cancel":
+                if current and not current.done():
+                    current.cancel()
+                continue
+            if current and not current.done():
+                await ws.send_json({"type": "error", "error": "A message is already in progress"})
+                continue
+            current = asyncio.create_task(self._answer_ws(ws, session_id, data.get("message", "")))
+
+        # The client went away: nothing to answer to
+        if current and not current.done():
+            current.cancel()
+        return ws
+
+    async def _answer_ws(self, ws, session_id, message):
+        loop = asyncio.get_running_loop()
+        queue = asyncio.Queue()
+        printer = StreamingPrinter(
+            answer_prefix=self.answer_prefix, enabled=True, show_timing=False, file=_QueueWriter(loop, queue),
+        )
+
+        async def forward():
+            # The tokens and the tool progress lines, in order, until the None put at the end of the answer
+            while (text := await queue.get()) is not None:
+                await ws.send_json({"type": "delta", "text": text})
+
+        forwarder = asyncio.create_task(forward())
+        try:
+            output = await self.ask(session_id, message, callbacks=[printer])
+            loop.call_soon_threadsafe(queue.put_nowait, None)
+            await forwarder
+            await ws.send_json({"type": "answer", "output": output, "streamed": printer.streamed})
+        except ServerBusy:
+            await ws.send_json({"type": "error", "error": "busy", "retry_after": 1})
+        except asyncio.TimeoutError:
+            await ws.send_json({"type": "error", "error": "timeout"})
+        except asyncio.CancelledError:
+            if not ws.closed:
+                await ws.send_json({"type": "cancelled"})
+        except Exception as e:
+            # Any other failure of the agent (LLM, tools, store): the client gets an answer instead of waiting forever
+            logger.exception("Could not answer session %s", session_id)
+            if not ws.closed:
+                await ws.send_json({"type": "error", "error": "internal", "message": str(e)})
+        finally:
+            forwarder.cancel()
+
+    async def on_shutdown(self, app):
+        # Graceful shutdown: the requests still running are cancelled, their clients get an error
+        for session in self.sessions.values():
+            for task in session.tasks:
+                task.cancel()
+
+    def app(self):
+        app = web.Application()
+        app.add_routes([
+            web.post("/chat", self.handle_chat),
+            web.delete("/sessions/{session_id}", self.handle_delete_session),
+            web.get("/stats", self.handle_stats),
+            web.get("/ws", self.handle_ws),
+        ])
+        app.on_shutdown.append(self.on_shutdown)
+        return app
+
+
+def load_agent_executor(name):
+    # (agent executor, LLM of the script for the summaries of the sessions)
+    # Runs the chatbot script as a module (its REPL only starts when it's the main script, see bootstrap.py)
+    if name == "stub":
+        from agent_stub import StubLLM, build_stub_agent
+        return build_stub_agent(), StubLLM()
+    script = load_script(AGENT_SCRIPTS[name], f"agent_{name}")
+    return script.agent_executor, script.llm
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--agent", choices=[*AGENT_SCRIPTS, "stub"], default="12")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8080)
+    parser.add_argument("--max-concurrency", type=int, default=16)
+    parser.add_argument("--max-pending", type=int, default=64)
+    parser.add_argument("--timeout", type=float, default=120.0)
+    args = parser.parse_args()
+
+    agent_executor, llm = load_agent_executor(args.agent)
+
+    async def make_app():
+        # The semaphores must be created inside the server's event loop
+        server = ChatServer(
+            agent_executor, llm, max_concurrency=args.max_concurrency, max_pending=args.max_pending,
+            request_timeout=args.timeout,
+        )
+        return server.app()
+
+    # handler_cancellation: the request task is cancelled when its client disconnects
+    web.run_app(make_app(), host=args.host, port=args.port, handler_cancellation=True)
+
+
+if __name__ == "__main__":
+    main()
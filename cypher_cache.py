@@ -0,0 +1,134 @@
+import hashlib
+import re
+import sqlite3
+import threading
+import time
+
+import numpy as np
+
+# Cache of question -> Cypher pairs for the Cypher QA chains
+#
+# Generating Cypher is a full LLM call, and it isn't even deterministic (see the comments in 9-cypher-chain.py:
+# the same question gave two different queries, one of them broken).
+# So once a generated query ran fine and returned something, it's stored and reused for the same question:
+# no generation, straight to graph.query.
+# - Questions are normalized (case, whitespace, final punctuation) before the lookup
+# - The key also contains a fingerprint of the schema: if the graph changes, old queries are not reused
+# - Optionally, an embedding provider can be given: a question that is not found as is, is compared
+#   to the cached ones and the query of the most similar one is reused, if similar enough (paraphrases).
+#   Embeddings of "movies with Tom Hanks" and "movies with Tom Cruise" are very close, but the query has the name
+#   in it: a similar question is reused only if the string literals of the query are in the new question too,
+#   and both questions have the same numbers
+# get() returns the query and the question it was cached under: that's the entry to invalidate if it fails
+
+
+def normalize_question(question):
+    question = re.sub(r"\s+", " ", question).strip().casefold()
+    return question.rstrip("?!. ")
+
+
+def cypher_literals(cypher):
+    # The string literals of a query, like "Tom Hanks" in {name: "Tom Hanks"}
+    literals = re.findall(r"'((?:[^'\\]|\\.)*)'|\"((?:[^\"\\]|\\.)*)\"", cypher)
+    return [re.sub(r"\\(.)", r"\1", a or b) for a, b in literals]
+
+
+def same_entities(question, cached_question, cypher):
+    # Whether the query of cached_question also answers question, as far as literals go
+    if re.findall(r"\d+", question) != re.findall(r"\d+", cached_question):
+        return False
+    return all(normalize_question(literal) in question for literal in cypher_literals(cypher))
+
+
+def schema_fingerprint(schema):
+    return hashlib.sha256(schema.encode("utf-8")).hexdigest()[:16]
+
+
+class CypherCache:
+    def __init__(self, path=":memory:", embeddings=None, similarity_threshold=0.95):
+        self.path = path
+        self.embeddings = embeddings
+        self.similarity_threshold = similarity_threshold
+        self.hits = 0
+        self.semantic_hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        with self._conn:
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS cypher ("
+                " schema TEXT NOT NULL,"
+                " question TEXT NOT NULL,"
+                " cypher TEXT NOT NULL,"
+                " embedding BLOB,"
+                " created_at REAL NOT NULL,"
+                " PRIMARY KEY (schema, question))"
+            )
+        # Question embeddings of each schema, loaded once for the similarity lookup
+        self._vectors = {}
+
+    def _load_vectors(self, schema):
+        if schema not in self._vectors:
+            rows = self._conn.execute(
+                "SELECT question, embedding FROM cypher WHERE schema = ? AND embedding IS NOT NULL", (schema,)
+            ).fetchall()
+            questions = [question for question, _ in rows]
+            matrix = np.array([np.frombuffer(blob, dtype=np.float32) for _, blob in rows], dtype=np.float32)
+            self._vectors[schema] = (questions, matrix)
+        return self._vectors[schema]
+
+    def _embed(self, question):
+        vector = np.asarray(self.embeddings.embed_query(question), dtype=np.float32)
+        return vector / (np.linalg.norm(vector) or 1)
+
+    def get(self, question, schema):
+        fingerprint = schema_fingerprint(schema)
+        normalized = normalize_question(question)
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT cypher FROM cypher WHERE schema = ? AND question = ?", (fingerprint, normalized)
+            ).fetchone()
+            if row:
+                self.hits += 1
+                return row[0], normalized
+
+            if self.embeddings is not None:
+                questions, matrix = self._load_vectors(fingerprint)
+                if len(questions):
+                    scores = matrix @ self._embed(normalized)
+                    best = int(np.argmax(scores))
+                    if scores[best] >= self.similarity_threshold:
+                        [cypher] = self._conn.execute(
+                            "SELECT cypher FROM cypher WHERE schema = ? AND question = ?",
+                            (fingerprint, questions[best]),
+                        ).fetchone()
+                        if same_entities(normalized, questions[best], cypher):
+                            self.semantic_hits += 1
+                            return cypher, questions[best]
+
+            self.misses += 1
+            return None, None
+
+    def put(self, question, schema, cypher):
+        # Only call this for validated queries: queries that ran and returned something
+        fingerprint = schema_fingerprint(schema)
+        normalized = normalize_question(question)
+        vector = self._embed(normalized) if self.embeddings is not None else None
+        with self._lock, self._conn:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO cypher (schema, question, cypher, embedding, created_at) VALUES (?, ?, ?, ?, ?)",
+                (fingerprint, normalized, cypher, vector.tobytes() if vector is not None else None, time.time()),
+            )
+            self._vectors.pop(fingerprint, None)
+
+    def invalidate(self, question, schema):
+        # A cached query that started failing (or returning nothing) is dropped
+        with self._lock, self._conn:
+            self._conn.execute(
+                "DELETE FROM cypher WHERE schema = ? AND question = ?",
+                (schema_fingerprint(schema), normalize_question(question)),
+            )
+            self._vectors.pop(schema_fingerprint(schema), None)
+
+    def __len__(self):
+        return self._conn.execute("SELECT COUNT(*) FROM cypher").fetchone()[0]
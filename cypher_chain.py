@@ -0,0 +1,129 @@
+from typing import Any, Dict, List, Optional
+
+from langchain.chains.graph_qa.cypher import INTERMEDIATE_STEPS_KEY, GraphCypherQAChain, extract_cypher
+from langchain_core.callbacks import CallbackManagerForChainRun
+
+from schema_cache import compact_schema
+
+# GraphCypherQAChain with the extra stages used by the Cypher lessons (9, 10 and 11)
+#
+# The original chain always does: generate Cypher with the LLM -> graph.query -> answer with the LLM.
+# Here the same flow is split in steps that can be extended:
+# - cypher_cache: a question already answered reuses its validated query instead of generating it (cypher_cache.py)
+# - use_compact_schema: the generation prompt gets only the part of the schema relevant to the question (schema_cache.py)
+# - cypher_validator: generated queries are checked (and repaired) before they reach the database (cypher_validation.py)
+# - result_guard: results are capped (LIMIT injection, streaming, row/byte caps) and summarized (cypher_guardrails.py)
+# - intent_router: questions with a known shape run a templated query with parameters, no LLM involved (intent_router.py)
+# - example_store: the {examples} of the prompt are the few-shot examples most similar to the question (cypher_examples.py)
+
+
+class CypherQAChain(GraphCypherQAChain):
+    cypher_cache: Optional[Any] = None
+    """Optional CypherCache of validated question -> Cypher pairs"""
+    use_compact_schema: bool = False
+    """Whether to render only the labels and relationships relevant to the question in the prompt"""
+    cypher_validator: Optional[Any] = None
+    """Optional CypherValidator run between generation and execution"""
+    result_guard: Optional[Any] = None
+    """Optional ResultGuard that caps and summarizes the query results"""
+    intent_router: Optional[Any] = None
+    """Optional IntentRouter tried before the cache and the LLM"""
+    example_store: Optional[Any] = None
+    """Optional CypherExampleStore used to fill the {examples} variable of the Cypher prompt"""
+    example_k: int = 3
+    """Number of few-shot examples put in the prompt"""
+    learn_examples: bool = False
+    """Whether generated queries that ran and returned rows are added to the example store"""
+
+    def schema_for(self, question):
+        if self.use_compact_schema:
+            return compact_schema(self.graph.get_structured_schema, question)
+        return self.graph_schema
+
+    def generate_cypher(self, question, callbacks):
+        inputs = {"question": question, "schema": self.schema_for(question)}
+        if self.example_store is not None and "examples" in self.cypher_generation_chain.prompt.input_variables:
+            inputs["examples"] = self.example_store.format(self.example_store.select(question, k=self.example_k))
+        generated_cypher = self.cypher_generation_chain.run(inputs, callbacks=callbacks)
+        # Extract Cypher code if it is wrapped in backticks
+        generated_cypher = extract_cypher(generated_cypher)
+        if self.cypher_query_corrector:
+            generated_cypher = self.cypher_query_corrector(generated_cypher)
+        return generated_cypher
+
+    def run_cypher(self, cypher, params=None):
+        if self.result_guard is not None:
+            return self.result_guard.run(self.graph, cypher, params)
+        return self.graph.query(cypher, params or {})[: self.top_k]
+
+    def _call(
+        self,
+        inputs: Dict[str, Any],
+        run_manager: Optional[CallbackManagerForChainRun] = None,
+    ) -> Dict[str, Any]:
+        _run_manager = run_manager or CallbackManagerForChainRun.get_noop_manager()
+        callbacks = _run_manager.get_child()
+        question = inputs[self.input_key]
+        intermediate_steps: List = []
+
+        route = self.intent_router.route(question) if self.intent_router is not None else None
+        cached_cypher = cached_question = None
+        if route is None and self.cypher_cache is not None:
+            # cached_question is the question the query was stored for (this one, or a paraphrase of it)
+            cached_cypher, cached_question = self.cypher_cache.get(question, self.graph_schema)
+        params = {}
+        if route is not None:
+            _run_manager.on_text(f"Routed Cypher ({route.intent}, {route.params}):", end="\n", verbose=self.verbose)
+            generated_cypher, params = route.cypher, route.params
+        elif cached_cypher:
+            _run_manager.on_text("Cached Cypher:", end="\n", verbose=self.verbose)
+            generated_cypher = cached_cypher
+        else:
+            generated_cypher = self.generate_cypher(question, callbacks)
+            if self.cypher_validator is not None:
+                generated_cypher, errors = self.cypher_validator.validate(
+                    generated_cypher, question, self.schema_for(question), callbacks=callbacks,
+                    run_manager=_run_manager if self.verbose else None,
+                )
+                if errors:
+                    # Still invalid after the repairs: it never gets to the database
+                    _run_manager.on_text(f"Invalid Cypher: {'; '.join(errors)}", end="\n", verbose=self.verbose)
+                    intermediate_steps.append({"invalid_query": generated_cypher, "errors": errors})
+                    generated_cypher = ""
+            _run_manager.on_text("Generated Cypher:", end="\n", verbose=self.verbose)
+        _run_manager.on_text(generated_cypher or "", color="green", end="\n", verbose=self.verbose)
+        intermediate_steps.append({"query": generated_cypher, "params": params} if route else {"query": generated_cypher})
+
+        # Generated Cypher can be empty if the query corrector identifies an invalid schema
+        try:
+            context = self.run_cypher(generated_cypher, params) if generated_cypher else []
+        except Exception:
+            if cached_cypher:
+                self.cypher_cache.invalidate(cached_question, self.graph_schema)
+            raise
+
+        # Only queries that ran and returned something are worth reusing
+        # (routed queries come from templates already: nothing to cache or learn from them)
+        if generated_cypher and route is None:
+            if self.cypher_cache is not None:
+                if context and not cached_cypher:
+                    self.cypher_cache.put(question, self.graph_schema, generated_cypher)
+                elif not context and cached_cypher:
+                    self.cypher_cache.invalidate(cached_question, self.graph_schema)
+            if self.example_store is not None and self.learn_examples and context and not cached_cypher:
+                self.example_store.add(question, generated_cypher)
+
+        if self.return_direct:
+            final_result = context
+        else:
+            _run_manager.on_text("Full Context:", end="\n", verbose=self.verbose)
+            _run_manager.on_text(str(context), color="green", end="\n", verbose=self.verbose)
+            intermediate_steps.append({"context": context})
+
+            result = self.qa_chain({"question": question, "context": context}, callbacks=callbacks)
+            final_result = result[self.qa_chain.output_key]
+
+        chain_result: Dict[str, Any] = {self.output_key: final_result}
+        if self.return_intermediate_steps:
+            chain_result[INTERMEDIATE_STEPS_KEY] = intermediate_steps
+        return chain_result
@@ -0,0 +1,101 @@
+import json
+import os
+import threading
+
+import numpy as np
+
+from cypher_cache import normalize_question
+
+# Dynamic few-shot examples for the Cypher generation prompt
+#
+# 11-cypher-chain-few-shots.py had a single example hardcoded in the template. Adding more examples there
+# means paying for all of them in every prompt. Here the examples are in a store with an embedding index,
+# and for each question only the `k` most similar ones are put in the prompt: the prompt size stays the same
+# however many examples there are.
+# The store can grow: queries generated by the chain that ran and returned something are added to it
+# (and saved in a JSONL file), so the next similar questions get a real, working example.
+
+SEED_EXAMPLES = [
+    {
+        "question": "Find movies and genres",
+        "cypher": "MATCH (m:Movie)-[:IN_GENRE]->(g)\nRETURN m.title, g.name",
+    },
+    {
+        "question": "What role did Tom Hanks play in Toy Story?",
+        "cypher": "MATCH (a:Actor {name: 'Tom Hanks'})-[r:ACTED_IN]->(m:Movie {title: 'Toy Story'})\nRETURN r.role",
+    },
+    {
+        "question": "How many movies has Tom Hanks acted in?",
+        "cypher": "MATCH (a:Actor {name: 'Tom Hanks'})-[:ACTED_IN]->(m:Movie)\nRETURN count(m)",
+    },
+    {
+        "question": "Who directed The Matrix?",
+        "cypher": "MATCH (d:Director)-[:DIRECTED]->(m:Movie {title: 'Matrix, The'})\nRETURN d.name",
+    },
+    {
+        "question": "Which actors played in both The Matrix and Speed?",
+        "cypher": "MATCH (a:Actor)-[:ACTED_IN]->(:Movie {title: 'Matrix, The'})\n"
+                  "MATCH (a)-[:ACTED_IN]->(:Movie {title: 'Speed'})\nRETURN a.name",
+    },
+    {
+        "question": "What are the highest rated comedies?",
+        "cypher": "MATCH (m:Movie)-[:IN_GENRE]->(:Genre {name: 'Comedy'})\n"
+                  "WHERE m.imdbRating IS NOT NULL\nRETURN m.title, m.imdbRating\nORDER BY m.imdbRating DESC\nLIMIT 10",
+    },
+]
+
+
+class CypherExampleStore:
+    def __init__(self, embeddings, path=None, seed=SEED_EXAMPLES):
+        self.embeddings = embeddings
+        self.path = path
+        self.examples = list(seed)
+        if path and os.path.exists(path):
+            with open(path) as f:
+                self.examples += [json.loads(line) for line in f if line.strip()]
+        self._questions = {normalize_question(example["question"]) for example in self.examples}
+        self._lock = threading.Lock()
+        # All the examples are embedded with a single batch request (none without examples)
+        questions = [e["question"] for e in self.examples]
+        self._matrix = self._normalize(self.embeddings.embed_documents(questions) if questions else [])
+
+    @staticmethod
+    def _normalize(vectors):
+        if not len(vectors):
+            # reshape(0, -1) can't guess the dimensions: the first added example sets them
+            return np.zeros((0, 0), dtype=np.float32)
+        matrix = np.asarray(vectors, dtype=np.float32).reshape(len(vectors), -1)
+        norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+        norms[norms == 0] = 1
+        return matrix / norms
+
+    def select(self, question, k=3):
+        if not self.examples:
+            return []
+        query = self._normalize([self.embeddings.embed_query(question)])[0]
+        with self._lock:
+            scores = self._matrix @ query
+            best = np.argsort(-scores)[:k]
+            return [self.examples[i] for i in best]
+
+    def add(self, question, cypher):
+        normalized = normalize_question(question)
+        if normalized in self._questions:
+            return False
+        example = {"question": question, "cypher": cypher}
+        vector = self._normalize([self.embeddings.embed_query(question)])
+        with self._lock:
+            self.examples.append(example)
+            self._questions.add(normalized)
+            self._matrix = np.vstack([self._matrix, vector]) if len(self._matrix) else vector
+            if self.path:
+                with open(self.path, "a") as f:
+                    f.write(json.dumps(example) + "\n")
+        return True
+
+    @staticmethod
+    def format(examples):
+        return "\n\n".join(f"{example['question']}:\n{example['cypher']}" for example in examples)
+
+    def __len__(self):
+        return len(self.examples)
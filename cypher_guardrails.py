@@ -0,0 +1,130 @@
+import json
+import re
+from collections import Counter
+
+# Guardrails on the size of the results of generated Cypher queries
+#
+# A query like the few-shot example of 11-cypher-chain-few-shots.py
+#   MATCH (m:Movie)-[:IN_GENRE]->(g) RETURN m.title, g.name
+# returns every movie of the database. GraphCypherQAChain reads the whole result in Python (graph.query
+# materializes a list) and only then keeps the first top_k rows. ResultGuard instead:
+# - injects a LIMIT in the query (or lowers the one the LLM wrote), so the database does less work
+# - streams the records from the neo4j driver with a small fetch size, and stops at a row or byte cap
+# - when the cap is hit, appends a summary of what was read (how many rows were summarized and listed,
+#   whether the result was cut, most common values per column),
+#   so the answer LLM knows the result was cut and still gets an idea of the whole
+
+LIMIT_KEYWORD = re.compile(r"(?<![$.\w])LIMIT\b", re.IGNORECASE)
+# Clauses that can't be part of a LIMIT expression: a LIMIT followed by one of them doesn't end the query
+CLAUSE_KEYWORD = re.compile(r"\b(MATCH|WHERE|WITH|UNWIND|CALL|RETURN|ORDER|SKIP|UNION)\b", re.IGNORECASE)
+RETURN_CLAUSE = re.compile(r"\bRETURN\b", re.IGNORECASE)
+
+
+def trailing_limit(cypher):
+    # (start, expression) of the LIMIT that ends the query: "10", "$limit", "toInteger($n)"... None without one
+    matches = list(LIMIT_KEYWORD.finditer(cypher))
+    if not matches:
+        return None
+    expression = cypher[matches[-1].end():].strip()
+    if not expression or CLAUSE_KEYWORD.search(expression):
+        return None
+    return matches[-1].start(), expression
+
+
+def inject_limit(cypher, limit):
+    cypher = cypher.strip().rstrip(";").strip()
+    # A LIMIT per UNION branch would need rewriting the query: these are only capped while streaming
+    if re.search(r"\bUNION\b", cypher, re.IGNORECASE) or not RETURN_CLAUSE.search(cypher):
+        return cypher
+
+    existing = trailing_limit(cypher)
+    if existing:
+        start, expression = existing
+        # A parameter or an expression ($limit, toInteger(...)) is left alone: the rows are capped while streaming
+        if not expression.isdigit() or int(expression) <= limit:
+            return cypher
+        return cypher[:start] + f"LIMIT {limit}"
+    return f"{cypher}\nLIMIT {limit}"
+
+
+def _stream(graph, cypher, params, fetch_size):
+    driver = getattr(graph, "_driver", None)
+    if driver is None:
+        # Not a Neo4jGraph (no driver to stream from): fall back to the materialized result
+        yield from graph.query(cypher, params)
+        return
+
+    from langchain_community.graphs.neo4j_graph import value_sanitize
+    from neo4j import Query
+    from neo4j.exceptions import CypherSyntaxError
+
+    session_config = {"database": getattr(graph, "_database", None), "fetch_size": fetch_size}
+    if getattr(graph, "access_mode", None):
+        # The graph of the shared driver sends its queries as reads (see neo4j_pool.py)
+        session_config["default_access_mode"] = graph.access_mode
+    # Like Neo4jGraph.query: the same error for an invalid query, and the same sanitizing of the values
+    sanitize = getattr(graph, "sanitize", False)
+    with driver.session(**session_config) as session:
+        try:
+            result = session.run(Query(cypher, timeout=getattr(graph, "timeout", None)), params)
+            for record in result:
+                yield value_sanitize(record.data()) if sanitize else record.data()
+        except CypherSyntaxError as e:
+            raise ValueError(f"Generated Cypher Statement is not valid\n{e}")
+        # Leaving the session before the end discards the records that were not fetched yet
+
+
+def summarize_rows(rows, truncated, rows_listed=0, top_values=5):
+    # rows are the rows read, at most max_rows: when truncated, the query had more of them and their
+    # number is unknown, so the count is never presented as the size of the result
+    columns = {}
+    for row in rows:
+        for key, value in row.items():
+            columns.setdefault(key, Counter())[json.dumps(value, default=str, sort_keys=True)] += 1
+
+    summary = {
+        "rows_summarized": len(rows),
+        "rows_listed": min(rows_listed, len(rows)),
+        "truncated": truncated,
+        "columns": {
+            key: {
+                "distinct_values": len(counter),
+                "most_common": [json.loads(value) for value, _ in counter.most_common(top_values)],
+            }
+            for key, counter in columns.items()
+        },
+    }
+    return summary
+
+
+class ResultGuard:
+    def __init__(self, max_rows=50, max_bytes=20_000, context_rows=10, fetch_size=100, inject=True):
+        self.max_rows = max_rows
+        self.max_bytes = max_bytes
+        # Rows passed verbatim to the answer LLM, the others only contribute to the summary
+        self.context_rows = context_rows
+        self.fetch_size = fetch_size
+        self.inject = inject
+
+    def prepare(self, cypher):
+        # One row more than the cap, to know whether the result was cut
+        return inject_limit(cypher, self.max_rows + 1) if self.inject else cypher
+
+    def run(self, graph, cypher, params=None):
+        cypher = self.prepare(cypher)
+        rows, size, truncated = [], 0, False
+        records = _stream(graph, cypher, params or {}, min(self.fetch_size, self.max_rows + 1))
+        try:
+            for record in records:
+                size += len(json.dumps(record, default=str))
+                if len(rows) >= self.max_rows or size > self.max_bytes:
+                    truncated = True
+                    break
+                rows.append(record)
+        finally:
+            records.close()
+
+        if not truncated and len(rows) <= self.context_rows:
+            return rows
+        # Too much for the answer prompt: the first rows, plus a summary of all the rows read
+        return rows[:self.context_rows] + [{"summary": summarize_rows(rows, truncated, self.context_rows)}]
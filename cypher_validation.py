@@ -0,0 +1,182 @@
+import re
+
+from langchain.chains.llm import LLMChain
+from langchain.prompts import PromptTemplate
+
+# Validation of the generated Cypher before it is executed
+#
+# The comments in 9-cypher-chain.py and 10-cypher-chain-instructed.py show what goes wrong with generated queries:
+# - the query is wrapped in prose ("To answer the question ... you can use the following Cypher query: ...")
+# - the answer is not a query at all ("I'm here to help with Neo4j queries...")
+# - it uses properties or relationship types that don't exist, or undefined variables ({role: role})
+# All of these used to fail only when executed on the database. CypherValidator instead:
+# 1. extracts the statement from the surrounding text
+# 2. checks labels, relationship types and properties against the (cached) schema, locally
+# 3. runs EXPLAIN, which compiles the query and catches syntax errors without touching any data
+# On failure it asks the LLM to repair the query, giving it the errors, up to `max_repairs` times.
+
+CYPHER_START = re.compile(
+    r"^\s*(OPTIONAL\s+MATCH|MATCH|CALL|WITH|UNWIND|RETURN)\b", re.IGNORECASE | re.MULTILINE
+)
+CYPHER_CLAUSE = re.compile(
+    r"^\s*(OPTIONAL\s+MATCH|MATCH|WHERE|WITH|RETURN|ORDER\s+BY|SKIP|LIMIT|UNWIND|CALL|YIELD|UNION|AND|OR|NOT"
+    r"|\)|\]|\}|,)",
+    re.IGNORECASE,
+)
+
+NODE_PATTERN = re.compile(r"\(\s*(?P<var>\w+)?\s*(?P<labels>(?::\s*`?\w+`?\s*)+)?\s*(?P<props>\{[^}]*\})?\s*\)")
+REL_PATTERN = re.compile(r"\[\s*(?P<var>\w+)?\s*(?::\s*(?P<types>`?\w+`?(?:\s*\|\s*:?`?\w+`?)*))?[^\]{]*(?P<props>\{[^}]*\})?[^\]]*\]")
+PROPERTY_ACCESS = re.compile(r"\b(?P<var>[A-Za-z_]\w*)\.(?P<prop>`?\w+`?)")
+MAP_ENTRY = re.compile(r"(?P<key>\w+)\s*:\s*(?P<value>[^,}]+)")
+ALIAS = re.compile(r"\bAS\s+(?P<var>\w+)", re.IGNORECASE)
+UNWIND_ALIAS = re.compile(r"\bUNWIND\b.+?\bAS\s+(?P<var>\w+)", re.IGNORECASE)
+
+
+def extract_statement(text):
+    # Code between triple backticks, if any
+    fenced = re.findall(r"```(?:cypher)?(.*?)```", text, re.DOTALL | re.IGNORECASE)
+    if fenced:
+        text = fenced[0]
+
+    start = CYPHER_START.search(text)
+    if not start:
+        return None
+
+    # Keep the lines of the statement, stop at the first line of prose after it
+    lines = []
+    for line in text[start.start():].strip().splitlines():
+        if lines and line.strip() and not CYPHER_CLAUSE.match(line) and not lines[-1].rstrip().endswith((",", "(", "[", "{")):
+            break
+        if not line.strip():
+            if lines:
+                break
+            continue
+        lines.append(line)
+    return "\n".join(lines).strip().rstrip(";").strip() or None
+
+
+def _strip(name):
+    return name.strip().strip("`").strip()
+
+
+def check_schema(cypher, structured_schema):
+    node_props = {label: {p["property"] for p in props} for label, props in structured_schema.get("node_props", {}).items()}
+    rel_props = {rel: {p["property"] for p in props} for rel, props in structured_schema.get("rel_props", {}).items()}
+    rel_types = {r["type"] for r in structured_schema.get("relationships", [])} | set(rel_props)
+    errors = []
+    # variable -> set of allowed properties (None when unknown, like a node without label)
+    variables = {}
+
+    # Strings would confuse the regexes: "Matrix, The" or a title with parentheses
+    stripped = re.sub(r"'(?:[^'\\]|\\.)*'|\"(?:[^\"\\]|\\.)*\"", "''", cypher)
+
+    def check_map(props, allowed, owner):
+        for entry in MAP_ENTRY.finditer(props.strip("{}")):
+            key, value = entry["key"], entry["value"].strip()
+            if allowed is not None and key not in allowed:
+                errors.append(f"Property '{key}' does not exist on {owner}")
+            if re.fullmatch(r"[A-Za-z_]\w*", value) and value.lower() not in ("true", "false", "null"):
+                undefined_candidates.append(value)
+
+    undefined_candidates = []
+
+    for match in NODE_PATTERN.finditer(stripped):
+        labels = [_strip(label) for label in (match["labels"] or "").split(":") if _strip(label)]
+        allowed = None
+        for label in labels:
+            if label not in node_props:
+                errors.append(f"Label '{label}' does not exist in the schema")
+            else:
+                allowed = (allowed or set()) | node_props[label]
+        if match["var"]:
+            variables[match["var"]] = allowed if allowed is not None else variables.get(match["var"])
+        if match["props"]:
+            check_map(match["props"], allowed, f"(:{':'.join(labels)})" if labels else "the node")
+
+    for match in REL_PATTERN.finditer(stripped):
+        types = [_strip(t).lstrip(":") for t in re.split(r"\|", match["types"] or "") if _strip(t)]
+        allowed = None
+        for rel_type in types:
+            if rel_type not in rel_types:
+                errors.append(f"Relationship type '{rel_type}' does not exist in the schema")
+            else:
+                allowed = (allowed or set()) | rel_props.get(rel_type, set())
+        if match["var"]:
+            variables[match["var"]] = allowed
+        if match["props"]:
+            check_map(match["props"], allowed, f"[:{'|'.join(types)}]" if types else "the relationship")
+
+    for match in ALIAS.finditer(stripped):
+        variables.setdefault(match["var"], None)
+    for match in UNWIND_ALIAS.finditer(stripped):
+        variables.setdefault(match["var"], None)
+
+    for match in PROPERTY_ACCESS.finditer(stripped):
+        allowed = variables.get(match["var"])
+        prop = _strip(match["prop"])
+        if allowed is not None and prop not in allowed:
+            errors.append(f"Property '{prop}' does not exist on variable '{match['var']}'")
+
+    # Values in property maps like {role: role} must be bound variables (or $parameters/literals)
+    for name in undefined_candidates:
+        if name not in variables:
+            errors.append(f"Variable '{name}' is not defined")
+
+    return list(dict.fromkeys(errors))
+
+
+REPAIR_TEMPLATE = """You fix Cypher statements for Neo4j.
+The following statement, generated to answer the question, is not valid.
+
+Schema: {schema}
+Question: {question}
+Statement: {cypher}
+Errors: {errors}
+
+Use only the labels, relationship types and properties in the schema.
+Return only the corrected Cypher statement, without any explanation.
+"""
+
+
+class CypherValidator:
+    def __init__(self, graph, llm=None, max_repairs=1, explain=True, repair_prompt=None):
+        self.graph = graph
+        self.max_repairs = max_repairs
+        self.explain = explain
+        self.repair_chain = LLMChain(
+            llm=llm,
+            prompt=repair_prompt or PromptTemplate.from_template(REPAIR_TEMPLATE),
+        ) if llm is not None else None
+
+    def errors(self, cypher):
+        if not cypher:
+            return ["The answer does not contain a Cypher statement"]
+        errors = check_schema(cypher, self.graph.get_structured_schema)
+        if not errors and self.explain:
+            try:
+                # EXPLAIN plans the query without running it: no data is read
+                self.graph.query(f"EXPLAIN {cypher}")
+            except Exception as e:
+                # The message of a syntax error ends with the query and a caret pointing at the problem:
+                # its first meaningful line is enough for the repair prompt
+                lines = [line for line in str(e).splitlines() if line.strip() and "Generated Cypher" not in line]
+                errors.append(lines[0].strip() if lines else repr(e))
+        return errors
+
+    def validate(self, text, question, schema, callbacks=None, run_manager=None):
+        # Returns (cypher, errors): a valid statement and [], or the last attempt and its errors
+        cypher = extract_statement(text)
+        errors = self.errors(cypher)
+        attempts = 0
+        # No statement at all means the question isn't about the graph ("Hello, how are you?"): nothing to repair
+        while cypher and errors and self.repair_chain is not None and attempts < self.max_repairs:
+            attempts += 1
+            if run_manager:
+                run_manager.on_text(f"Invalid Cypher ({'; '.join(errors)}), repairing:", end="\n")
+            repaired = self.repair_chain.run(
+                {"schema": schema, "question": question, "cypher": cypher or text, "errors": "\n".join(errors)},
+                callbacks=callbacks,
+            )
+            cypher = extract_statement(repaired)
+            errors = self.errors(cypher)
+        return cypher, errors
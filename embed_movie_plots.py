@@ -0,0 +1,201 @@
+import argparse
+import hashlib
+import json
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from dotenv import load_dotenv
+from langchain_openai import OpenAIEmbeddings
+
+from neo4j_pool import get_pool
+
+# (Re)builds the embeddings behind the "moviePlots" vector index used in 7-retrievers.py
+#
+# The index of the course was populated out-of-band, so here is a way to do it from this repo:
+#
+#   python embed_movie_plots.py --create-index
+#
+# - Movie nodes are read in batches with keyset pagination on an indexed, unique property
+#   (WHERE m.movieId > $last ORDER BY m.movieId LIMIT ..., --key changes the property), instead of one huge query
+#   or SKIP/OFFSET that gets slower at every page. A range index on the property is created if missing: every batch
+#   is an index seek, not a scan and sort of all the movies. Movies without the property are not embedded
+# - The plots of a batch are embedded with a few large requests, running concurrently (up to --concurrency)
+# - Vectors are written back with one UNWIND query per batch, not one write per movie
+# - It's incremental: next to the embedding, each node stores the hash of the plot it was computed from,
+#   so nodes whose plot didn't change are skipped
+# - It's resumable: the key of the last processed node is saved in a checkpoint file after every batch
+
+load_dotenv()
+
+DEFAULT_KEY = "movieId"
+
+# A uniqueness constraint on the property (like movieId in the course dataset) already comes with a range index
+FIND_KEY_INDEX_QUERY = """
+SHOW INDEXES YIELD type, labelsOrTypes, properties
+WHERE type = 'RANGE' AND labelsOrTypes = ['Movie'] AND properties = [$key]
+RETURN count(*) AS indexes
+"""
+# The property name can't be a parameter: it's formatted in (between backticks)
+KEY_INDEX_QUERY = "CREATE RANGE INDEX movie_plots_key IF NOT EXISTS FOR (m:Movie) ON (m.`{key}`)"
+
+# One page of Movie nodes in the order of the key, after the last key of the previous page
+# (the first page has none). The key and the columns are formatted in, see page_query()
+PAGE_QUERY = """
+MATCH (m:Movie)
+WHERE {after} AND {where}
+RETURN elementId(m) AS id, m.`{key}` AS key, {columns}
+ORDER BY m.`{key}`
+LIMIT $batch_size
+"""
+
+READ_WHERE = "m.plot IS NOT NULL"
+READ_COLUMNS = "m.plot AS plot, m.plotEmbeddingHash AS hash, m.embedding IS NOT NULL AS embedded"
+
+WRITE_QUERY = """
+UNWIND $rows AS row
+MATCH (m:Movie) WHERE elementId(m) = row.id
+SET m.embedding = row.embedding, m.plotEmbeddingHash = row.hash
+"""
+
+CREATE_INDEX_QUERY = """
+CREATE VECTOR INDEX moviePlots IF NOT EXISTS
+FOR (m:Movie) ON m.embedding
+OPTIONS {indexConfig: {`vector.dimensions`: %d, `vector.similarity_function`: 'cosine'}}
+"""
+
+
+def plot_hash(plot):
+    return hashlib.sha256(plot.encode("utf-8")).hexdigest()
+
+
+def chunks(items, size):
+    for start in range(0, len(items), size):
+        yield items[start:start + size]
+
+
+class Checkpoint:
+    def __init__(self, path):
+        self.path = path
+
+    def load(self, key):
+        # The last key processed, if the checkpoint was saved while paginating on the same property
+        if self.path and os.path.exists(self.path):
+            with open(self.path) as f:
+                saved = json.load(f)
+            if saved.get("key") == key:
+                return saved["last"]
+        return None
+
+    def save(self, key, last):
+        if self.path:
+            with open(self.path, "w") as f:
+                json.dump({"key": key, "last": last}, f)
+
+    def clear(self):
+        if self.path and os.path.exists(self.path):
+            os.remove(self.path)
+
+
+def ensure_key_index(driver, key, database=None):
+    records, _, _ = driver.execute_query(FIND_KEY_INDEX_QUERY, key=key, database_=database)
+    if not records[0]["indexes"]:
+        driver.execute_query(KEY_INDEX_QUERY.format(key=key), database_=database)
+
+
+def page_query(key, where, columns, first=False):
+    after = f"m.`{key}` IS NOT NULL" if first else f"m.`{key}` > $last_key"
+    return PAGE_QUERY.format(key=key, after=after, where=where, columns=columns)
+
+
+def read_pages(driver, key, where, columns, batch_size=2000, last_key=None, database=None):
+    # Keyset pagination on the indexed key: every page is an index seek. Also used by the export of
+    # local_vector_search.py. Yields the records of each page, they have the "id" and "key" columns too
+    ensure_key_index(driver, key, database)
+    while True:
+        records, _, _ = driver.execute_query(
+            page_query(key, where, columns, first=last_key is None),
+            last_key=last_key, batch_size=batch_size, database_=database, routing_="r",
+        )
+        if not records:
+            return
+        yield records
+        last_key = records[-1]["key"]
+
+
+def ingest(driver, embeddings, batch_size=2000, embed_batch_size=200, concurrency=4,
+           checkpoint=None, force=False, database=None, key=DEFAULT_KEY):
+    checkpoint = checkpoint or Checkpoint(None)
+    last_key = checkpoint.load(key)
+    stats = {"read": 0, "embedded": 0, "skipped": 0, "batches": 0}
+    start = time.perf_counter()
+
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        pages = read_pages(driver, key, READ_WHERE, READ_COLUMNS, batch_size, last_key, database)
+        for records in pages:
+            stats["read"] += len(records)
+            changed = []
+            for record in records:
+                digest = plot_hash(record["plot"])
+                if force or not record["embedded"] or record["hash"] != digest:
+                    changed.append({"id": record["id"], "plot": record["plot"], "hash": digest})
+            stats["skipped"] += len(records) - len(changed)
+
+            if changed:
+                # Each chunk is one embedding request, and up to `concurrency` of them run at the same time
+                groups = list(chunks(changed, embed_batch_size))
+                vectors = executor.map(lambda group: embeddings.embed_documents([row["plot"] for row in group]), groups)
+                rows = [
+                    {"id": row["id"], "hash": row["hash"], "embedding": vector}
+                    for group, group_vectors in zip(groups, vectors)
+                    for row, vector in zip(group, group_vectors)
+                ]
+                driver.execute_query(WRITE_QUERY, rows=rows, database_=database)
+                stats["embedded"] += len(rows)
+
+            last_key = records[-1]["key"]
+            checkpoint.save(key, last_key)
+            stats["batches"] += 1
+            print(f"batch {stats['batches']}: read {stats['read']}, embedded {stats['embedded']}, "
+                  f"skipped {stats['skipped']} ({time.perf_counter() - start:.1f}s)")
+
+    # Completed: the next run starts from the beginning again (and only picks up the changed plots)
+    checkpoint.clear()
+    return stats
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--batch-size", type=int, default=2000, help="Movie nodes read (and written) per batch")
+    parser.add_argument("--embed-batch-size", type=int, default=200, help="Plots per embedding request")
+    parser.add_argument("--concurrency", type=int, default=4, help="Embedding requests running at the same time")
+    parser.add_argument("--checkpoint", default=".movie_plots_checkpoint.json")
+    parser.add_argument("--force", action="store_true", help="Re-embed every plot, even the unchanged ones")
+    parser.add_argument("--create-index", action="store_true", help="Create the moviePlots index if missing")
+    parser.add_argument("--database", default=None)
+    parser.add_argument("--key", default=DEFAULT_KEY, help="Unique Movie property to paginate on")
+    args = parser.parse_args()
+
+    embeddings = OpenAIEmbeddings(openai_api_key=os.getenv("OPENAI_KEY"))
+    with get_pool() as pool:
+        driver = pool.driver
+        stats = ingest(
+            driver,
+            embeddings,
+            batch_size=args.batch_size,
+            embed_batch_size=args.embed_batch_size,
+            concurrency=args.concurrency,
+            checkpoint=Checkpoint(args.checkpoint),
+            force=args.force,
+            database=args.database,
+            key=args.key,
+        )
+        if args.create_index:
+            dimensions = len(embeddings.embed_query("dimensions probe"))
+            # Index options can't be parameters
+            driver.execute_query(CREATE_INDEX_QUERY % dimensions, database_=args.database)
+    print(stats)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,185 @@
+import hashlib
+import json
+import os
+import re
+import threading
+from contextlib import contextmanager
+
+try:
+    import fcntl
+except ImportError:  # Windows: no lock between processes
+    fcntl = None
+
+import numpy as np
+from langchain_core.embeddings import Embeddings
+
+from lru_cache import LRUTTLCache
+
+# Embedding cache in front of an embedding provider (OpenAIEmbeddings)
+#
+# Every similarity_search, and every query of a retriever created with as_retriever(), embeds the query text.
+# That is a network round-trip to OpenAI, even when the same question was already asked.
+# CachedEmbeddings is itself an `Embeddings`, so it can be passed wherever the provider is passed
+# (like Neo4jVector.from_existing_index). Vectors are looked up by content: a hash of the model name and of the
+# normalized text. There are two tiers:
+# - memory: a LRU of the most recent vectors
+# - disk: a float32 matrix memory-mapped from `vectors.f32`, plus `index.tsv` that maps each key to its row.
+#   Both files are append only. The folder is shared by several scripts (and processes): an append takes an
+#   exclusive lock (flock on `lock`), drops a torn row left by a crash, writes the vectors and only then their rows
+#   in the index. A key in the index always points to its own vector, a crash can at most lose the last vectors
+
+
+def normalize_text(text):
+    return re.sub(r"\s+", " ", text).strip()
+
+
+# Queries and documents share the same keys: OpenAI embeds both the same way
+def embedding_key(model, text):
+    return hashlib.sha256(f"{model}\0{normalize_text(text)}".encode("utf-8")).hexdigest()
+
+
+class MmapVectorStore:
+    def __init__(self, directory):
+        self.directory = directory
+        os.makedirs(directory, exist_ok=True)
+        self.vectors_path = os.path.join(directory, "vectors.f32")
+        self.index_path = os.path.join(directory, "index.tsv")
+        self.meta_path = os.path.join(directory, "meta.json")
+        self.lock_path = os.path.join(directory, "lock")
+
+        self.dimensions = None
+        if os.path.exists(self.meta_path):
+            with open(self.meta_path) as f:
+                self.dimensions = json.load(f)["dimensions"]
+
+        self.rows = {}
+        if os.path.exists(self.index_path):
+            with open(self.index_path) as f:
+                for line in f:
+                    # A line torn by a crash is skipped
+                    key, _, row = line.rstrip("\n").partition("\t")
+                    if line.endswith("\n") and row.isdigit():
+                        self.rows[key] = int(row)
+
+        # Rows written to the index but not to the vectors file (a crash in between) are dropped
+        stored = self._stored_rows()
+        self.rows = {key: row for key, row in self.rows.items() if row < stored}
+        self._matrix = None
+        self._lock = threading.Lock()
+
+    @contextmanager
+    def _file_lock(self):
+        # Exclusive between processes, for the time of an append
+        with open(self.lock_path, "a") as f:
+            if fcntl is not None:
+                fcntl.flock(f, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                if fcntl is not None:
+                    fcntl.flock(f, fcntl.LOCK_UN)
+
+    def _stored_rows(self):
+        if not self.dimensions or not os.path.exists(self.vectors_path):
+            return 0
+        return os.path.getsize(self.vectors_path) // (4 * self.dimensions)
+
+    def _mapped(self):
+        # The memory map is reopened only when rows were appended after it was created
+        stored = self._stored_rows()
+        if self._matrix is None or self._matrix.shape[0] < stored:
+            self._matrix = np.memmap(self.vectors_path, dtype=np.float32, mode="r", shape=(stored, self.dimensions))
+        return self._matrix
+
+    def get(self, key):
+        row = self.rows.get(key)
+        if row is None:
+            return None
+        with self._lock:
+            return self._mapped()[row].tolist()
+
+    def add(self, items):
+        # items: [(key, vector)]
+        items = [(key, vector) for key, vector in items if key not in self.rows]
+        if not items:
+            return
+        with self._lock, self._file_lock():
+            if self.dimensions is None:
+                # Another process may have created the cache in the meantime
+                if os.path.exists(self.meta_path):
+                    with open(self.meta_path) as f:
+                        self.dimensions = json.load(f)["dimensions"]
+                else:
+                    self.dimensions = len(items[0][1])
+                    with open(self.meta_path, "w") as f:
+                        json.dump({"dimensions": self.dimensions}, f)
+
+            matrix = np.asarray([vector for _, vector in items], dtype=np.float32)
+            with open(self.vectors_path, "ab") as f:
+                # The rows are written at the end of the last complete row: a torn one (a crash) is overwritten
+                start = self._stored_rows()
+                f.truncate(start * 4 * self.dimensions)
+                f.write(matrix.tobytes())
+                f.flush()
+                os.fsync(f.fileno())
+            with open(self.index_path, "ab+") as f:
+                # Same for a torn index line (no final newline): it's cut off, so it can't merge with the next one
+                if f.seek(0, os.SEEK_END):
+                    f.seek(-1, os.SEEK_END)
+                    if f.read(1) != b"\n":
+                        f.seek(0)
+                        f.truncate(f.read().rfind(b"\n") + 1)
+                f.write("".join(f"{key}\t{start + offset}\n" for offset, (key, _) in enumerate(items)).encode("utf-8"))
+            for offset, (key, _) in enumerate(items):
+                self.rows[key] = start + offset
+
+    def __len__(self):
+        return len(self.rows)
+
+
+class CachedEmbeddings(Embeddings):
+    def __init__(self, embeddings, cache_dir=None, memory_size=1024, model=None):
+        self.embeddings = embeddings
+        self.model = model or getattr(embeddings, "model", type(embeddings).__name__)
+        self.memory = LRUTTLCache(maxsize=memory_size, ttl=None)
+        self.disk = MmapVectorStore(cache_dir) if cache_dir else None
+
+    def _lookup(self, key):
+        vector = self.memory.get(key)
+        if vector is None and self.disk is not None:
+            vector = self.disk.get(key)
+            if vector is not None:
+                self.memory.set(key, vector)
+        return vector
+
+    def _store(self, items):
+        # Rounded to float32 like on disk, so a vector is the same whichever tier it comes from
+        items = [(key, np.asarray(vector, dtype=np.float32).tolist()) for key, vector in items]
+        for key, vector in items:
+            self.memory.set(key, vector)
+        if self.disk is not None:
+            self.disk.add(items)
+        return items
+
+    def embed_documents(self, texts):
+        keys = [embedding_key(self.model, text) for text in texts]
+        vectors = [self._lookup(key) for key in keys]
+
+        # Only the missing texts are sent to the provider, in a single batch (and each distinct text once)
+        missing = {key: text for key, text, vector in zip(keys, texts, vectors) if vector is None}
+        if missing:
+            computed = self.embeddings.embed_documents(list(missing.values()))
+            new_vectors = dict(self._store(list(zip(missing.keys(), computed))))
+            vectors = [vector if vector is not None else new_vectors[key] for key, vector in zip(keys, vectors)]
+        return vectors
+
+    def embed_query(self, text):
+        key = embedding_key(self.model, text)
+        vector = self._lookup(key)
+        if vector is None:
+            [(_, vector)] = self._store([(key, self.embeddings.embed_query(text))])
+        return vector
+
+    @property
+    def stats(self):
+        return self.memory.stats
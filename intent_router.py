@@ -0,0 +1,138 @@
+import re
+from collections import namedtuple
+
+# Fast path for the questions that don't need an LLM to write the Cypher
+#
+# Most questions asked to the Cypher chains have the same few shapes: "what movies did Tom Hanks act in",
+# "what genres is Toy Story", "how many movies did Tom Hanks act in". For those the query is always the same,
+# only the names change. IntentRouter matches the question against a list of templates: a regex for the shape,
+# with the names captured in groups, and a parameterized Cypher query.
+# The captured names must be real actors / movies: they are resolved with an EntityIndex of all the actor names
+# and movie titles, loaded once from the graph. This also applies the "The Matrix" -> "Matrix, The" rule that
+# the prompt of 10-cypher-chain-instructed.py asks the LLM to follow.
+# A question that doesn't match a template, or names something that isn't in the index, goes to the LLM as before.
+
+ARTICLES = ("the", "a", "an")
+
+ACTORS_QUERY = "MATCH (a:Actor) RETURN DISTINCT a.name AS name"
+MOVIES_QUERY = "MATCH (m:Movie) WHERE m.title IS NOT NULL RETURN DISTINCT m.title AS title"
+
+
+def entity_key(text):
+    # "Matrix, The", "The Matrix" and "the matrix" all become "the matrix"
+    text = re.sub(r"\s+", " ", text).strip().casefold()
+    article = re.fullmatch(r"(.+), (%s)" % "|".join(ARTICLES), text)
+    if article:
+        text = f"{article.group(2)} {article.group(1)}"
+    return " ".join(re.findall(r"\w+", text))
+
+
+class EntityIndex:
+    def __init__(self, actors=(), movies=()):
+        self.entities = {"actor": {}, "movie": {}}
+        for name in actors:
+            self.add("actor", name)
+        for title in movies:
+            self.add("movie", title)
+
+    @classmethod
+    def load(cls, graph):
+        # Two queries at startup, then everything is resolved in memory
+        return cls(
+            actors=[row["name"] for row in graph.query(ACTORS_QUERY) if row["name"]],
+            movies=[row["title"] for row in graph.query(MOVIES_QUERY)],
+        )
+
+    def add(self, kind, name):
+        entities = self.entities[kind]
+        key = entity_key(name)
+        entities.setdefault(key, name)
+        # "Matrix" also finds "Matrix, The", unless another movie is called exactly "Matrix"
+        words = key.split(" ", 1)
+        if len(words) == 2 and words[0] in ARTICLES:
+            entities.setdefault(words[1], name)
+
+    def resolve(self, kind, text):
+        text = re.sub(r"'s$|^[\"']|[\"'?!.]+$", "", text.strip()).strip()
+        if kind == "movie":
+            text = re.sub(r"^(the )?(movie|film) ", "", text, flags=re.IGNORECASE)
+        return self.entities[kind].get(entity_key(text))
+
+    def __len__(self):
+        return sum(len(entities) for entities in self.entities.values())
+
+
+Intent = namedtuple("Intent", ["name", "patterns", "cypher"])
+Route = namedtuple("Route", ["intent", "cypher", "params"])
+
+ACT = r"(?:act|acted|play|played|star|starred|appear|appeared)"
+
+# {actor} and {movie} in the patterns become named groups, and the names are passed as $actor and $movie
+DEFAULT_INTENTS = [
+    Intent(
+        "count_movies_by_actor",
+        [rf"how many (?:movies|films) (?:did|has|does) {{actor}} {ACT}(?: in)?"],
+        "MATCH (a:Actor {name: $actor})-[:ACTED_IN]->(m:Movie)\nRETURN count(m) AS movies",
+    ),
+    Intent(
+        "role_in_movie",
+        [r"what (?:role|character) did {actor} play in {movie}", r"who did {actor} play in {movie}"],
+        "MATCH (a:Actor {name: $actor})-[r:ACTED_IN]->(m:Movie {title: $movie})\nRETURN r.role AS role",
+    ),
+    Intent(
+        "movies_by_actor",
+        [
+            rf"(?:what|which) (?:movies|films) (?:did|has|does) {{actor}} {ACT} in",
+            r"(?:list |show |find )?(?:the )?(?:movies|films) (?:with|starring|featuring|of) {actor}",
+            r"(?:list |show |find )?{actor}'s (?:movies|films)",
+        ],
+        "MATCH (a:Actor {name: $actor})-[:ACTED_IN]->(m:Movie)\nRETURN m.title AS title, m.year AS year\nORDER BY m.year",
+    ),
+    Intent(
+        "genres_of_movie",
+        [
+            r"(?:what|which) (?:are the )?genres? (?:is|are|of|does) {movie}(?: have| belong to| in)?",
+            r"(?:what|which) genres? (?:is|are) {movie} in",
+        ],
+        "MATCH (m:Movie {title: $movie})-[:IN_GENRE]->(g:Genre)\nRETURN g.name AS genre",
+    ),
+    Intent(
+        "actors_in_movie",
+        [rf"who (?:{ACT}) in {{movie}}", r"(?:what is|who is in) the cast of {movie}"],
+        "MATCH (a:Actor)-[r:ACTED_IN]->(m:Movie {title: $movie})\nRETURN a.name AS actor, r.role AS role",
+    ),
+    Intent(
+        "director_of_movie",
+        [r"who directed {movie}", r"who (?:is|was) the director of {movie}"],
+        "MATCH (d:Director)-[:DIRECTED]->(m:Movie {title: $movie})\nRETURN d.name AS director",
+    ),
+]
+
+
+class IntentRouter:
+    def __init__(self, index, intents=DEFAULT_INTENTS):
+        self.index = index
+        self.intents = [
+            (intent, [self._compile(pattern) for pattern in intent.patterns]) for intent in intents
+        ]
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def _compile(pattern):
+        pattern = pattern.replace("{actor}", "(?P<actor>.+?)").replace("{movie}", "(?P<movie>.+?)")
+        return re.compile(rf"^\s*{pattern}\s*[?!.]*\s*$", re.IGNORECASE)
+
+    def route(self, question):
+        # Returns a Route, or None when the question must go to the LLM
+        for intent, patterns in self.intents:
+            for pattern in patterns:
+                match = pattern.match(question)
+                if not match:
+                    continue
+                params = {kind: self.index.resolve(kind, text) for kind, text in match.groupdict().items()}
+                if all(params.values()):
+                    self.hits += 1
+                    return Route(intent.name, intent.cypher, params)
+        self.misses += 1
+        return None
@@ -0,0 +1,265 @@
+import argparse
+import json
+import os
+
+import numpy as np
+from dotenv import load_dotenv
+from langchain_core.documents import Document
+from langchain_core.vectorstores import VectorStore
+
+# Local copy of the "moviePlots" vector index
+#
+# For latency sensitive paths (and to run without the database) the plot embeddings can be exported once:
+#
+#   python local_vector_search.py export --out movie_plots_index
+#
+# into a float32 matrix that is memory-mapped at load time, plus the titles/plots/properties of the movies.
+# LocalVectorStore is a langchain VectorStore, so similarity_search and as_retriever() work like with
+# Neo4jVector and return the same Documents: the plot as page_content and the other node properties as metadata.
+#
+# Search is a brute-force cosine top-k (one matrix-vector product, exact).
+# For bigger catalogs an IVF index can be built on top: vectors are clustered with k-means,
+# and a query only scans the `nprobe` clusters closest to it (approximate, but much less work).
+#
+# open_movie_plot_store() is the switch between the two backends, driven by VECTOR_BACKEND=neo4j|local
+
+load_dotenv()
+
+# Columns of the pages of the export (the pagination is the one of embed_movie_plots.py)
+# The metadata is the one of Neo4jVector: every property but the text, the embedding and `id`
+EXPORT_WHERE = "m.embedding IS NOT NULL"
+EXPORT_COLUMNS = "m.plot AS plot, m.embedding AS embedding, m {.*, embedding: Null, plot: Null, id: Null} AS metadata"
+# Dropped from the metadata of the documents, for exports made before `id` was
+DROPPED_METADATA = ("id",)
+
+
+def _normalize(matrix):
+    norms = np.linalg.norm(matrix, axis=-1, keepdims=True)
+    norms[norms == 0] = 1
+    return matrix / norms
+
+
+def _top_k(scores, k):
+    # argpartition is O(n), only the k selected are sorted
+    k = min(k, scores.shape[0])
+    if k <= 0:
+        return np.empty(0, dtype=np.int64)
+    candidates = np.argpartition(-scores, k - 1)[:k]
+    return candidates[np.argsort(-scores[candidates])]
+
+
+class IVFIndex:
+    def __init__(self, centroids, lists):
+        self.centroids = centroids
+        # lists[c] = rows of the vectors assigned to the centroid c
+        self.lists = lists
+
+    @classmethod
+    def build(cls, vectors, n_lists=None, iterations=10, seed=0):
+        # Plain k-means (spherical, since vectors are normalized) on a sample of the vectors
+        n_lists = n_lists or max(1, int(np.sqrt(len(vectors))))
+        rng = np.random.default_rng(seed)
+        sample = vectors[rng.choice(len(vectors), size=min(len(vectors), n_lists * 64), replace=False)]
+        centroids = sample[rng.choice(len(sample), size=n_lists, replace=False)].copy()
+        for _ in range(iterations):
+            assignment = np.argmax(sample @ centroids.T, axis=1)
+            for c in range(n_lists):
+                members = sample[assignment == c]
+                if len(members):
+                    centroids[c] = members.mean(axis=0)
+            centroids = _normalize(centroids)
+
+        assignment = np.concatenate([
+            np.argmax(vectors[start:start + 65536] @ centroids.T, axis=1)
+            for start in range(0, len(vectors), 65536)
+        ])
+        lists = [np.flatnonzero(assignment == c) for c in range(n_lists)]
+        return cls(centroids.astype(np.float32), lists)
+
+    def candidates(self, query, nprobe):
+        closest = _top_k(self.centroids @ query, nprobe)
+        return np.concatenate([self.lists[c] for c in closest])
+
+    def save(self, directory):
+        np.save(os.path.join(directory, "ivf_centroids.npy"), self.centroids)
+        offsets = np.cumsum([0] + [len(rows) for rows in self.lists])
+        np.save(os.path.join(directory, "ivf_offsets.npy"), offsets)
+        np.save(os.path.join(directory, "ivf_rows.npy"), np.concatenate(self.lists) if self.lists else np.empty(0))
+
+    @classmethod
+    def load(cls, directory):
+        path = os.path.join(directory, "ivf_centroids.npy")
+        if not os.path.exists(path):
+            return None
+        centroids = np.load(path)
+        offsets = np.load(os.path.join(directory, "ivf_offsets.npy"))
+        rows = np.load(os.path.join(directory, "ivf_rows.npy"))
+        return cls(centroids, [rows[offsets[i]:offsets[i + 1]] for i in range(len(offsets) - 1)])
+
+
+class LocalVectorIndex:
+    def __init__(self, vectors, texts, metadatas, ivf=None):
+        self.vectors = vectors
+        self.texts = texts
+        self.metadatas = metadatas
+        self.ivf = ivf
+
+    @classmethod
+    def load(cls, directory):
+        with open(os.path.join(directory, "meta.json")) as f:
+            meta = json.load(f)
+        vectors = np.memmap(
+            os.path.join(directory, "vectors.f32"), dtype=np.float32, mode="r",
+            shape=(meta["count"], meta["dimensions"]),
+        )
+        with open(os.path.join(directory, "documents.jsonl")) as f:
+            documents = [json.loads(line) for line in f]
+        return cls(vectors, [d["text"] for d in documents], [d["metadata"] for d in documents], IVFIndex.load(directory))
+
+    def build_ivf(self, directory=None, n_lists=None):
+        self.ivf = IVFIndex.build(np.asarray(self.vectors), n_lists=n_lists)
+        if directory:
+            self.ivf.save(directory)
+        return self.ivf
+
+    def search(self, embedding, k=4, nprobe=None):
+        # Returns [(row, cosine similarity)]. With nprobe and an IVF index, only the closest clusters are scanned
+        query = _normalize(np.asarray(embedding, dtype=np.float32))
+        if nprobe and self.ivf is not None:
+            rows = self.ivf.candidates(query, nprobe)
+            scores = self.vectors[rows] @ query
+            best = _top_k(scores, k)
+            return [(int(rows[i]), float(scores[i])) for i in best]
+
+        scores = self.vectors @ query
+        return [(int(i), float(scores[i])) for i in _top_k(scores, k)]
+
+    def __len__(self):
+        return len(self.texts)
+
+
+class LocalVectorStore(VectorStore):
+    def __init__(self, index, embedding, nprobe=None):
+        self.index = index
+        self._embedding = embedding
+        self.nprobe = nprobe
+
+    @classmethod
+    def load(cls, directory, embedding, nprobe=None):
+        return cls(LocalVectorIndex.load(directory), embedding, nprobe=nprobe)
+
+    @property
+    def embeddings(self):
+        return self._embedding
+
+    def similarity_search_with_score_by_vector(self, embedding, k=4, **kwargs):
+        results = []
+        for row, similarity in self.index.search(embedding, k=k, nprobe=kwargs.get("nprobe", self.nprobe)):
+            metadata = {key: value for key, value in self.index.metadatas[row].items() if key not in DROPPED_METADATA}
+            document = Document(page_content=self.index.texts[row], metadata=metadata)
+            # Same score as the Neo4j cosine vector index: (1 + cosine) / 2
+            results.append((document, (1 + similarity) / 2))
+        return results
+
+    def similarity_search_by_vector(self, embedding, k=4, **kwargs):
+        return [document for document, _ in self.similarity_search_with_score_by_vector(embedding, k=k, **kwargs)]
+
+    def similarity_search_with_score(self, query, k=4, **kwargs):
+        return self.similarity_search_with_score_by_vector(self._embedding.embed_query(query), k=k, **kwargs)
+
+    def similarity_search(self, query, k=4, **kwargs):
+        return [document for document, _ in self.similarity_search_with_score(query, k=k, **kwargs)]
+
+    def _select_relevance_score_fn(self):
+        return lambda score: score
+
+    def add_texts(self, texts, metadatas=None, **kwargs):
+        raise NotImplementedError("The local index is read only, re-export it from Neo4j")
+
+    @classmethod
+    def from_texts(cls, texts, embedding, metadatas=None, **kwargs):
+        raise NotImplementedError("The local index is read only, re-export it from Neo4j")
+
+
+def export(driver, directory, batch_size=2000, database=None, key=None):
+    # Streams the embedded Movie nodes (keyset pagination on an indexed key, like embed_movie_plots.py)
+    # straight into the files, so the whole catalog is never in memory at once
+    from embed_movie_plots import DEFAULT_KEY, read_pages
+
+    os.makedirs(directory, exist_ok=True)
+    count, dimensions = 0, None
+    with open(os.path.join(directory, "vectors.f32"), "wb") as vectors_file, \
+            open(os.path.join(directory, "documents.jsonl"), "w") as documents_file:
+        pages = read_pages(driver, key or DEFAULT_KEY, EXPORT_WHERE, EXPORT_COLUMNS, batch_size, database=database)
+        for records in pages:
+            matrix = _normalize(np.asarray([record["embedding"] for record in records], dtype=np.float32))
+            dimensions = matrix.shape[1]
+            vectors_file.write(matrix.astype(np.float32).tobytes())
+            for record in records:
+                metadata = {key: value for key, value in record["metadata"].items() if value is not None}
+                documents_file.write(json.dumps({"text": record["plot"], "metadata": metadata}) + "\n")
+            count += len(records)
+
+    with open(os.path.join(directory, "meta.json"), "w") as f:
+        json.dump({"count": count, "dimensions": dimensions}, f)
+    return count
+
+
+# The backend switch used by the scripts
+
+VECTOR_BACKEND = os.getenv("VECTOR_BACKEND", "neo4j")
+LOCAL_INDEX_DIR = os.getenv("LOCAL_VECTOR_INDEX", "movie_plots_index")
+
+
+def open_movie_plot_store(embedding_provider, backend=None, nprobe=None):
+    backend = backend or VECTOR_BACKEND
+    if backend == "local":
+        return LocalVectorStore.load(LOCAL_INDEX_DIR, embedding_provider, nprobe=nprobe)
+    if backend != "neo4j":
+        raise ValueError(f"Unknown vector backend: {backend}")
+
+    from langchain_community.vectorstores.neo4j_vector import Neo4jVector
+    from neo4j import READ_ACCESS
+
+    from neo4j_pool import get_pool
+    return Neo4jVector.from_existing_index(
+        embedding_provider,
+        # The driver shared with the other components of the process (see neo4j_pool.py), for reads only
+        graph=get_pool().graph(access_mode=READ_ACCESS),
+        # The index created on a past lesson online
+        index_name="moviePlots",
+        # The node property with the embedding, like m.embedding where m is a Movie node
+        embedding_node_property="embedding",
+        # The node property with the text, used to populate "doc.page_content" on each result
+        text_node_property="plot",
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    export_parser = subparsers.add_parser("export", help="Export the moviePlots embeddings from Neo4j")
+    export_parser.add_argument("--out", default=LOCAL_INDEX_DIR)
+    export_parser.add_argument("--batch-size", type=int, default=2000)
+    export_parser.add_argument("--key", default=None, help="Unique Movie property to paginate on (default movieId)")
+    export_parser.add_argument("--ivf-lists", type=int, default=0, help="Also build an IVF index with this many lists")
+    ivf_parser = subparsers.add_parser("build-ivf", help="Build the IVF index of an exported catalog")
+    ivf_parser.add_argument("--dir", default=LOCAL_INDEX_DIR)
+    ivf_parser.add_argument("--lists", type=int, default=None)
+    args = parser.parse_args()
+
+    if args.command == "export":
+        from neo4j_pool import get_pool
+        with get_pool() as pool:
+            count = export(pool.driver, args.out, batch_size=args.batch_size, key=args.key)
+        print(f"Exported {count} movies to {args.out}")
+        if args.ivf_lists:
+            LocalVectorIndex.load(args.out).build_ivf(args.out, n_lists=args.ivf_lists)
+            print(f"Built IVF index with {args.ivf_lists} lists")
+    else:
+        ivf = LocalVectorIndex.load(args.dir).build_ivf(args.dir, n_lists=args.lists)
+        print(f"Built IVF index with {len(ivf.lists)} lists")
+
+
+if __name__ == "__main__":
+    main()
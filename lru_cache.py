@@ -0,0 +1,78 @@
+import threading
+import time
+from collections import OrderedDict
+
+# In-memory cache with a LRU policy (bounded size) and an optional TTL, with hit/miss/eviction counters
+# Used by the SWAPI response cache (swapi_cache.py) and by the embedding cache (embedding_cache.py)
+
+
+class CacheStats:
+    def __init__(self):
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+
+    def as_dict(self):
+        total = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "expirations": self.expirations,
+            "hit_rate": self.hits / total if total else 0.0,
+        }
+
+    def __repr__(self):
+        return f"CacheStats({self.as_dict()})"
+
+
+class LRUTTLCache:
+    def __init__(self, maxsize=512, ttl=24 * 60 * 60, clock=time.monotonic):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.clock = clock
+        self.stats = CacheStats()
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key, default=None):
+        with self._lock:
+            item = self._data.get(key)
+            if item is None:
+                self.stats.misses += 1
+                return default
+
+            value, expires_at = item
+            if expires_at is not None and expires_at <= self.clock():
+                del self._data[key]
+                self.stats.expirations += 1
+                self.stats.misses += 1
+                return default
+
+            # Mark as most recently used
+            self._data.move_to_end(key)
+            self.stats.hits += 1
+            return value
+
+    def set(self, key, value):
+        expires_at = self.clock() + self.ttl if self.ttl else None
+        with self._lock:
+            self._data[key] = (value, expires_at)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+                self.stats.evictions += 1
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+    def __len__(self):
+        return len(self._data)
+
+    def __contains__(self, key):
+        # Only a look: the stats and the LRU order are not touched, an expired entry is left for get() to drop
+        with self._lock:
+            item = self._data.get(key)
+            return item is not None and (item[1] is None or item[1] > self.clock())
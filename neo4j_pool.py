@@ -0,0 +1,152 @@
+import asyncio
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from dotenv import load_dotenv
+from langchain_community.graphs import Neo4jGraph
+from neo4j import WRITE_ACCESS, AsyncGraphDatabase, GraphDatabase, RoutingControl
+
+# Shared Neo4j connection layer for the scripts and the chains
+#
+# 6-neo4j.py, 7-retrievers.py, 8-agent-with-retriever.py and the Cypher chains used to create their own Neo4jGraph
+# or Neo4jVector, and each one opens its own driver (its own connection pool, its own connectivity check).
+# Here there is a single driver per process, with a pool of connections that every component borrows from:
+# - Neo4jPool.graph() returns a Neo4jGraph that uses the shared driver, and Neo4jVector accepts it with graph=...
+# - the pool size and timeouts can be tuned from the .env file
+# - the graphs send their queries with WRITE access by default, like Neo4jGraph. The read-only users (the Cypher
+#   chains, the vector search) ask for pool.graph(access_mode=READ_ACCESS): with a neo4j:// url (a cluster, or Aura)
+#   the driver routes them to the followers / read replicas, and keeps the leader for the writes.
+#   Neo4jPool.query() reads unless write=True. With bolt:// it's a single server anyway
+# - there is also an async API (AsyncGraphDatabase), and helpers to run independent queries concurrently,
+#   like the vector search and a Cypher lookup for the same question
+
+load_dotenv()
+
+DEFAULT_POOL_SIZE = int(os.getenv("NEO_4J_POOL_SIZE", "50"))
+DEFAULT_ACQUISITION_TIMEOUT = float(os.getenv("NEO_4J_ACQUISITION_TIMEOUT", "30"))
+DEFAULT_CONNECTION_LIFETIME = float(os.getenv("NEO_4J_CONNECTION_LIFETIME", "3600"))
+DEFAULT_DATABASE = os.getenv("NEO_4J_DATABASE", "neo4j")
+
+
+class _SessionDefaults:
+    # The shared driver, with default arguments for the sessions it opens:
+    # Neo4jGraph.query() only passes the database, the access mode comes from here
+    def __init__(self, driver, **defaults):
+        self._driver = driver
+        self._defaults = defaults
+
+    def session(self, **kwargs):
+        return self._driver.session(**{**self._defaults, **kwargs})
+
+    def __getattr__(self, name):
+        return getattr(self._driver, name)
+
+
+class SharedNeo4jGraph(Neo4jGraph):
+    # Neo4jGraph without its own driver: it borrows the pool's one (and doesn't close it).
+    # Neo4jGraph.__init__ would open a driver and check it, so the same attributes are set here;
+    # the queries (and the schema introspection) are Neo4jGraph's own
+    def __init__(self, pool, timeout=None, sanitize=False, access_mode=WRITE_ACCESS, enhanced_schema=False):
+        self._driver = _SessionDefaults(pool.driver, default_access_mode=access_mode)
+        self._database = pool.database
+        self.timeout = timeout
+        self.sanitize = sanitize
+        self.access_mode = access_mode
+        self._enhanced_schema = enhanced_schema
+        self.schema = ""
+        self.structured_schema = {}
+
+
+class Neo4jPool:
+    def __init__(
+        self,
+        url=None,
+        username=None,
+        password=None,
+        database=DEFAULT_DATABASE,
+        pool_size=DEFAULT_POOL_SIZE,
+        acquisition_timeout=DEFAULT_ACQUISITION_TIMEOUT,
+        connection_lifetime=DEFAULT_CONNECTION_LIFETIME,
+    ):
+        self.url = url or os.getenv("NEO_4J_URL")
+        self.auth = (username or os.getenv("NEO_4J_USER"), password or os.getenv("NEO_4J_PW"))
+        self.database = database
+        self.pool_size = pool_size
+        self.config = {
+            "max_connection_pool_size": pool_size,
+            "connection_acquisition_timeout": acquisition_timeout,
+            "max_connection_lifetime": connection_lifetime,
+        }
+        # The connections are opened lazily, on the first query
+        self.driver = GraphDatabase.driver(self.url, auth=self.auth, **self.config)
+        self._async_driver = None
+        self._executor = None
+        self._lock = threading.Lock()
+
+    @property
+    def async_driver(self):
+        # Created on first use: an async driver belongs to the event loop it is used in
+        if self._async_driver is None:
+            self._async_driver = AsyncGraphDatabase.driver(self.url, auth=self.auth, **self.config)
+        return self._async_driver
+
+    def graph(self, **kwargs):
+        return SharedNeo4jGraph(self, **kwargs)
+
+    def query(self, cypher, params=None, write=False):
+        records, _, _ = self.driver.execute_query(
+            cypher, params or {}, database_=self.database,
+            routing_=RoutingControl.WRITE if write else RoutingControl.READ,
+        )
+        return [record.data() for record in records]
+
+    async def aquery(self, cypher, params=None, write=False):
+        records, _, _ = await self.async_driver.execute_query(
+            cypher, params or {}, database_=self.database,
+            routing_=RoutingControl.WRITE if write else RoutingControl.READ,
+        )
+        return [record.data() for record in records]
+
+    def run_concurrently(self, *calls):
+        # Each call is a function without arguments (a query, a vector search, ...).
+        # They run on a thread pool as big as the connection pool, and the results come back in the same order
+        with self._lock:
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(max_workers=self.pool_size, thread_name_prefix="neo4j")
+        futures = [self._executor.submit(call) for call in calls]
+        return [future.result() for future in futures]
+
+    async def aquery_all(self, *queries):
+        # The async version for plain queries: each one is a (cypher, params) pair
+        return await asyncio.gather(*(self.aquery(cypher, params) for cypher, params in queries))
+
+    def close(self):
+        if self._executor is not None:
+            self._executor.shutdown(wait=False)
+        self.driver.close()
+
+    async def aclose(self):
+        if self._async_driver is not None:
+            await self._async_driver.close()
+            self._async_driver = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+_default_pool = None
+_default_pool_lock = threading.Lock()
+
+
+def get_pool():
+    global _default_pool
+    if _default_pool is None:
+        with _default_pool_lock:
+            if _default_pool is None:
+                _default_pool = Neo4jPool()
+    return _default_pool
+
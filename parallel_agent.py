@@ -0,0 +1,112 @@
+import re
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from langchain.agents import AgentExecutor, create_react_agent
+from langchain.agents.output_parsers import ReActSingleInputOutputParser
+from langchain_core.agents import AgentAction
+
+# Several independent tool calls in the same agent step, run at the same time
+#
+# The ReAct agents of 5-agents.py, 8-agent-with-retriever.py and 12-star-wars-chatbot.py pick one tool per LLM call.
+# "Compare the plots of film A and film B" costs a round trip to the LLM for A, then one for B, then the answer,
+# and the tool calls run one after the other.
+# Here:
+# - the prompt also explains how to write several Action / Action Input pairs before the Observation,
+#   and MultiActionReActParser turns them into a list of actions (a single action is parsed as before)
+# - ParallelAgentExecutor runs the actions of a step on a thread pool, at most `max_concurrency` at a time.
+#   The observations are put back in the order of the actions, whatever the order they finish in,
+#   so the scratchpad is the same as with a sequential run: the step takes as long as the slowest tool call
+# (the async API of AgentExecutor, ainvoke, already runs the actions of a step with asyncio.gather)
+
+PARALLEL_ACTIONS_INSTRUCTIONS = """
+When you need several tool calls that don't depend on each other (for example the same lookup for two different names),
+write them all in the same step, one Action / Action Input pair after the other, before the Observation:
+
+```
+Thought: Do I need to use a tool? Yes
+Action: the first action to take
+Action Input: the input to the first action
+Action: the second action to take
+Action Input: the input to the second action
+Observation: the results of the actions, in the same order
+```
+
+"""
+
+ACTION_PATTERN = re.compile(
+    r"Action\s*\d*\s*:[\s]*(?P<tool>.*?)[\s]*Action\s*\d*\s*Input\s*\d*\s*:[\s]*(?P<input>.*?)(?=\n\s*Action\s*\d*\s*:|$)",
+    re.DOTALL,
+)
+
+
+def allow_parallel_actions(prompt):
+    # Adds the instructions to a ReAct prompt like hwchase17/react-chat, before its "Begin!" (or at the top)
+    if "Begin!" in prompt.template:
+        template = prompt.template.replace("Begin!", PARALLEL_ACTIONS_INSTRUCTIONS + "Begin!", 1)
+    else:
+        template = PARALLEL_ACTIONS_INSTRUCTIONS + prompt.template
+    return prompt.copy(update={"template": template})
+
+
+class MultiActionReActParser(ReActSingleInputOutputParser):
+    def parse(self, text):
+        matches = list(ACTION_PATTERN.finditer(text))
+        # A final answer, a single action or an invalid output are handled as by the single action parser
+        if len(matches) < 2 or "Final Answer:" in text:
+            return super().parse(text)
+
+        actions = []
+        for i, match in enumerate(matches):
+            # The first action keeps the thought in its log, so the scratchpad reads like the model wrote it
+            log = text[:match.end()] if i == 0 else text[match.start():match.end()]
+            actions.append(AgentAction(match["tool"].strip(), match["input"].strip(" ").strip('"'), log.strip()))
+        return actions
+
+
+def create_parallel_react_agent(llm, tools, prompt):
+    return create_react_agent(llm, tools, allow_parallel_actions(prompt), output_parser=MultiActionReActParser())
+
+
+# Actions of the step being executed, per thread (one executor can serve several conversations at once)
+_current_step = threading.local()
+
+
+class _Step:
+    def __init__(self):
+        self.actions = []
+        self.results = None
+
+
+class ParallelAgentExecutor(AgentExecutor):
+    max_concurrency: int = 4
+    """Maximum number of tool calls of the same step running at the same time"""
+
+    def _iter_next_step(self, name_to_tool_map, color_mapping, inputs, intermediate_steps, run_manager=None):
+        # AgentExecutor yields all the actions of the step first, and only then performs them one by one:
+        # the actions are collected here, so the first _perform_agent_action can run them all together
+        previous = getattr(_current_step, "step", None)
+        step = _current_step.step = _Step()
+        try:
+            for output in super()._iter_next_step(
+                name_to_tool_map, color_mapping, inputs, intermediate_steps, run_manager
+            ):
+                if isinstance(output, AgentAction):
+                    step.actions.append(output)
+                yield output
+        finally:
+            _current_step.step = previous
+
+    def _perform_agent_action(self, name_to_tool_map, color_mapping, agent_action, run_manager=None):
+        step = getattr(_current_step, "step", None)
+        if step is None or len(step.actions) < 2 or self.max_concurrency < 2:
+            return super()._perform_agent_action(name_to_tool_map, color_mapping, agent_action, run_manager)
+
+        if step.results is None:
+            def perform(action):
+                return AgentExecutor._perform_agent_action(self, name_to_tool_map, color_mapping, action, run_manager)
+
+            with ThreadPoolExecutor(max_workers=min(self.max_concurrency, len(step.actions))) as executor:
+                # map() returns the results in the order of the actions
+                step.results = list(executor.map(perform, step.actions))
+        return next(result for action, result in zip(step.actions, step.results) if action is agent_action)
@@ -0,0 +1,179 @@
+import argparse
+import hashlib
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime, timezone
+
+from langchain_core.load import dumps, loads
+
+# Local registry of the LangChain hub prompts
+#
+# The agents call hub.pull("hwchase17/react-chat") on every start: a blocking HTTP request before anything else,
+# and the script can't start without network.
+# Here the pulled prompts are vendored in the `prompts` folder (commit it with the code):
+# - every version is a file named by the sha256 of its content: prompts/hwchase17/react-chat/<sha256>.json
+# - prompts/index.json says which version is the current one of each prompt, and when each version was pulled
+# - load_prompt() reads the current version from disk and checks its hash. Only a prompt that was never pulled
+#   goes to the hub (once, then it's on disk)
+# - the hub is asked for a new version only on explicit request (refresh), a changed prompt becomes a new version
+#   and the old ones stay there, so `load_prompt(name, version=...)` can pin one
+#
+#   python prompt_registry.py pull hwchase17/react-chat     (first pull, or refresh)
+#   python prompt_registry.py list
+#   python prompt_registry.py bench hwchase17/react-chat    (cold start: registry vs hub.pull)
+#
+# PROMPT_REGISTRY_DIR changes the folder, PROMPT_REGISTRY_OFFLINE=1 forbids any hub request.
+
+PROMPT_REGISTRY_DIR = os.getenv("PROMPT_REGISTRY_DIR", os.path.join(os.path.dirname(os.path.abspath(__file__)), "prompts"))
+
+
+def content_hash(text):
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+
+class PromptRegistry:
+    def __init__(self, directory=PROMPT_REGISTRY_DIR, offline=None):
+        self.directory = directory
+        self.offline = os.getenv("PROMPT_REGISTRY_OFFLINE") == "1" if offline is None else offline
+        self.index_path = os.path.join(directory, "index.json")
+
+    def _index(self):
+        if not os.path.exists(self.index_path):
+            return {}
+        with open(self.index_path) as f:
+            return json.load(f)
+
+    def _path(self, name, version):
+        return os.path.join(self.directory, *name.split("/"), f"{version}.json")
+
+    def store(self, name, prompt, source="hub"):
+        # Returns the version (content hash). Storing the same content again only makes it current
+        text = dumps(prompt, pretty=True)
+        version = content_hash(text)
+        path = self._path(name, version)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        if not os.path.exists(path):
+            with open(path, "w") as f:
+                f.write(text)
+
+        index = self._index()
+        entry = index.setdefault(name, {"current": None, "versions": {}})
+        entry["versions"].setdefault(version, {
+            "pulled_at": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+            "source": source,
+        })
+        entry["current"] = version
+        # Written to a temporary file and renamed: a crash can't leave a truncated index,
+        # and two processes storing at the same time don't write to the same temporary file
+        with tempfile.NamedTemporaryFile("w", dir=self.directory, prefix=".index.", suffix=".tmp", delete=False) as f:
+            json.dump(index, f, indent=2, sort_keys=True)
+        try:
+            os.replace(f.name, self.index_path)
+        except BaseException:
+            os.unlink(f.name)
+            raise
+        return version
+
+    def refresh(self, name):
+        if self.offline:
+            raise RuntimeError(f"Prompt {name} can't be pulled: PROMPT_REGISTRY_OFFLINE is set")
+        # Imported here: only a pull needs the hub client
+        from langchain import hub
+
+        return self.store(name, hub.pull(name))
+
+    def versions(self, name):
+        return self._index().get(name, {}).get("versions", {})
+
+    def load(self, name, version=None):
+        entry = self._index().get(name)
+        if entry is None and version is None:
+            # Never pulled: pulled now, then it's on disk
+            self.refresh(name)
+            entry = self._index()[name]
+        version = version or entry["current"]
+        path = self._path(name, version)
+        if not os.path.exists(path):
+            raise KeyError(f"Version {version} of prompt {name} is not in {self.directory}")
+        with open(path) as f:
+            text = f.read()
+        if content_hash(text) != version:
+            raise ValueError(f"{path} was modified: its content doesn't match its hash")
+        return loads(text)
+
+
+_registry = None
+
+
+def get_registry():
+    global _registry
+    if _registry is None:
+        _registry = PromptRegistry()
+    return _registry
+
+
+def load_prompt(name, version=None):
+    return get_registry().load(name, version)
+
+
+def _cold_start(code, runs):
+    # Every run is a new interpreter: imports included, like starting the script
+    times = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        result = subprocess.run(
+            [sys.executable, "-c", code], capture_output=True, text=True, cwd=os.path.dirname(os.path.abspath(__file__))
+        )
+        if result.returncode != 0:
+            return None, result.stderr.strip().splitlines()[-1]
+        times.append(time.perf_counter() - start)
+    return times, None
+
+
+def bench(name, runs):
+    candidates = {
+        # Baseline: the interpreter and the imports of the prompt classes, without reading any prompt
+        "imports": "import langchain_core.load, langchain_core.prompts",
+        "registry": f"import prompt_registry; prompt_registry.load_prompt({name!r})",
+        "hub.pull": f"from langchain import hub; hub.pull({name!r})",
+    }
+    for label, code in candidates.items():
+        times, error = _cold_start(code, runs)
+        if error:
+            print(f"{label:9} failed: {error}")
+            continue
+        ms = [t * 1000 for t in times]
+        print(f"{label:9} median {statistics.median(ms):8.1f} ms   min {min(ms):8.1f} ms   max {max(ms):8.1f} ms")
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    pull_parser = subparsers.add_parser("pull", help="Pull the latest version of prompts from the hub")
+    pull_parser.add_argument("names", nargs="+")
+    subparsers.add_parser("list", help="List the prompts in the registry")
+    bench_parser = subparsers.add_parser("bench", help="Cold start time: registry vs hub.pull")
+    bench_parser.add_argument("name")
+    bench_parser.add_argument("--runs", type=int, default=5)
+    args = parser.parse_args()
+
+    registry = get_registry()
+    if args.command == "pull":
+        for name in args.names:
+            print(f"{name}: {registry.refresh(name)}")
+    elif args.command == "list":
+        for name, entry in sorted(registry._index().items()):
+            for version, info in entry["versions"].items():
+                current = "*" if version == entry["current"] else " "
+                print(f"{current} {name} {version[:12]} pulled at {info['pulled_at']} from {info['source']}")
+    else:
+        bench(args.name, args.runs)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,135 @@
+import hashlib
+import json
+import os
+import re
+
+from dotenv import load_dotenv
+
+from neo4j_pool import Neo4jPool, get_pool
+
+# Schema snapshot and compact schema rendering for Neo4jGraph
+#
+# Neo4jGraph introspects the schema when it's created: several APOC/metadata queries on every process start.
+# load_graph() creates it (on the shared driver of neo4j_pool.py) without the introspection and takes the schema from a snapshot on disk instead.
+# The snapshot is still valid as long as the graph has the same labels, relationship types and property keys:
+# those come from three cheap metadata procedures, hashed into a signature that is compared to the saved one.
+#
+# The full schema text is also pasted in every Cypher generation prompt. compact_schema() renders only the part of
+# the schema that the question is about: the labels and relationship types it mentions, plus their neighbours.
+
+load_dotenv()
+
+DEFAULT_SCHEMA_PATH = ".neo4j_schema.json"
+
+SIGNATURE_QUERY = """
+CALL db.labels() YIELD label
+WITH collect(label) AS labels
+CALL db.relationshipTypes() YIELD relationshipType
+WITH labels, collect(relationshipType) AS types
+CALL db.propertyKeys() YIELD propertyKey
+RETURN labels, types, collect(propertyKey) AS keys
+"""
+
+
+def schema_signature(graph):
+    [row] = graph.query(SIGNATURE_QUERY)
+    payload = json.dumps({key: sorted(values) for key, values in row.items()}, sort_keys=True)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+def load_graph(url=None, username=None, password=None, path=DEFAULT_SCHEMA_PATH, pool=None, **kwargs):
+    # The graph uses the driver shared by the whole process (see neo4j_pool.py),
+    # unless other credentials are given explicitly
+    if pool is None:
+        pool = Neo4jPool(url, username, password) if (url or username or password) else get_pool()
+    graph = pool.graph(**kwargs)
+    signature = schema_signature(graph)
+
+    if path and os.path.exists(path):
+        with open(path) as f:
+            snapshot = json.load(f)
+        if snapshot.get("signature") == signature:
+            graph.structured_schema = snapshot["structured_schema"]
+            graph.schema = snapshot["schema"]
+            return graph
+
+    # No snapshot or the graph changed: introspect it as Neo4jGraph would, and save the result
+    graph.refresh_schema()
+    if path:
+        with open(path, "w") as f:
+            json.dump({"signature": signature, "structured_schema": graph.structured_schema, "schema": graph.schema},
+                      f, default=str)
+    return graph
+
+
+# Compact rendering
+
+# Properties that almost every label has: they don't tell what the question is about
+GENERIC_PROPERTIES = ("name", "title", "id", "url")
+
+
+def _words(text):
+    # "ACTED_IN" -> {"acted", "in"}, "Tom Hanks' movies" -> {"tom", "hanks", "movies", "movie"}
+    words = set()
+    for word in re.findall(r"[a-z0-9]+", re.sub(r"([a-z])([A-Z])", r"\1 \2", text).lower()):
+        words.add(word)
+        # Very rough singular, so "movies" matches Movie and "genres" matches Genre
+        if word.endswith("ies"):
+            words.add(word[:-3] + "y")
+        elif word.endswith("s"):
+            words.add(word[:-1])
+        # "acted", "directed" -> "act", "direct"
+        if word.endswith("ed"):
+            words.add(word[:-2])
+    return words
+
+
+def _mentioned(name, question_words):
+    name_words = _words(name) - {"in", "of", "by", "to"}
+    return bool(name_words) and bool(name_words & question_words)
+
+
+def _render(node_props, rel_props, relationships):
+    def props(properties):
+        return ", ".join(f"{p['property']}: {p['type']}" for p in properties)
+
+    lines = ["Node properties are the following:"]
+    lines += [f"{label} {{{props(properties)}}}" for label, properties in node_props.items()]
+    lines += ["Relationship properties are the following:"]
+    lines += [f"{rel_type} {{{props(properties)}}}" for rel_type, properties in rel_props.items()]
+    lines += ["The relationships are the following:"]
+    lines += [f"(:{r['start']})-[:{r['type']}]->(:{r['end']})" for r in relationships]
+    return "\n".join(lines)
+
+
+def compact_schema(structured_schema, question):
+    node_props = structured_schema.get("node_props", {})
+    rel_props = structured_schema.get("rel_props", {})
+    relationships = structured_schema.get("relationships", [])
+    question_words = _words(question)
+
+    def mentioned_property(properties):
+        return any(
+            p["property"] not in GENERIC_PROPERTIES and _mentioned(p["property"], question_words) for p in properties
+        )
+
+    # A label or a relationship type is mentioned by name, or through one of its properties ("role", "rating"...)
+    labels = {
+        label for label, properties in node_props.items()
+        if _mentioned(label, question_words) or mentioned_property(properties)
+    }
+    rel_types = {r["type"] for r in relationships if _mentioned(r["type"], question_words)}
+    rel_types |= {rel_type for rel_type, properties in rel_props.items() if mentioned_property(properties)}
+    if not labels and not rel_types:
+        # Nothing recognizable: better the full schema than a wrong one
+        return _render(node_props, rel_props, relationships)
+
+    # Keep the relationships around the mentioned labels, and the labels at their ends
+    kept = [r for r in relationships if r["type"] in rel_types or r["start"] in labels or r["end"] in labels]
+    labels |= {r["start"] for r in kept} | {r["end"] for r in kept}
+    kept_types = {r["type"] for r in kept}
+    return _render(
+        {label: properties for label, properties in node_props.items() if label in labels},
+        {rel_type: properties for rel_type, properties in rel_props.items() if rel_type in kept_types},
+        kept,
+    )
@@ -0,0 +1,137 @@
+import logging
+import threading
+from typing import Any, Optional
+
+import numpy as np
+from langchain.memory.utils import get_prompt_input_key
+from langchain_core.embeddings import Embeddings
+from langchain_core.messages import SystemMessage, get_buffer_string
+from langchain_core.pydantic_v1 import PrivateAttr
+
+from summary_memory import RollingSummaryMemory
+
+# Conversation memory that can recall old exchanges by meaning
+#
+# RollingSummaryMemory keeps the recent messages verbatim and only a summary of the older ones: in a long session
+# the details of something said many turns ago ("the planet we talked about at the beginning") are lost.
+# SemanticHistoryMemory also indexes every exchange (human message + answer) that leaves the window:
+# - the exchanges are embedded in the background worker that writes the summary, all those that left the window
+#   since the last time in a single embed_documents call
+# - at prompt time the question is embedded (one embed_query, skipped while nothing is indexed) and the `k` most
+#   similar earlier exchanges, by cosine similarity, go in the prompt verbatim, in the order they were said,
+#   up to `relevant_token_limit` tokens
+# So the prompt is: summary + relevant earlier exchanges + recent window, bounded whatever the length of the session.
+# Wrap the embeddings in CachedEmbeddings (embedding_cache.py): after a restart the reloaded history
+# is indexed again from the cache, without calling the provider.
+
+logger = logging.getLogger(__name__)
+
+
+class _ExchangeIndex:
+    # Shared by the copies of the memory, like _SummaryState
+    def __init__(self):
+        self.lock = threading.Lock()
+        # Messages that left the window and are not indexed yet
+        self.pending = []
+        self.texts = []
+        self.vectors = []
+        self._matrix = None
+
+    def add(self, texts, vectors):
+        vectors = np.asarray(vectors, dtype=np.float32)
+        norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+        norms[norms == 0] = 1
+        self.texts.extend(texts)
+        self.vectors.extend(vectors / norms)
+        self._matrix = None
+
+    def search(self, vector, k, min_score=None):
+        if not self.vectors:
+            return []
+        if self._matrix is None or self._matrix.shape[0] != len(self.vectors):
+            self._matrix = np.stack(self.vectors)
+        vector = np.asarray(vector, dtype=np.float32)
+        scores = self._matrix @ (vector / (np.linalg.norm(vector) or 1))
+        rows = np.argsort(-scores)[:k]
+        return [(int(row), float(scores[row])) for row in rows if min_score is None or scores[row] >= min_score]
+
+    def clear(self):
+        self.pending = []
+        self.texts = []
+        self.vectors = []
+        self._matrix = None
+
+
+class SemanticHistoryMemory(RollingSummaryMemory):
+    embeddings: Embeddings
+    """Embeds the exchanges and the questions"""
+    k: int = 3
+    """Earlier exchanges recalled for each question"""
+    min_score: Optional[float] = None
+    """Minimum cosine similarity of a recalled exchange"""
+    relevant_token_limit: int = 500
+    """Tokens of the recalled exchanges"""
+    relevant_prefix: str = "Relevant earlier exchanges of this conversation:\n"
+    input_key: Optional[str] = None
+
+    _index: Any = PrivateAttr(default_factory=_ExchangeIndex)
+
+    def _question(self, inputs):
+        if not inputs:
+            return None
+        key = self.input_key or get_prompt_input_key(inputs, self.memory_variables)
+        return inputs.get(key)
+
+    def relevant(self, question):
+        index = self._index
+        if not question or not index.vectors:
+            return []
+        hits = index.search(self.embeddings.embed_query(question), self.k, self.min_score)
+        rows, tokens = [], 0
+        # The most similar first, as long as they fit
+        for row, _ in hits:
+            tokens += self._counter(index.texts[row])
+            if tokens > self.relevant_token_limit:
+                break
+            rows.append(row)
+        return [index.texts[row] for row in sorted(rows)]
+
+    def _context_messages(self, inputs):
+        messages = super()._context_messages(inputs)
+        try:
+            relevant = self.relevant(self._question(inputs))
+        except Exception:
+            # Recall is a bonus: the question is answered anyway
+            logger.exception("Could not recall the earlier exchanges")
+            relevant = []
+        if relevant:
+            messages.append(SystemMessage(content=self.relevant_prefix + "\n\n".join(relevant)))
+        return messages
+
+    def _scheduled(self, messages):
+        super()._scheduled(messages)
+        self._index.pending.extend(messages)
+
+    def _fold(self):
+        # Indexed first: the recall is available before the (slower) summary is written
+        self._embed()
+        super()._fold()
+
+    def _embed(self):
+        index = self._index
+        with index.lock:
+            # Everything that left the window so far, also the exchanges of a previous call that failed
+            messages = list(index.pending)
+            texts = [get_buffer_string(messages[i:i + 2]) for i in range(0, len(messages), 2)]
+            if not texts:
+                return
+            try:
+                index.add(texts, self.embeddings.embed_documents(texts))
+                del index.pending[:len(messages)]
+            except Exception:
+                logger.exception("Could not index %d exchanges of the conversation", len(texts))
+
+    def clear(self) -> None:
+        super().clear()
+        with self._index.lock:
+            self._index.clear()
@@ -0,0 +1,108 @@
+import os
+import sys
+import time
+
+from dotenv import load_dotenv
+from langchain_core.callbacks import BaseCallbackHandler
+
+# Streaming output for the chat loops
+#
+# The REPLs used to wait for the whole answer and then print response["output"]: with an agent that's
+# several LLM calls and tool calls of silence. StreamingPrinter is a callback handler passed to invoke():
+# - it prints the tokens of the answer as soon as they arrive from the LLM
+# - for an agent, only the tokens after "Final Answer:" are the answer: the thoughts and actions are not printed,
+#   but every tool call shows a progress line when it starts and when it ends
+# - it measures the time to the first token of the answer, and the total time
+# Tokens come only from LLMs that stream: agents always do (AgentExecutor streams the agent runnable),
+# plain chains need a model created with streaming=True.
+# STREAM_OUTPUT=false in the .env file goes back to printing the whole answer at the end.
+
+load_dotenv()
+
+STREAM_OUTPUT = os.getenv("STREAM_OUTPUT", "true").lower() not in ("false", "0", "no")
+
+
+class StreamingPrinter(BaseCallbackHandler):
+    def __init__(self, answer_prefix=None, enabled=STREAM_OUTPUT, show_tools=True, show_timing=True, file=None):
+        # answer_prefix: tokens are printed only after this text (like "Final Answer:" for the ReAct agents)
+        self.answer_prefix = answer_prefix
+        self.enabled = enabled
+        self.show_tools = show_tools
+        self.show_timing = show_timing
+        self.file = file or sys.stdout
+        self.start()
+
+    def start(self):
+        # Call before every question
+        self.started_at = time.perf_counter()
+        self.first_token_at = None
+        self.streamed = False
+        self._buffers = {}
+        self._tools = {}
+
+    @property
+    def time_to_first_token(self):
+        return None if self.first_token_at is None else self.first_token_at - self.started_at
+
+    def _write(self, text):
+        self.file.write(text)
+        self.file.flush()
+
+    def _emit(self, token):
+        if not token:
+            return
+        if self.first_token_at is None:
+            self.first_token_at = time.perf_counter()
+        self.streamed = True
+        self._write(token)
+
+    def on_llm_start(self, serialized, prompts, *, run_id, **kwargs):
+        self._buffers[run_id] = "" if self.answer_prefix else None
+
+    def on_chat_model_start(self, serialized, messages, *, run_id, **kwargs):
+        self.on_llm_start(serialized, [], run_id=run_id, **kwargs)
+
+    def on_llm_new_token(self, token, *, run_id, **kwargs):
+        if not self.enabled:
+            return
+        buffer = self._buffers.get(run_id)
+        if buffer is None:
+            # No prefix to wait for (or already found): the token is part of the answer
+            self._emit(token)
+            return
+        buffer += token
+        if self.answer_prefix in buffer:
+            self._buffers[run_id] = None
+            self._emit(buffer.split(self.answer_prefix, 1)[1].lstrip())
+        else:
+            self._buffers[run_id] = buffer
+
+    def on_llm_end(self, response, *, run_id, **kwargs):
+        self._buffers.pop(run_id, None)
+
+    def on_tool_start(self, serialized, input_str, *, run_id, **kwargs):
+        name = serialized.get("name", "tool")
+        self._tools[run_id] = (name, time.perf_counter())
+        if self.enabled and self.show_tools:
+            self._write(f"[{name}] {input_str}\n")
+
+    def on_tool_end(self, output, *, run_id, **kwargs):
+        self._tool_done(run_id, "done in")
+
+    def on_tool_error(self, error, *, run_id, **kwargs):
+        self._tool_done(run_id, "failed after", f": {error}")
+
+    def _tool_done(self, run_id, status, detail=""):
+        name, started_at = self._tools.pop(run_id, (None, None))
+        if self.enabled and self.show_tools and started_at is not None:
+            self._write(f"[{name} {status} {time.perf_counter() - started_at:.2f}s{detail}]\n")
+
+    def finish(self, output):
+        # Prints the answer if it was not streamed (streaming disabled, or an answer returned directly by a tool)
+        if not self.streamed:
+            self._emit(str(output))
+        self._write("\n")
+        if self.show_timing:
+            total = time.perf_counter() - self.started_at
+            first = self.time_to_first_token if self.first_token_at is not None else total
+            self._write(f"(first token after {first:.2f}s, answer in {total:.2f}s)\n")
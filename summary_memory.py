@@ -0,0 +1,167 @@
+import logging
+import threading
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, List
+
+from langchain.memory.chat_memory import BaseChatMemory
+from langchain.memory.prompt import SUMMARY_PROMPT
+from langchain_core.language_models import BaseLanguageModel
+from langchain_core.messages import AIMessage, HumanMessage, SystemMessage, get_buffer_string
+from langchain_core.prompts import BasePromptTemplate
+from langchain_core.pydantic_v1 import PrivateAttr
+
+from tool_budget import TokenCounter
+
+# Conversation memory with a bounded prompt size
+#
+# ConversationBufferMemory puts the whole transcript in every prompt: the prompt (and latency, and cost) grows
+# with every turn, until it doesn't fit the context window anymore.
+# RollingSummaryMemory keeps only the most recent messages verbatim, up to `max_token_limit` tokens.
+# The older ones are folded into a running summary, a few messages at a time, by the LLM:
+# - the summary is updated incrementally (previous summary + new lines -> new summary, langchain's SUMMARY_PROMPT)
+# - it's done in a background thread, after the answer was returned: no extra LLM call on the request path
+# - the messages that left the window are not in the prompt while their summary is being written, so the prompt
+#   stays flat; at worst the summary is one turn behind
+# The full transcript is still in chat_memory: only what goes into the prompt is bounded.
+
+logger = logging.getLogger(__name__)
+
+
+class _SummaryState:
+    # Chains keep a (shallow) copy of the memory they are given: the state lives in a separate object,
+    # so the copies in the agent and in the chains share it, like they share chat_memory
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.executor = None
+        # Keys of the messages of chat_memory already handed to the summarizer (see message_key()),
+        # and the messages handed to it that are not in the summary yet, in order
+        self.scheduled = set()
+        self.unsummarized = []
+        self.summary = ""
+
+
+def message_key(message):
+    # Progress is tracked by message, not by position: the history is not always append-only (a persistent history
+    # picks up the messages of other processes, and keeps only a window of the conversation).
+    # The memory gives an id to the messages it saves, the others are told apart by identity
+    return message.id or id(message)
+
+
+class RollingSummaryMemory(BaseChatMemory):
+    llm: BaseLanguageModel
+    """Model that writes the summary"""
+    prompt: BasePromptTemplate = SUMMARY_PROMPT
+    max_token_limit: int = 1000
+    """Tokens of the recent messages kept verbatim"""
+    memory_key: str = "history"
+    summary_prefix: str = "Summary of the earlier conversation: "
+    background: bool = True
+    """Whether the summary is written in a background thread (False: synchronously in save_context)"""
+
+    _counter: Any = PrivateAttr(default_factory=TokenCounter)
+    _state: Any = PrivateAttr(default_factory=_SummaryState)
+
+    @property
+    def memory_variables(self) -> List[str]:
+        return [self.memory_key]
+
+    @property
+    def summary(self):
+        return self._state.summary
+
+    def _tokens(self, message):
+        return self._counter(get_buffer_string([message]))
+
+    def window(self):
+        scheduled = self._state.scheduled
+        return [message for message in self.chat_memory.messages if message_key(message) not in scheduled]
+
+    def _context_messages(self, inputs):
+        # What goes before the window: the summary of the older messages
+        if self.summary:
+            return [SystemMessage(content=self.summary_prefix + self.summary)]
+        return []
+
+    def load_memory_variables(self, inputs: Dict[str, Any]) -> Dict[str, Any]:
+        # Once per turn: the messages added by other processes (see chat_history_store.py), and a window that fits,
+        # also the first time after a restart, when the reloaded history can be longer than the window
+        sync = getattr(self.chat_memory, "sync", None)
+        if sync is not None:
+            sync()
+        self._schedule()
+        messages = self._context_messages(inputs) + self.window()
+        if self.return_messages:
+            return {self.memory_key: messages}
+        return {self.memory_key: get_buffer_string(messages)}
+
+    def _exchange(self, inputs, outputs):
+        # Like BaseChatMemory.save_context, but the messages get an id (see message_key())
+        input_str, output_str = self._get_input_output(inputs, outputs)
+        return [
+            HumanMessage(content=input_str, id=uuid.uuid4().hex),
+            AIMessage(content=output_str, id=uuid.uuid4().hex),
+        ]
+
+    def save_context(self, inputs: Dict[str, Any], outputs: Dict[str, str]) -> None:
+        self.chat_memory.add_messages(self._exchange(inputs, outputs))
+        self._schedule()
+
+    async def asave_context(self, inputs: Dict[str, Any], outputs: Dict[str, str]) -> None:
+        await self.chat_memory.aadd_messages(self._exchange(inputs, outputs))
+        self._schedule()
+
+    def _schedule(self):
+        state = self._state
+        window = self.window()
+        tokens = sum(self._tokens(message) for message in window)
+        overflow = 0
+        # The oldest exchanges (human + AI message) leave the window until it fits, but the last one always stays
+        while tokens > self.max_token_limit and len(window) - overflow > 2:
+            tokens -= sum(self._tokens(message) for message in window[overflow:overflow + 2])
+            overflow += 2
+        if not overflow:
+            return
+
+        self._scheduled(window[:overflow])
+        if not self.background:
+            self._fold()
+            return
+        if state.executor is None:
+            # A single worker: the folds happen one after the other, in order
+            state.executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="memory-summary")
+        state.executor.submit(self._fold)
+
+    def _scheduled(self, messages):
+        # The messages leave the window: they wait for the summarizer
+        state = self._state
+        state.scheduled.update(message_key(message) for message in messages)
+        state.unsummarized.extend(messages)
+
+    def _fold(self):
+        state = self._state
+        with state.lock:
+            # Also retries the messages of a previous fold that failed
+            messages = list(state.unsummarized)
+            if not messages:
+                return
+            try:
+                state.summary = self.llm.predict(
+                    self.prompt.format(summary=state.summary, new_lines=get_buffer_string(messages))
+                ).strip()
+                # Only the ones summarized: more can have been scheduled meanwhile
+                del state.unsummarized[:len(messages)]
+            except Exception:
+                logger.exception("Could not update the conversation summary")
+
+    def flush(self):
+        # Waits for the summaries being written
+        if self._state.executor is not None:
+            self._state.executor.submit(lambda: None).result()
+
+    def clear(self) -> None:
+        self.flush()
+        super().clear()
+        self._state.scheduled = set()
+        self._state.unsummarized = []
+        self._state.summary = ""
@@ -0,0 +1,169 @@
+import json
+import re
+import sqlite3
+import threading
+import time
+from urllib.parse import parse_qsl, urlencode, urlsplit, urlunsplit
+
+from lru_cache import CacheStats
+
+# Response cache for the SWAPI tools
+#
+# SWAPI data practically never changes, but the agent asks for the same "https://swapi.dev/api/people/1/"
+# over and over, even in the same conversation. So responses are cached:
+# - in memory, with a LRU policy (bounded size) and a TTL
+# - optionally on disk (sqlite), so the cache survives restarts
+# Both tiers count hits, misses and evictions, to check that the cache is actually useful
+# (the memory tier is the generic LRUTTLCache of lru_cache.py)
+
+
+def normalize_term(term):
+    # SWAPI search is case insensitive, so "Luke  skywalker " and "luke skywalker" are the same search
+    return re.sub(r"\s+", " ", term).strip().casefold()
+
+
+def cache_key(url, params=None):
+    # Canonical form of a resource url plus its query params:
+    # - lowercase scheme and host, always a trailing slash on the path
+    # - query params merged with `params`, sorted, and the search term normalized
+    parts = urlsplit(url)
+    path = parts.path if parts.path.endswith("/") else parts.path + "/"
+
+    query = dict(parse_qsl(parts.query))
+    query.update(params or {})
+    if "search" in query:
+        query["search"] = normalize_term(query["search"])
+    # Page 1 is the default page
+    if query.get("page") in ("1", 1):
+        del query["page"]
+
+    return urlunsplit((parts.scheme.lower(), parts.netloc.lower(), path, urlencode(sorted(query.items())), ""))
+
+
+class SqliteCache:
+    # Disk tier. Expired rows are ignored on read and purged on write, so the file doesn't grow forever.
+    # Since SQLite connections can't be shared across threads, each thread opens its own.
+    # They are all tracked, so close() can close them
+
+    def __init__(self, path, ttl=7 * 24 * 60 * 60, max_entries=10_000, clock=time.time):
+        self.path = path
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.clock = clock
+        self.stats = CacheStats()
+        self._local = threading.local()
+        self._connections = []
+        self._lock = threading.Lock()
+        with self._connection() as conn:
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS responses ("
+                " key TEXT PRIMARY KEY,"
+                " value TEXT NOT NULL,"
+                " expires_at REAL,"
+                " accessed_at REAL NOT NULL)"
+            )
+            conn.execute("CREATE INDEX IF NOT EXISTS responses_accessed_at ON responses (accessed_at)")
+
+    def _connection(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            # Only used by this thread, but closed by the one calling close()
+            conn = sqlite3.connect(self.path, check_same_thread=False)
+            conn.execute("PRAGMA journal_mode=WAL")
+            self._local.conn = conn
+            with self._lock:
+                self._connections.append(conn)
+        return conn
+
+    def close(self):
+        with self._lock:
+            for conn in self._connections:
+                conn.close()
+            self._connections = []
+            # A thread using the cache again opens a new connection
+            self._local = threading.local()
+
+    def get(self, key, default=None):
+        conn = self._connection()
+        row = conn.execute("SELECT value, expires_at FROM responses WHERE key = ?", (key,)).fetchone()
+        now = self.clock()
+        if row is None:
+            self.stats.misses += 1
+            return default
+        value, expires_at = row
+        if expires_at is not None and expires_at <= now:
+            with conn:
+                conn.execute("DELETE FROM responses WHERE key = ?", (key,))
+            self.stats.expirations += 1
+            self.stats.misses += 1
+            return default
+
+        with conn:
+            conn.execute("UPDATE responses SET accessed_at = ? WHERE key = ?", (now, key))
+        self.stats.hits += 1
+        return json.loads(value)
+
+    def set(self, key, value):
+        conn = self._connection()
+        now = self.clock()
+        expires_at = now + self.ttl if self.ttl else None
+        with conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO responses (key, value, expires_at, accessed_at) VALUES (?, ?, ?, ?)",
+                (key, json.dumps(value), expires_at, now),
+            )
+            conn.execute("DELETE FROM responses WHERE expires_at IS NOT NULL AND expires_at <= ?", (now,))
+            # Least recently accessed rows go first when the table is full
+            evicted = conn.execute(
+                "DELETE FROM responses WHERE key IN ("
+                " SELECT key FROM responses ORDER BY accessed_at DESC LIMIT -1 OFFSET ?)",
+                (self.max_entries,),
+            ).rowcount
+            self.stats.evictions += max(evicted, 0)
+
+    def clear(self):
+        conn = self._connection()
+        with conn:
+            conn.execute("DELETE FROM responses")
+
+    def __len__(self):
+        return self._connection().execute("SELECT COUNT(*) FROM responses").fetchone()[0]
+
+
+class TieredCache:
+    # Memory first, then disk. A disk hit is promoted to memory
+
+    def __init__(self, memory, disk=None):
+        self.memory = memory
+        self.disk = disk
+
+    def get(self, key, default=None):
+        value = self.memory.get(key)
+        if value is not None:
+            return value
+        if self.disk is not None:
+            value = self.disk.get(key)
+            if value is not None:
+                self.memory.set(key, value)
+                return value
+        return default
+
+    def set(self, key, value):
+        self.memory.set(key, value)
+        if self.disk is not None:
+            self.disk.set(key, value)
+
+    def clear(self):
+        self.memory.clear()
+        if self.disk is not None:
+            self.disk.clear()
+
+    def close(self):
+        if self.disk is not None:
+            self.disk.close()
+
+    def stats(self):
+        result = {"memory": self.memory.stats.as_dict()}
+        if self.disk is not None:
+            result["disk"] = self.disk.stats.as_dict()
+        return result
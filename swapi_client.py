@@ -0,0 +1,209 @@
+import json
+import os
+import re
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+from dotenv import load_dotenv
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+from lru_cache import LRUTTLCache
+from swapi_cache import SqliteCache, TieredCache, cache_key
+
+# Shared HTTP layer for the SWAPI tools of 12-star-wars-chatbot.py
+#
+# Calling bare `requests.get` opens a brand new TCP (and TLS) connection on every tool call.
+# A ReAct chain that follows the "characters" urls of a film makes a lot of these calls in a row,
+# so here a single `requests.Session` is shared: it keeps the connections alive and reuses them from a pool.
+# On top of that there are timeouts (a tool call should never hang the agent) and retries with backoff
+# for the transient errors SWAPI sometimes returns
+
+load_dotenv()
+
+SWAPI_BASE_URL = os.getenv("SWAPI_BASE_URL", "https://swapi.dev/api/")
+
+# Defaults can be tuned from the .env file
+DEFAULT_POOL_SIZE = int(os.getenv("SWAPI_POOL_SIZE", "10"))
+DEFAULT_CONNECT_TIMEOUT = float(os.getenv("SWAPI_CONNECT_TIMEOUT", "3.05"))
+DEFAULT_READ_TIMEOUT = float(os.getenv("SWAPI_READ_TIMEOUT", "10"))
+DEFAULT_RETRIES = int(os.getenv("SWAPI_RETRIES", "3"))
+DEFAULT_BACKOFF_FACTOR = float(os.getenv("SWAPI_BACKOFF_FACTOR", "0.3"))
+
+# Response cache (see swapi_cache.py). Set SWAPI_CACHE_PATH to also keep the responses on disk
+DEFAULT_CACHE_SIZE = int(os.getenv("SWAPI_CACHE_SIZE", "512"))
+DEFAULT_CACHE_TTL = float(os.getenv("SWAPI_CACHE_TTL", str(24 * 60 * 60)))
+DEFAULT_CACHE_PATH = os.getenv("SWAPI_CACHE_PATH")
+
+# Offline snapshot (see swapi_snapshot.py). When set, the tools never call the network
+SWAPI_SNAPSHOT = os.getenv("SWAPI_SNAPSHOT")
+
+
+def build_cache(maxsize=DEFAULT_CACHE_SIZE, ttl=DEFAULT_CACHE_TTL, path=DEFAULT_CACHE_PATH):
+    disk = SqliteCache(path) if path else None
+    return TieredCache(LRUTTLCache(maxsize=maxsize, ttl=ttl), disk)
+
+
+class SwapiClient:
+    def __init__(
+        self,
+        base_url=SWAPI_BASE_URL,
+        pool_size=DEFAULT_POOL_SIZE,
+        connect_timeout=DEFAULT_CONNECT_TIMEOUT,
+        read_timeout=DEFAULT_READ_TIMEOUT,
+        retries=DEFAULT_RETRIES,
+        backoff_factor=DEFAULT_BACKOFF_FACTOR,
+        cache=None,
+    ):
+        self.cache = cache
+        self.base_url = base_url if base_url.endswith("/") else base_url + "/"
+        self.timeout = (connect_timeout, read_timeout)
+        self.pool_size = pool_size
+
+        # Retry only idempotent requests (SWAPI is read only, so GET is all we do)
+        # The sleep between retries is backoff_factor * 2^(retry number)
+        retry = Retry(
+            total=retries,
+            backoff_factor=backoff_factor,
+            status_forcelist=(429, 500, 502, 503, 504),
+            allowed_methods=frozenset(["GET", "HEAD"]),
+            respect_retry_after_header=True,
+        )
+        # pool_connections is the number of hosts to keep a pool for, pool_maxsize the connections kept per host.
+        # SWAPI is a single host, but the maxsize matters when tools run concurrently
+        adapter = HTTPAdapter(
+            pool_connections=1,
+            pool_maxsize=pool_size,
+            max_retries=retry,
+        )
+
+        self.session = requests.Session()
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+        self.session.headers.update({
+            "Accept": "application/json",
+            "Connection": "keep-alive",
+        })
+
+    def resource_url(self, resource):
+        # "films" -> "https://swapi.dev/api/films/"
+        return self.base_url + resource.strip("/") + "/"
+
+    def get(self, url, params=None):
+        response = self.session.get(url, params=params, timeout=self.timeout)
+        # Raises requests.HTTPError for 4xx/5xx once the retries are exhausted
+        response.raise_for_status()
+        return response
+
+    def get_text(self, url, params=None):
+        if self.cache is None:
+            return self.get(url, params=params).text
+
+        # Repeated questions never leave the process: the key is the canonical url plus the normalized search term
+        key = cache_key(url, params)
+        text = self.cache.get(key)
+        if text is None:
+            # Only successful responses get here, errors are raised by get()
+            text = self.get(url, params=params).text
+            self.cache.set(key, text)
+        return text
+
+    def get_json(self, url, params=None):
+        return json.loads(self.get_text(url, params=params))
+
+    def get_many(self, urls, max_workers=None):
+        # Fetches a list of resource urls concurrently on a bounded thread pool.
+        # Duplicated urls are fetched once. Returns {url: record} in input order, plus {url: error} for the failed ones
+        unique_urls = list(dict.fromkeys(url.strip() for url in urls if url and url.strip()))
+        records, errors = {}, {}
+        if not unique_urls:
+            return records, errors
+
+        # No point having more threads than connections in the pool
+        workers = min(max_workers or self.pool_size, self.pool_size, len(unique_urls))
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            futures = [(url, executor.submit(self.get_json, url)) for url in unique_urls]
+            for url, future in futures:
+                try:
+                    records[url] = future.result()
+                except (requests.RequestException, ValueError) as e:
+                    errors[url] = str(e)
+        return records, errors
+
+    def close(self):
+        self.session.close()
+        # A plain LRUTTLCache has nothing to close
+        if hasattr(self.cache, "close"):
+            self.cache.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+# One client for the whole process, so every tool shares the same connection pool.
+# If a snapshot is configured, it is returned instead: it has the same interface
+_default_client = None
+_default_client_lock = threading.Lock()
+
+
+def get_client():
+    global _default_client
+    if _default_client is None:
+        with _default_client_lock:
+            if _default_client is None and SWAPI_SNAPSHOT:
+                from swapi_snapshot import SwapiSnapshot
+                _default_client = SwapiSnapshot.load(SWAPI_SNAPSHOT)
+            elif _default_client is None:
+                _default_client = SwapiClient(cache=build_cache())
+    return _default_client
+
+
+def iter_pages(url, params=None, client=None, prefetch=True, limit=None):
+    # Walks the `next` links of a paginated listing lazily, one page at a time.
+    # With prefetch, the following page is requested in the background while the caller processes the current one,
+    # but only if the caller still needs records: with `limit`, no page is requested once `limit` records were yielded.
+    # Stopping the iteration early (break, or closing the generator) stops the walk: no more pages are requested
+    client = client or get_client()
+    executor = ThreadPoolExecutor(max_workers=1) if prefetch else None
+    seen = 0
+    try:
+        page = client.get_json(url, params=params)
+        while True:
+            seen += len(page.get("results", []))
+            next_url = page.get("next") if limit is None or seen < limit else None
+            future = executor.submit(client.get_json, next_url) if executor and next_url else None
+            yield page
+            if not next_url:
+                return
+            page = future.result() if future else client.get_json(next_url)
+    finally:
+        if executor:
+            executor.shutdown(wait=False, cancel_futures=True)
+
+
+# Fields that make a record big but are useless to answer a question
+_NOISY_FIELDS = ("created", "edited")
+_RESOURCE_IN_URL = re.compile(r"/api/(?P<resource>\w+)/\d+/?$")
+
+
+def hydrate(urls, client=None, max_workers=None):
+    # Resolves a batch of SWAPI urls (like the "characters" of a film) with a single tool call
+    # and merges the records into one compact JSON, grouped by resource type:
+    # {"people": [{...}, ...], "planets": [...], "errors": {url: message}}
+    client = client or get_client()
+    records, errors = client.get_many(urls, max_workers=max_workers)
+
+    merged = {}
+    for url, record in records.items():
+        match = _RESOURCE_IN_URL.search(url)
+        resource = match["resource"] if match else "other"
+        merged.setdefault(resource, []).append(
+            {key: value for key, value in record.items() if key not in _NOISY_FIELDS}
+        )
+    if errors:
+        merged["errors"] = errors
+    return json.dumps(merged, separators=(",", ":"))
@@ -0,0 +1,192 @@
+import argparse
+import gzip
+import json
+import math
+import re
+import time
+from urllib.parse import parse_qsl, urlencode, urlsplit
+
+from swapi_cache import normalize_term
+
+# Local copy of the whole SWAPI dataset
+#
+# SWAPI is small and never changes: six resource types and a few hundred records.
+# So instead of calling the network on every tool call, it can be crawled once into a gzipped JSON file:
+#
+#   python swapi_snapshot.py crawl --out swapi_snapshot.json.gz
+#
+# and then the tools answer from memory (set SWAPI_SNAPSHOT=swapi_snapshot.json.gz in the .env file).
+# The snapshot behaves like the live API: same urls, same `search` semantics, same pages of 10 results,
+# so the chatbot works offline and deterministically
+
+RESOURCES = ("films", "people", "planets", "species", "starships", "vehicles")
+
+# The fields the live API matches `?search=` against (case insensitive "contains")
+SEARCH_FIELDS = {
+    "films": ("title",),
+    "people": ("name",),
+    "planets": ("name",),
+    "species": ("name",),
+    "starships": ("name", "model"),
+    "vehicles": ("name", "model"),
+}
+
+PAGE_SIZE = 10
+
+_RESOURCE_PATH = re.compile(r"/api/(?P<resource>\w+)/(?:(?P<id>\d+)/?)?$")
+
+
+def _resource_id(record):
+    match = _RESOURCE_PATH.search(urlsplit(record["url"]).path)
+    return int(match["id"]) if match and match["id"] else 0
+
+
+class SnapshotNotFound(LookupError):
+    pass
+
+
+class SwapiSnapshot:
+    def __init__(self, resources, base_url="https://swapi.dev/api/"):
+        self.base_url = base_url if base_url.endswith("/") else base_url + "/"
+        self.resources = {}
+        # url path ("/api/people/1/") -> record. The path is used instead of the full url,
+        # so http/https or a different host still resolve
+        self.by_path = {}
+        # resource -> [(casefolded searchable text, record)] in id order, for the "contains" search
+        self._search_index = {}
+
+        for resource, records in resources.items():
+            records = sorted(records, key=_resource_id)
+            self.resources[resource] = records
+            fields = SEARCH_FIELDS.get(resource, ("name",))
+            entries = self._search_index.setdefault(resource, [])
+            for record in records:
+                self.by_path[self._path(record["url"])] = record
+                values = [record[field].casefold() for field in fields if record.get(field)]
+                entries.append(("\n".join(values), record))
+
+    @staticmethod
+    def _path(url):
+        path = urlsplit(url).path
+        return path if path.endswith("/") else path + "/"
+
+    # Loading / saving
+
+    @classmethod
+    def load(cls, path):
+        with gzip.open(path, "rt", encoding="utf-8") as f:
+            data = json.load(f)
+        return cls(data["resources"], base_url=data.get("base_url", "https://swapi.dev/api/"))
+
+    def save(self, path):
+        data = {
+            "base_url": self.base_url,
+            "crawled_at": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
+            "resources": self.resources,
+        }
+        with gzip.open(path, "wt", encoding="utf-8") as f:
+            json.dump(data, f, separators=(",", ":"))
+
+    @classmethod
+    def crawl(cls, client, resources=RESOURCES):
+        # Follows the `next` links of every resource listing until the last page
+        crawled = {}
+        for resource in resources:
+            records = []
+            url = client.resource_url(resource)
+            while url:
+                page = client.get_json(url)
+                records.extend(page["results"])
+                url = page.get("next")
+            crawled[resource] = records
+        return cls(crawled, base_url=client.base_url)
+
+    # Same interface as SwapiClient, so the tools don't care where the data comes from
+
+    def resource_url(self, resource):
+        return self.base_url + resource.strip("/") + "/"
+
+    def get_record(self, url):
+        record = self.by_path.get(self._path(url))
+        if record is None:
+            raise SnapshotNotFound(url)
+        return record
+
+    def search_records(self, resource, term):
+        if resource not in self.resources:
+            raise SnapshotNotFound(resource)
+        term = normalize_term(term or "")
+        if not term:
+            return list(self.resources[resource])
+        return [record for text, record in self._search_index[resource] if term in text]
+
+    def page(self, resource, term="", page=1):
+        matches = self.search_records(resource, term)
+        last_page = max(1, math.ceil(len(matches) / PAGE_SIZE))
+        if page < 1 or page > last_page:
+            raise SnapshotNotFound(f"{resource} page {page}")
+
+        def page_url(number):
+            params = {"page": number}
+            if term:
+                params["search"] = term
+            return self.resource_url(resource) + "?" + urlencode(params)
+
+        start = (page - 1) * PAGE_SIZE
+        return {
+            "count": len(matches),
+            "next": page_url(page + 1) if page < last_page else None,
+            "previous": page_url(page - 1) if page > 1 else None,
+            "results": matches[start:start + PAGE_SIZE],
+        }
+
+    def get_json(self, url, params=None):
+        parts = urlsplit(url)
+        match = _RESOURCE_PATH.search(parts.path if parts.path.endswith("/") else parts.path + "/")
+        if not match or match["resource"] not in self.resources:
+            raise SnapshotNotFound(url)
+        if match["id"]:
+            return self.get_record(url)
+
+        query = dict(parse_qsl(parts.query))
+        query.update(params or {})
+        return self.page(match["resource"], query.get("search", ""), int(query.get("page", 1)))
+
+    def get_text(self, url, params=None):
+        return json.dumps(self.get_json(url, params=params))
+
+    def get_many(self, urls, max_workers=None):
+        # Everything is in memory already, no need for threads
+        records, errors = {}, {}
+        for url in dict.fromkeys(url.strip() for url in urls if url and url.strip()):
+            try:
+                records[url] = self.get_record(url)
+            except SnapshotNotFound as e:
+                errors[url] = f"Not found: {e}"
+        return records, errors
+
+    def __len__(self):
+        return len(self.by_path)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    crawl = subparsers.add_parser("crawl", help="Download the whole SWAPI dataset into a local snapshot")
+    crawl.add_argument("--out", default="swapi_snapshot.json.gz")
+    crawl.add_argument("--base-url", default=None, help="Defaults to SWAPI_BASE_URL or https://swapi.dev/api/")
+    args = parser.parse_args()
+
+    # Imported here so loading a snapshot doesn't need the HTTP stack
+    from swapi_client import SwapiClient
+
+    client = SwapiClient(base_url=args.base_url) if args.base_url else SwapiClient()
+    start = time.perf_counter()
+    snapshot = SwapiSnapshot.crawl(client)
+    snapshot.save(args.out)
+    counts = ", ".join(f"{resource}: {len(records)}" for resource, records in snapshot.resources.items())
+    print(f"Saved {len(snapshot)} records to {args.out} in {time.perf_counter() - start:.1f}s ({counts})")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,140 @@
+import json
+import re
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+# A tiny local stand-in for swapi.dev, used by the benchmarks so they don't depend on the network
+# (and don't hammer the real API).
+# It serves /api/<resource>/ (with ?search= and ?page=) and /api/<resource>/<id>/ from an in-memory fixture.
+#
+# To make the cost of opening a connection visible on localhost, every NEW connection
+# waits `handshake_delay` seconds before being served. This stands for the TCP + TLS handshake
+# that a real request to swapi.dev pays when the connection is not reused.
+
+PAGE_SIZE = 10
+
+FIXTURE = {
+    "films": [
+        {"title": "A New Hope", "episode_id": 4, "director": "George Lucas", "release_date": "1977-05-25"},
+        {"title": "The Empire Strikes Back", "episode_id": 5, "director": "Irvin Kershner", "release_date": "1980-05-17"},
+        {"title": "Return of the Jedi", "episode_id": 6, "director": "Richard Marquand", "release_date": "1983-05-25"},
+        {"title": "The Phantom Menace", "episode_id": 1, "director": "George Lucas", "release_date": "1999-05-19"},
+        {"title": "Attack of the Clones", "episode_id": 2, "director": "George Lucas", "release_date": "2002-05-16"},
+        {"title": "Revenge of the Sith", "episode_id": 3, "director": "George Lucas", "release_date": "2005-05-19"},
+    ],
+    "people": [
+        {"name": name, "gender": "unknown"} for name in [
+            "Luke Skywalker", "C-3PO", "R2-D2", "Darth Vader", "Leia Organa", "Owen Lars",
+            "Beru Whitesun lars", "R5-D4", "Biggs Darklighter", "Obi-Wan Kenobi", "Anakin Skywalker",
+            "Wilhuff Tarkin", "Chewbacca", "Han Solo", "Greedo", "Jabba Desilijic Tiure",
+        ]
+    ],
+    "planets": [{"name": name} for name in ["Tatooine", "Alderaan", "Yavin IV", "Hoth", "Dagobah"]],
+    "species": [{"name": name} for name in ["Human", "Droid", "Wookie", "Rodian", "Hutt"]],
+    "starships": [{"name": name} for name in ["CR90 corvette", "Star Destroyer", "Millennium Falcon", "X-wing"]],
+    "vehicles": [{"name": name} for name in ["Sand Crawler", "T-16 skyhopper", "X-34 landspeeder"]],
+}
+
+_DETAIL_PATH = re.compile(r"^/api/(?P<resource>\w+)/(?P<id>\d+)/?$")
+_LIST_PATH = re.compile(r"^/api/(?P<resource>\w+)/?$")
+
+
+def _record(base, resource, index, record):
+    result = dict(record)
+    result["url"] = f"{base}/api/{resource}/{index + 1}/"
+    return result
+
+
+class _Handler(BaseHTTPRequestHandler):
+    # HTTP/1.1 is needed for keep-alive
+    protocol_version = "HTTP/1.1"
+    # Headers and body are written separately: without this, Nagle + delayed ACK add ~40ms to every kept-alive request
+    disable_nagle_algorithm = True
+
+    def setup(self):
+        super().setup()
+        time.sleep(self.server.handshake_delay)
+
+    def log_message(self, format, *args):
+        pass
+
+    def _send_json(self, status, payload):
+        body = json.dumps(payload).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_GET(self):
+        self.server.request_count += 1
+        if self.server.response_delay:
+            time.sleep(self.server.response_delay)
+
+        base = f"http://{self.server.server_address[0]}:{self.server.server_address[1]}"
+        parsed = urlparse(self.path)
+
+        detail = _DETAIL_PATH.match(parsed.path)
+        if detail and detail["resource"] in FIXTURE:
+            records = FIXTURE[detail["resource"]]
+            index = int(detail["id"]) - 1
+            if 0 <= index < len(records):
+                return self._send_json(200, _record(base, detail["resource"], index, records[index]))
+            return self._send_json(404, {"detail": "Not found"})
+
+        listing = _LIST_PATH.match(parsed.path)
+        if listing and listing["resource"] in FIXTURE:
+            resource = listing["resource"]
+            query = parse_qs(parsed.query)
+            term = query.get("search", [""])[0].lower()
+            page = int(query.get("page", ["1"])[0])
+
+            matches = [
+                _record(base, resource, index, record)
+                for index, record in enumerate(FIXTURE[resource])
+                if term in record.get("name", record.get("title", "")).lower()
+            ]
+            start = (page - 1) * PAGE_SIZE
+            results = matches[start:start + PAGE_SIZE]
+
+            def page_url(number):
+                params = f"page={number}" + (f"&search={term}" if term else "")
+                return f"{base}/api/{resource}/?{params}"
+
+            return self._send_json(200, {
+                "count": len(matches),
+                "next": page_url(page + 1) if start + PAGE_SIZE < len(matches) else None,
+                "previous": page_url(page - 1) if page > 1 else None,
+                "results": results,
+            })
+
+        self._send_json(404, {"detail": "Not found"})
+
+
+class SwapiStubServer:
+    def __init__(self, handshake_delay=0.02, response_delay=0.0):
+        self.httpd = ThreadingHTTPServer(("127.0.0.1", 0), _Handler)
+        self.httpd.daemon_threads = True
+        self.httpd.handshake_delay = handshake_delay
+        self.httpd.response_delay = response_delay
+        self.httpd.request_count = 0
+        self._thread = threading.Thread(target=self.httpd.serve_forever, daemon=True)
+
+    @property
+    def base_url(self):
+        host, port = self.httpd.server_address[:2]
+        return f"http://{host}:{port}/api/"
+
+    @property
+    def request_count(self):
+        return self.httpd.request_count
+
+    def __enter__(self):
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.httpd.shutdown()
+        self.httpd.server_close()
@@ -0,0 +1,283 @@
+import json
+
+import requests
+from langchain.tools import Tool
+
+from swapi_client import get_client, iter_pages
+from swapi_snapshot import SnapshotNotFound
+
+# One tool factory for every SWAPI resource type
+#
+# 12-star-wars-chatbot.py used to hand-write a function and a huge description for each resource,
+# and only films and people were covered. Here each resource is just a spec (tool name + attributes),
+# and make_resource_tool() builds the tool.
+#
+# Tools also accept a projection: the list of attributes to return. Every observation ends up in the ReAct scratchpad,
+# and so in every following LLM call: returning the whole record (opening crawls, created/edited timestamps...)
+# makes every step slower and more expensive
+
+RESOURCE_SPECS = {
+    "films": {
+        "tool_name": "Film Search",
+        "singular": "film",
+        "key": "title",
+        "example": ("A New Hope", ["director", "release_date"]),
+        "attributes": {
+            "title": "(string) The title of this film",
+            "episode_id": "(integer) The episode number of this film",
+            "opening_crawl": "(string) The opening paragraphs at the beginning of this film",
+            "director": "(string) The name of the director of this film",
+            "producer": "(string) The name(s) of the producer(s) of this film. Comma separated",
+            "release_date": "(date) The ISO 8601 date format of film release at original creator country",
+            "species": "(array) Species resource URLs that are in this film",
+            "starships": "(array) Starship resource URLs that are in this film",
+            "vehicles": "(array) Vehicle resource URLs that are in this film",
+            "characters": "(array) People resource URLs that are in this film",
+            "planets": "(array) Planet resource URLs that are in this film",
+        },
+    },
+    "people": {
+        "tool_name": "Character Search",
+        "singular": "character",
+        "key": "name",
+        "example": ("Luke Skywalker", ["height", "homeworld"]),
+        "attributes": {
+            "name": "(string) The name of this person",
+            "birth_year": "(string) The birth year of the person, using the in-universe standard of BBY or ABY "
+                          "(Before/After the Battle of Yavin, that occurs at the end of Star Wars episode IV: A New Hope)",
+            "eye_color": "(string) The eye color. \"unknown\" if not known or \"n/a\" if the person does not have an eye",
+            "gender": "(string) Either \"Male\", \"Female\", \"unknown\" or \"n/a\" if the person does not have a gender",
+            "hair_color": "(string) The hair color. \"unknown\" if not known or \"n/a\" if the person does not have hair",
+            "height": "(string) The height of the person in centimeters",
+            "mass": "(string) The mass of the person in kilograms",
+            "skin_color": "(string) The skin color of this person",
+            "homeworld": "(string) The URL of the planet this person was born on or inhabits",
+            "films": "(array) Film resource URLs that this person has been in",
+            "species": "(array) Species resource URLs that this person belongs to",
+            "starships": "(array) Starship resource URLs that this person has piloted",
+            "vehicles": "(array) Vehicle resource URLs that this person has piloted",
+        },
+    },
+    "planets": {
+        "tool_name": "Planet Search",
+        "singular": "planet",
+        "key": "name",
+        "example": ("Tatooine", ["climate", "population"]),
+        "attributes": {
+            "name": "(string) The name of this planet",
+            "diameter": "(string) The diameter of this planet in kilometers",
+            "rotation_period": "(string) The number of standard hours it takes for this planet to complete a single rotation on its axis",
+            "orbital_period": "(string) The number of standard days it takes for this planet to complete a single orbit of its local star",
+            "gravity": "(string) A number denoting the gravity of this planet, where \"1\" is normal or 1 standard G",
+            "population": "(string) The average population of sentient beings inhabiting this planet",
+            "climate": "(string) The climate of this planet. Comma separated if diverse",
+            "terrain": "(string) The terrain of this planet. Comma separated if diverse",
+            "surface_water": "(string) The percentage of the planet surface that is naturally occurring water or bodies of water",
+            "residents": "(array) People resource URLs that live on this planet",
+            "films": "(array) Film resource URLs that this planet has appeared in",
+        },
+    },
+    "species": {
+        "tool_name": "Species Search",
+        "singular": "species",
+        "key": "name",
+        "example": ("Wookie", ["language", "average_lifespan"]),
+        "attributes": {
+            "name": "(string) The name of this species",
+            "classification": "(string) The classification of this species, such as \"mammal\" or \"reptile\"",
+            "designation": "(string) The designation of this species, such as \"sentient\"",
+            "average_height": "(string) The average height of this species in centimeters",
+            "average_lifespan": "(string) The average lifespan of this species in years",
+            "eye_colors": "(string) Comma separated eye colors for this species, \"none\" if it doesn't have eyes",
+            "hair_colors": "(string) Comma separated hair colors for this species, \"none\" if it doesn't have hair",
+            "skin_colors": "(string) Comma separated skin colors for this species, \"none\" if it doesn't have skin",
+            "language": "(string) The language commonly spoken by this species",
+            "homeworld": "(string) The URL of the planet this species originates from",
+            "people": "(array) People resource URLs that are a part of this species",
+            "films": "(array) Film resource URLs that this species has appeared in",
+        },
+    },
+    "starships": {
+        "tool_name": "Starship Search",
+        "singular": "starship",
+        "key": "name",
+        "example": ("Millennium Falcon", ["hyperdrive_rating", "crew"]),
+        "attributes": {
+            "name": "(string) The name of this starship, such as \"Death Star\"",
+            "model": "(string) The model or official name of this starship",
+            "starship_class": "(string) The class of this starship, such as \"Starfighter\" or \"Deep Space Mobile Battlestation\"",
+            "manufacturer": "(string) The manufacturer of this starship. Comma separated if more than one",
+            "cost_in_credits": "(string) The cost of this starship new, in galactic credits",
+            "length": "(string) The length of this starship in meters",
+            "crew": "(string) The number of personnel needed to run or pilot this starship",
+            "passengers": "(string) The number of non-essential people this starship can transport",
+            "max_atmosphering_speed": "(string) The maximum speed of this starship in the atmosphere",
+            "hyperdrive_rating": "(string) The class of this starship's hyperdrive",
+            "MGLT": "(string) The Maximum number of Megalights this starship can travel in a standard hour",
+            "cargo_capacity": "(string) The maximum number of kilograms that this starship can transport",
+            "consumables": "(string) The maximum length of time that this starship can provide consumables for its entire crew without having to resupply",
+            "films": "(array) Film resource URLs that this starship has appeared in",
+            "pilots": "(array) People resource URLs that this starship has been piloted by",
+        },
+    },
+    "vehicles": {
+        "tool_name": "Vehicle Search",
+        "singular": "vehicle",
+        "key": "name",
+        "example": ("Sand Crawler", ["max_atmosphering_speed", "cargo_capacity"]),
+        "attributes": {
+            "name": "(string) The name of this vehicle, such as \"Sand Crawler\"",
+            "model": "(string) The model or official name of this vehicle",
+            "vehicle_class": "(string) The class of this vehicle, such as \"Wheeled\" or \"Repulsorcraft\"",
+            "manufacturer": "(string) The manufacturer of this vehicle. Comma separated if more than one",
+            "length": "(string) The length of this vehicle in meters",
+            "cost_in_credits": "(string) The cost of this vehicle new, in galactic credits",
+            "crew": "(string) The number of personnel needed to run or pilot this vehicle",
+            "passengers": "(string) The number of non-essential people this vehicle can transport",
+            "max_atmosphering_speed": "(string) The maximum speed of this vehicle in the atmosphere",
+            "cargo_capacity": "(string) The maximum number of kilograms that this vehicle can transport",
+            "consumables": "(string) The maximum length of time that this vehicle can provide consumables for its entire crew without having to resupply",
+            "films": "(array) Film resource URLs that this vehicle has appeared in",
+            "pilots": "(array) People resource URLs that this vehicle has been piloted by",
+        },
+    },
+}
+
+# Attributes left out when the LLM doesn't ask for specific ones: they are big and rarely useful
+DEFAULT_EXCLUDED = ("opening_crawl", "created", "edited")
+
+# Searches follow the `next` links by themselves (instead of asking the LLM to do it, one round-trip per page)
+# and stop after this many matches, unless the input asks for a different "limit=N"
+DEFAULT_MATCH_LIMIT = 20
+
+
+class QueryError(ValueError):
+    # A tool input the LLM got wrong: the message goes back to it as the observation, so it can fix the input
+    pass
+
+
+def parse_query(query):
+    # "url,name,attr1,attr2,limit=5" -> (url, name, [attr1, attr2], 5)
+    values = [value.strip() for value in query.split(",")]
+    values += [""] * (2 - len(values))
+    url, term, fields, limit = values[0], values[1], [], DEFAULT_MATCH_LIMIT
+    for value in values[2:]:
+        if value.startswith("limit="):
+            try:
+                limit = max(1, int(value[len("limit="):]))
+            except ValueError:
+                raise QueryError(f'Invalid "{value}": the limit must be a whole number, like "limit=5"')
+        elif value:
+            fields.append(value)
+    return url, term, fields, limit
+
+
+def collect_search(swapi, resource, term, limit):
+    # Streams the result pages and stops as soon as `limit` matches are collected:
+    # the walk knows the limit, so no page after the one containing the last needed match is requested
+    count, results = 0, []
+    pages = iter_pages(swapi.resource_url(resource), params={"search": term}, client=swapi, limit=limit)
+    for page in pages:
+        count = page["count"]
+        results.extend(page["results"][:limit - len(results)])
+        if len(results) >= limit:
+            break
+    return {"count": count, "results": results}
+
+
+def project(record, fields, key):
+    # Keeps only the requested attributes. The url and the name/title are always kept,
+    # so the LLM can still tell the results apart and refer to them later
+    if fields:
+        keep = dict.fromkeys([key, "url", *fields])
+        return {field: record[field] for field in keep if field in record}
+    return {field: value for field, value in record.items() if field not in DEFAULT_EXCLUDED}
+
+
+def project_response(payload, fields, key):
+    # A search page or a single record
+    if isinstance(payload, dict) and "results" in payload:
+        return {
+            "count": payload.get("count"),
+            "results": [project(record, fields, key) for record in payload["results"]],
+        }
+    return project(payload, fields, key)
+
+
+def make_resource_func(resource, client=None):
+    spec = RESOURCE_SPECS[resource]
+
+    def run(query):
+        try:
+            url, term, fields, limit = parse_query(query)
+            unknown = [field for field in fields if field not in spec["attributes"] and field != "url"]
+            if unknown:
+                raise QueryError(f"Unknown attributes for {resource}: {', '.join(unknown)}")
+            if not url and not term:
+                raise QueryError(f"Give the {spec['singular']} url or {spec['key']} as the first or second element")
+        except QueryError as e:
+            return f"Invalid input: {e}"
+
+        # Like the input errors, a failed lookup is an observation: the agent can try something else
+        swapi = client or get_client()
+        try:
+            if url:
+                payload = swapi.get_json(url)
+            else:
+                payload = collect_search(swapi, resource, term, limit)
+        except SnapshotNotFound:
+            return f"Not found: {url or term}"
+        except requests.HTTPError as e:
+            if e.response is not None and e.response.status_code == 404:
+                return f"Not found: {url or term}"
+            return f"SWAPI error: {e}"
+        except requests.RequestException as e:
+            return f"SWAPI error: {e}"
+
+        return json.dumps(project_response(payload, fields, spec["key"]), separators=(",", ":"))
+
+    return run
+
+
+def describe(resource):
+    spec = RESOURCE_SPECS[resource]
+    singular = spec["singular"]
+    attributes = "\n".join(f"        {name} {description}." for name, description in spec["attributes"].items())
+    # The example input of each resource: one of its own records and some of its own attributes
+    value, fields = spec["example"]
+    example = ",".join([value, *fields])
+    return f"""
+        Use when need to find {singular} details given their {spec["key"]} or url.
+
+        Input:
+        The input for this tool should be a comma separated list,
+        where the first element is the {singular} url, or empty character if not available,
+        and the second element is the {singular} {spec["key"]}, or empty character if not available.
+        Use this tool only if at least one of the two elements is available.
+        The following elements are optional: they are the names of the attributes to return, and "limit=N".
+        Ask only for the attributes needed to answer the question. If none are given, most attributes are returned.
+        For example ",{example}" returns only the {spec["key"]}, url, {" and ".join(fields)} of {value}.
+
+        Output:
+        If an url is given, this tool returns the stringified JSON of that {singular}.
+        Otherwise it returns a stringified JSON with "count" (the total number of matches)
+        and "results" (a list of {resource}). All the result pages are retrieved automatically,
+        up to {DEFAULT_MATCH_LIMIT} results: add an element like "limit=5" to the input to change it.
+        If "count" is greater than the number of results, there are more matches than the ones returned.
+
+        Each {singular} has the attribute "url" (its hypermedia URL) plus:
+{attributes}
+        """
+
+
+def make_resource_tool(resource, client=None, return_direct=False):
+    return Tool.from_function(
+        name=RESOURCE_SPECS[resource]["tool_name"],
+        description=describe(resource),
+        func=make_resource_func(resource, client=client),
+        return_direct=return_direct,
+    )
+
+
+def make_resource_tools(resources=None, client=None):
+    return [make_resource_tool(resource, client=client) for resource in (resources or RESOURCE_SPECS)]
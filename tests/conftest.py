@@ -0,0 +1,106 @@
+import os
+import sys
+
+import pytest
+from langchain_community.graphs.graph_store import GraphStore
+from langchain_core.embeddings import Embeddings
+
+# The modules are at the root of the repository, next to the course scripts
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# Fakes shared by the tests: no OpenAI and no Neo4j here
+
+class WordEmbeddings(Embeddings):
+    # "movies" and "films" are the same word: paraphrases get the same vector
+    VOCABULARY = ["movies", "tom", "hanks", "cruise", "acted"]
+
+    def _embed(self, text):
+        words = text.lower().replace("films", "movies").split()
+        return [float(word in words) for word in self.VOCABULARY]
+
+    def embed_documents(self, texts):
+        return [self._embed(text) for text in texts]
+
+    def embed_query(self, text):
+        return self._embed(text)
+
+
+class FakeGraph(GraphStore):
+    # A graph of langchain with a fixed result (or error) for every query
+    SCHEMA = "Node properties: Movie {title: STRING}, Actor {name: STRING}"
+
+    def __init__(self, rows=None, error=None):
+        self.rows = rows or []
+        self.error = error
+        self.queries = []
+
+    @property
+    def get_schema(self):
+        return self.SCHEMA
+
+    @property
+    def get_structured_schema(self):
+        return {}
+
+    def query(self, query, params={}):
+        self.queries.append(query)
+        if self.error:
+            raise self.error
+        return self.rows
+
+    def refresh_schema(self):
+        pass
+
+    def add_graph_documents(self, *args, **kwargs):
+        pass
+
+
+class FakeRecord(dict):
+    def data(self):
+        return dict(self)
+
+
+class FakeSession:
+    def __init__(self, driver):
+        self.driver = driver
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def run(self, query, params):
+        # A neo4j.Query or a string
+        self.driver.queries.append(getattr(query, "text", query))
+        if self.driver.error:
+            raise self.driver.error
+        return [FakeRecord(row) for row in self.driver.rows]
+
+
+class FakeDriver:
+    # A neo4j driver that answers every query with the same rows (or error), and records the sessions
+    def __init__(self, rows=(), error=None):
+        self.rows = list(rows)
+        self.error = error
+        self.sessions = []
+        self.queries = []
+
+    def session(self, **config):
+        self.sessions.append(config)
+        return FakeSession(self)
+
+
+@pytest.fixture
+def word_embeddings():
+    return WordEmbeddings()
+
+
+@pytest.fixture
+def fake_graph():
+    return FakeGraph
+
+
+@pytest.fixture
+def fake_driver():
+    return FakeDriver
@@ -0,0 +1,85 @@
+import builtins
+import threading
+import time
+
+import pytest
+
+from bootstrap import Lazy, load_script, run_chat
+
+SCRIPT = """
+import builtins
+import time
+
+from langchain_core.runnables import RunnableLambda
+
+time.sleep(0.3)
+builtins.LOADED.append(time.perf_counter())
+agent_executor = RunnableLambda(lambda inputs: {"output": "Answer to " + inputs["input"]})
+
+if __name__ == "__main__":
+    raise RuntimeError("the REPL of the script must not run")
+"""
+
+
+def test_lazy_is_built_once():
+    calls = []
+
+    def build():
+        calls.append(1)
+        time.sleep(0.05)
+        return {"ready": True}
+
+    lazy = Lazy(build)
+    get = lazy.bind("get")
+    assert not calls
+    threads = [threading.Thread(target=lazy.get) for _ in range(5)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert len(calls) == 1 and get("ready")
+
+
+def test_failed_warm_up_fails_the_first_use():
+    calls = []
+
+    def build():
+        calls.append(1)
+        raise ConnectionError("no database")
+
+    lazy = Lazy(build).warm_up()
+    with pytest.raises(ConnectionError):
+        lazy.get()
+    with pytest.raises(ConnectionError):
+        lazy.get()
+    assert len(calls) == 1
+
+
+def test_prompt_is_shown_before_the_script_is_loaded(tmp_path, monkeypatch, capsys):
+    path = tmp_path / "chatbot.py"
+    path.write_text(SCRIPT)
+    monkeypatch.setattr(builtins, "LOADED", [], raising=False)
+    prompts = []
+    questions = iter(["Who is Yoda?"])
+
+    def fake_input(prompt):
+        prompts.append((prompt, list(builtins.LOADED)))
+        try:
+            return next(questions)
+        except StopIteration:
+            raise EOFError
+
+    monkeypatch.setattr(builtins, "input", fake_input)
+    with pytest.raises(SystemExit):
+        run_chat(str(path))
+    # The first "> " while the script was still loading, the answer after it
+    assert prompts[0] == ("> ", [])
+    assert len(builtins.LOADED) == 1
+    assert "Answer to Who is Yoda?" in capsys.readouterr().out
+
+
+def test_load_script_does_not_run_the_main_block(tmp_path, monkeypatch):
+    monkeypatch.setattr(builtins, "LOADED", [], raising=False)
+    path = tmp_path / "chatbot.py"
+    path.write_text(SCRIPT)
+    assert load_script(str(path)).agent_executor.invoke({"input": "hi"}) == {"output": "Answer to hi"}
@@ -0,0 +1,95 @@
+from langchain_core.messages import AIMessage, HumanMessage
+
+from chat_history_store import BatchWriter, PersistentChatHistory, SqliteHistoryStore
+
+
+def contents(history):
+    return [message.content for message in history.messages]
+
+
+def test_two_processes_see_each_other_messages(tmp_path):
+    path = str(tmp_path / "history.sqlite3")
+    # Two connections to the same file, like two workers of chat_server.py
+    first_store = SqliteHistoryStore(path)
+    writer = BatchWriter(first_store)
+    first = PersistentChatHistory("session", first_store, writer=writer)
+    second = PersistentChatHistory("session", SqliteHistoryStore(path))
+    assert contents(first) == contents(second) == []
+
+    first.add_messages([HumanMessage(content="hi"), AIMessage(content="hello")])
+    # Still queued: only the first one knows about them
+    assert contents(first) == ["hi", "hello"]
+    writer.flush()
+    assert contents(second) == []
+    # Read once per turn
+    second.sync()
+    assert contents(first) == contents(second) == ["hi", "hello"]
+
+    second.add_messages([HumanMessage(content="again")])
+    first.sync()
+    second.sync()
+    assert contents(first) == contents(second) == ["hi", "hello", "again"]
+    # The same ids in both processes
+    assert [m.id for m in first.messages] == [m.id for m in second.messages]
+    assert all(first.messages[i].id for i in range(3))
+
+
+def test_messages_with_the_same_timestamp_are_all_kept(tmp_path):
+    store = SqliteHistoryStore(str(tmp_path / "history.sqlite3"))
+    rows = [
+        {"session_id": "session", "uid": uid, "created_at": 1, "data": '{"type": "human", "data": {"content": "x"}}'}
+        for uid in ("a", "b")
+    ]
+    store.append(rows)
+    assert [row["uid"] for row in store.load("session", 10)] == ["a", "b"]
+
+
+class CountingStore(SqliteHistoryStore):
+    def __init__(self, path):
+        super().__init__(path)
+        self.reads = 0
+
+    def load(self, session_id, last_n):
+        self.reads += 1
+        return super().load(session_id, last_n)
+
+    def load_since(self, session_id, seq):
+        self.reads += 1
+        return super().load_since(session_id, seq)
+
+
+def test_reads_are_bounded(tmp_path):
+    store = CountingStore(str(tmp_path / "history.sqlite3"))
+    writer = PersistentChatHistory("session", store)
+    for i in range(10):
+        writer.add_messages([HumanMessage(content=f"q{i}"), AIMessage(content=f"a{i}")])
+
+    history = PersistentChatHistory("session", store, last_n=5)
+    for _ in range(3):
+        history.messages
+    # Loaded once, the window starts from a human message
+    assert store.reads == 1
+    assert contents(history) == ["q8", "a8", "q9", "a9"]
+
+    writer.add_messages([HumanMessage(content="q10"), AIMessage(content="a10")])
+    history.sync()
+    assert store.reads == 2
+    assert contents(history) == ["q9", "a9", "q10", "a10"]
+
+
+def test_first_prompt_after_a_restart_is_bounded(tmp_path):
+    from langchain_community.llms.fake import FakeListLLM
+
+    from summary_memory import RollingSummaryMemory
+
+    store = SqliteHistoryStore(str(tmp_path / "history.sqlite3"))
+    PersistentChatHistory("session", store).add_messages(
+        [message for i in range(10) for message in (HumanMessage(content=f"q{i} " + "word " * 10),
+                                                    AIMessage(content=f"a{i}"))]
+    )
+    memory = RollingSummaryMemory(
+        llm=FakeListLLM(responses=["summary"]), chat_memory=PersistentChatHistory("session", store),
+        max_token_limit=12, background=False, return_messages=True,
+    )
+    prompt = memory.load_memory_variables({})["history"]
+    assert [message.content for message in prompt] == [memory.summary_prefix + "summary", prompt[1].content, "a9"]
@@ -0,0 +1,65 @@
+import asyncio
+
+from aiohttp.test_utils import TestClient, TestServer
+
+from agent_stub import StubLLM, build_stub_agent
+from chat_history_store import open_chat_history
+from chat_server import ChatServer
+from summary_memory import RollingSummaryMemory
+
+
+def make_server(**kwargs):
+    return ChatServer(
+        build_stub_agent(llm_latency=0, tool_latency=0),
+        StubLLM(latency=0),
+        history_factory=lambda session_id: open_chat_history(session_id, backend="memory"),
+        **kwargs,
+    )
+
+
+def run(test):
+    # A test server in the event loop of the test
+    async def main():
+        async with TestClient(TestServer(make_server().app())) as client:
+            await test(client)
+
+    asyncio.run(main())
+
+
+def test_malformed_body_is_a_bad_request():
+    async def test(client):
+        response = await client.post("/chat", data="{not json")
+        assert response.status == 400
+        response = await client.post("/chat", json=["a list"])
+        assert response.status == 400
+
+    run(test)
+
+
+def test_malformed_frame_gets_an_error_and_the_socket_stays_open():
+    async def test(client):
+        async with client.ws_connect("/ws?session_id=luke") as ws:
+            await ws.send_str("{not json")
+            assert (await ws.receive_json())["type"] == "error"
+            await ws.send_json({"message": "Who is Yoda?"})
+            while (frame := await ws.receive_json())["type"] == "delta":
+                pass
+            assert frame["type"] == "answer"
+
+    run(test)
+
+
+def test_sessions_have_a_bounded_memory():
+    async def main():
+        server = make_server(memory_tokens=50)
+        for i in range(10):
+            await server.ask("luke", f"question {i} " + "word " * 20)
+        memory = server.sessions["luke"].memory
+        assert isinstance(memory, RollingSummaryMemory)
+        memory.flush()
+        # Everything is in the history, only the last exchange is in the prompt, the rest is summarized
+        assert len(memory.chat_memory.messages) == 20
+        assert len(memory.window()) == 2
+        assert memory.summary
+
+    asyncio.run(main())
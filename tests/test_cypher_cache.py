@@ -0,0 +1,55 @@
+import pytest
+from langchain_community.llms.fake import FakeListLLM
+
+from cypher_cache import CypherCache
+from cypher_chain import CypherQAChain
+
+HANKS_QUERY = 'MATCH (a:Actor {name: "Tom Hanks"})-[:ACTED_IN]->(m:Movie) RETURN m.title'
+
+
+def make_chain(graph, cache):
+    # The LLM would generate a new query and answer: a cached query must not reach it
+    return CypherQAChain.from_llm(
+        FakeListLLM(responses=["I don't know"]),
+        cypher_llm=FakeListLLM(responses=["MATCH (n) RETURN n"]),
+        graph=graph,
+        cypher_cache=cache,
+    )
+
+
+def test_paraphrase_hit_returns_the_cached_question(word_embeddings, fake_graph):
+    cache = CypherCache(embeddings=word_embeddings)
+    cache.put("Movies Tom Hanks acted", fake_graph.SCHEMA, HANKS_QUERY)
+    assert cache.get("films tom hanks acted?", fake_graph.SCHEMA) == (HANKS_QUERY, "movies tom hanks acted")
+    assert cache.semantic_hits == 1
+
+
+def test_paraphrase_with_another_entity_is_a_miss(word_embeddings, fake_graph):
+    cache = CypherCache(embeddings=word_embeddings, similarity_threshold=0.5)
+    cache.put("movies tom hanks acted", fake_graph.SCHEMA, HANKS_QUERY)
+    assert cache.get("movies tom cruise acted", fake_graph.SCHEMA) == (None, None)
+    assert cache.misses == 1
+
+
+def test_paraphrase_hit_without_results_invalidates_the_stored_entry(word_embeddings, fake_graph):
+    cache = CypherCache(embeddings=word_embeddings)
+    graph = fake_graph(rows=[])
+    chain = make_chain(graph, cache)
+    cache.put("movies tom hanks acted", chain.graph_schema, HANKS_QUERY)
+
+    chain.invoke({"query": "films tom hanks acted"})
+
+    assert graph.queries == [HANKS_QUERY]
+    assert len(cache) == 0
+    assert cache.get("movies tom hanks acted", chain.graph_schema) == (None, None)
+
+
+def test_paraphrase_hit_that_fails_invalidates_the_stored_entry(word_embeddings, fake_graph):
+    cache = CypherCache(embeddings=word_embeddings)
+    chain = make_chain(fake_graph(error=ValueError("broken")), cache)
+    cache.put("movies tom hanks acted", chain.graph_schema, HANKS_QUERY)
+
+    with pytest.raises(ValueError):
+        chain.invoke({"query": "films tom hanks acted"})
+
+    assert len(cache) == 0
@@ -0,0 +1,25 @@
+from cypher_examples import CypherExampleStore
+
+
+def test_empty_seed(word_embeddings):
+    store = CypherExampleStore(word_embeddings, seed=[])
+    assert len(store) == 0
+    assert store.select("movies tom hanks acted") == []
+
+    assert store.add("movies tom hanks acted", "MATCH (m:Movie) RETURN m.title")
+    assert [e["question"] for e in store.select("films tom hanks acted")] == ["movies tom hanks acted"]
+
+
+def test_added_examples_are_selected_and_saved(word_embeddings, tmp_path):
+    path = str(tmp_path / "examples.jsonl")
+    seed = [{"question": "movies tom cruise acted", "cypher": "MATCH (a {name: 'Tom Cruise'}) RETURN a"}]
+    store = CypherExampleStore(word_embeddings, path=path, seed=seed)
+    assert store.add("movies tom hanks acted", "MATCH (a {name: 'Tom Hanks'}) RETURN a")
+    # Same question once normalized
+    assert not store.add("Movies Tom Hanks acted?", "MATCH (n) RETURN n")
+
+    assert [e["question"] for e in store.select("films tom hanks acted", k=1)] == ["movies tom hanks acted"]
+    # Only the added example is in the file, the seed comes with the code
+    reloaded = CypherExampleStore(word_embeddings, path=path, seed=seed)
+    assert len(reloaded) == 2
+    assert reloaded.select("films tom hanks acted", k=1) == store.select("films tom hanks acted", k=1)
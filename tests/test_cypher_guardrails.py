@@ -0,0 +1,53 @@
+import pytest
+from neo4j.exceptions import CypherSyntaxError
+
+from cypher_guardrails import ResultGuard, inject_limit
+
+
+@pytest.mark.parametrize("cypher, expected", [
+    ("MATCH (m) RETURN m", "MATCH (m) RETURN m\nLIMIT 51"),
+    ("MATCH (m) RETURN m LIMIT 500;", "MATCH (m) RETURN m LIMIT 51"),
+    ("MATCH (m) RETURN m LIMIT 5", "MATCH (m) RETURN m LIMIT 5"),
+    # Not a second LIMIT after a parameter or an expression
+    ("MATCH (m) RETURN m LIMIT $limit", "MATCH (m) RETURN m LIMIT $limit"),
+    ("MATCH (m) RETURN m LIMIT toInteger($n)", "MATCH (m) RETURN m LIMIT toInteger($n)"),
+    # The LIMIT of a WITH doesn't end the query
+    ("MATCH (m) WITH m LIMIT 500 RETURN m", "MATCH (m) WITH m LIMIT 500 RETURN m\nLIMIT 51"),
+])
+def test_inject_limit(cypher, expected):
+    assert inject_limit(cypher, 51) == expected
+
+
+class FakeNeo4jGraph:
+    def __init__(self, driver, sanitize=False):
+        self._driver = driver
+        self._database = "neo4j"
+        self.timeout = None
+        self.sanitize = sanitize
+
+
+def test_invalid_query_raises_the_error_of_neo4j_graph(fake_driver):
+    graph = FakeNeo4jGraph(fake_driver(error=CypherSyntaxError("Invalid input 'RETRUN'")))
+    with pytest.raises(ValueError, match="Generated Cypher Statement is not valid"):
+        ResultGuard().run(graph, "MATCH (m) RETRUN m")
+
+
+def test_sanitize_drops_long_lists(fake_driver):
+    records = [{"title": "Heat", "embedding": [0.1] * 200}]
+    assert ResultGuard().run(FakeNeo4jGraph(fake_driver(records)), "MATCH (m) RETURN m") == records
+    assert ResultGuard().run(FakeNeo4jGraph(fake_driver(records), sanitize=True), "MATCH (m) RETURN m") == [
+        {"title": "Heat"}
+    ]
+
+
+def test_summary_separates_the_capped_count_from_the_truncation(fake_driver):
+    records = [{"title": f"Movie {i}", "genre": "Drama"} for i in range(100)]
+    rows = ResultGuard(max_rows=20, context_rows=5).run(FakeNeo4jGraph(fake_driver(records)), "MATCH (m) RETURN m")
+    assert rows[:5] == records[:5]
+    summary = rows[5]["summary"]
+    assert (summary["rows_summarized"], summary["rows_listed"], summary["truncated"]) == (20, 5, True)
+    assert summary["columns"]["genre"] == {"distinct_values": 1, "most_common": ["Drama"]}
+
+    rows = ResultGuard(max_rows=20, context_rows=5).run(FakeNeo4jGraph(fake_driver(records[:8])), "MATCH (m) RETURN m")
+    summary = rows[5]["summary"]
+    assert (summary["rows_summarized"], summary["rows_listed"], summary["truncated"]) == (8, 5, False)
@@ -0,0 +1,58 @@
+from langchain_community.llms.fake import FakeListLLM
+
+from cypher_validation import CypherValidator, check_schema, extract_statement
+
+SCHEMA = {
+    "node_props": {
+        "Movie": [{"property": "title", "type": "STRING"}],
+        "Actor": [{"property": "name", "type": "STRING"}],
+    },
+    "rel_props": {"ACTED_IN": [{"property": "role", "type": "STRING"}]},
+    "relationships": [{"start": "Actor", "type": "ACTED_IN", "end": "Movie"}],
+}
+
+
+def test_statement_is_extracted_from_the_prose():
+    text = (
+        "To answer the question you can use the following Cypher query:\n\n"
+        "MATCH (a:Actor {name: 'Tom Hanks'})-[:ACTED_IN]->(m:Movie)\nRETURN m.title\n\n"
+        "This returns the titles of the movies."
+    )
+    assert extract_statement(text) == "MATCH (a:Actor {name: 'Tom Hanks'})-[:ACTED_IN]->(m:Movie)\nRETURN m.title"
+    assert extract_statement("```cypher\nMATCH (m) RETURN m;\n```") == "MATCH (m) RETURN m"
+    assert extract_statement("I'm here to help with Neo4j queries.") is None
+
+
+def test_schema_errors():
+    assert check_schema("MATCH (a:Actor {name: 'Tom Hanks, (Jr)'})-[r:ACTED_IN]->(m:Movie) RETURN r.role", SCHEMA) == []
+    assert check_schema("MATCH (a:Actor)-[:DIRECTED]->(m:Film) RETURN m.year, a.born", SCHEMA) == [
+        "Label 'Film' does not exist in the schema",
+        "Relationship type 'DIRECTED' does not exist in the schema",
+        "Property 'born' does not exist on variable 'a'",
+    ]
+    assert check_schema("MATCH (a:Actor)-[:ACTED_IN {role: role}]->(m:Movie) RETURN m.title", SCHEMA) == [
+        "Variable 'role' is not defined"
+    ]
+
+
+def test_invalid_statements_are_repaired(fake_graph):
+    class SchemaGraph(fake_graph):
+        @property
+        def get_structured_schema(self):
+            return SCHEMA
+
+    graph = SchemaGraph()
+    validator = CypherValidator(graph, llm=FakeListLLM(responses=["MATCH (m:Movie) RETURN m.title"]))
+    assert validator.validate("MATCH (m:Film) RETURN m.title", "movies?", "schema") == (
+        "MATCH (m:Movie) RETURN m.title", []
+    )
+    # Only the valid statement went to EXPLAIN
+    assert graph.queries == ["EXPLAIN MATCH (m:Movie) RETURN m.title"]
+
+    # Nothing to repair in an answer that is not a query
+    assert validator.validate("Hello!", "Hello", "schema") == (None, ["The answer does not contain a Cypher statement"])
+
+    graph = SchemaGraph(error=ValueError("Generated Cypher Statement is not valid\nInvalid input 'RETRUN'\n\"RETRUN\""))
+    assert CypherValidator(graph).validate("MATCH (m:Movie) RETURN m", "movies?", "schema") == (
+        "MATCH (m:Movie) RETURN m", ["Invalid input 'RETRUN'"]
+    )
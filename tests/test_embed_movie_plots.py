@@ -0,0 +1,67 @@
+import pytest
+
+from embed_movie_plots import WRITE_QUERY, Checkpoint, ingest
+
+
+class MovieGraphDriver:
+    # The Movie nodes of a graph in memory, for the read and write queries of ingest()
+    def __init__(self, plots):
+        self.movies = {movie_id: {"movieId": movie_id, "plot": plot} for movie_id, plot in plots.items()}
+        self.pages = []
+
+    def execute_query(self, query, batch_size=None, last_key=None, rows=None, **kwargs):
+        if query.lstrip().startswith("SHOW INDEXES"):
+            return [{"indexes": 1}], None, None
+        if query == WRITE_QUERY:
+            for row in rows:
+                self.movies[row["id"]].update(embedding=row["embedding"], plotEmbeddingHash=row["hash"])
+            return [], None, None
+        self.pages.append(last_key)
+        movies = sorted(self.movies.values(), key=lambda m: m["movieId"])
+        movies = [m for m in movies if last_key is None or m["movieId"] > last_key][:batch_size]
+        records = [
+            {"id": m["movieId"], "key": m["movieId"], "plot": m["plot"], "hash": m.get("plotEmbeddingHash"),
+             "embedded": "embedding" in m}
+            for m in movies
+        ]
+        return records, None, None
+
+
+class PlotEmbeddings:
+    def __init__(self, fail_on=None):
+        self.fail_on = fail_on
+        self.embedded = []
+
+    def embed_documents(self, texts):
+        if self.fail_on in texts:
+            raise RuntimeError("rate limited")
+        self.embedded += texts
+        return [[float(len(text))] for text in texts]
+
+
+def test_only_new_and_changed_plots_are_embedded():
+    driver = MovieGraphDriver({"1": "a robot", "2": "aliens", "3": "a heist"})
+    assert ingest(driver, PlotEmbeddings(), batch_size=2)["embedded"] == 3
+
+    driver.movies["2"]["plot"] = "aliens attack"
+    embeddings = PlotEmbeddings()
+    stats = ingest(driver, embeddings, batch_size=2)
+    assert (stats["embedded"], stats["skipped"]) == (1, 2)
+    assert embeddings.embedded == ["aliens attack"]
+    assert driver.movies["2"]["embedding"] == [13.0]
+
+
+def test_an_interrupted_run_resumes_after_the_last_batch(tmp_path):
+    driver = MovieGraphDriver({str(i): f"plot {i}" for i in range(1, 7)})
+    checkpoint = Checkpoint(str(tmp_path / "checkpoint.json"))
+    with pytest.raises(RuntimeError):
+        ingest(driver, PlotEmbeddings(fail_on="plot 5"), batch_size=2, checkpoint=checkpoint)
+    assert checkpoint.load("movieId") == "4"
+
+    driver.pages.clear()
+    embeddings = PlotEmbeddings()
+    ingest(driver, embeddings, batch_size=2, checkpoint=checkpoint)
+    assert embeddings.embedded == ["plot 5", "plot 6"]
+    assert driver.pages[0] == "4"
+    # Completed: the next run starts from the beginning
+    assert checkpoint.load("movieId") is None
@@ -0,0 +1,54 @@
+import os
+
+from langchain_core.embeddings import Embeddings
+
+from embedding_cache import CachedEmbeddings, MmapVectorStore
+
+
+class CountingEmbeddings(Embeddings):
+    # Records the texts sent to the provider
+    def __init__(self, embeddings):
+        self.embeddings = embeddings
+        self.calls = []
+
+    def embed_documents(self, texts):
+        self.calls.append(list(texts))
+        return self.embeddings.embed_documents(texts)
+
+    def embed_query(self, text):
+        self.calls.append([text])
+        return self.embeddings.embed_query(text)
+
+
+def test_only_missing_texts_reach_the_provider(word_embeddings, tmp_path):
+    provider = CountingEmbeddings(word_embeddings)
+    cache = CachedEmbeddings(provider, cache_dir=str(tmp_path), model="words")
+    cache.embed_query("tom hanks movies")
+    vectors = cache.embed_documents(["tom  hanks movies ", "tom cruise movies", "tom cruise movies"])
+    # One batch, with each missing text once
+    assert provider.calls == [["tom hanks movies"], ["tom cruise movies"]]
+    assert vectors == word_embeddings.embed_documents(["tom hanks movies", "tom cruise movies", "tom cruise movies"])
+
+    # Another process: everything comes from the disk
+    provider = CountingEmbeddings(word_embeddings)
+    assert CachedEmbeddings(provider, cache_dir=str(tmp_path), model="words").embed_query("tom cruise movies") == (
+        vectors[1]
+    )
+    assert provider.calls == []
+
+
+def test_a_torn_append_is_dropped(tmp_path):
+    store = MmapVectorStore(str(tmp_path))
+    store.add([("a", [1.0, 2.0]), ("b", [3.0, 4.0])])
+    # A crash in the middle of the next append: half a vector and half an index line
+    with open(store.vectors_path, "ab") as f:
+        f.write(b"\0" * 4)
+    with open(store.index_path, "a") as f:
+        f.write("c\t")
+
+    store = MmapVectorStore(str(tmp_path))
+    assert len(store) == 2
+    store.add([("c", [5.0, 6.0])])
+    assert [store.get(key) for key in "abc"] == [[1.0, 2.0], [3.0, 4.0], [5.0, 6.0]]
+    assert os.path.getsize(store.vectors_path) == 3 * 2 * 4
+    assert len(MmapVectorStore(str(tmp_path))) == 3
@@ -0,0 +1,36 @@
+from langchain_community.llms.fake import FakeListLLM
+
+from cypher_chain import CypherQAChain
+from intent_router import EntityIndex, IntentRouter
+
+INDEX = EntityIndex(actors=["Tom Hanks", "Keanu Reeves"], movies=["Matrix, The", "Toy Story", "Speed"])
+
+
+def test_templated_questions_are_routed_with_the_real_names():
+    router = IntentRouter(INDEX)
+    route = router.route("What role did tom hanks play in the movie Toy Story?")
+    assert (route.intent, route.params) == ("role_in_movie", {"actor": "Tom Hanks", "movie": "Toy Story"})
+    assert router.route("Who directed The Matrix").params == {"movie": "Matrix, The"}
+    assert router.route("Keanu Reeves's movies").intent == "movies_by_actor"
+    assert router.route("How many films has Tom Hanks acted in?").intent == "count_movies_by_actor"
+
+    # Unknown names and other shapes go to the LLM
+    assert router.route("Who directed Inception?") is None
+    assert router.route("Which movies are about robots?") is None
+    assert (router.hits, router.misses) == (4, 2)
+
+
+def test_routed_questions_skip_the_llm(fake_graph):
+    graph = fake_graph(rows=[{"director": "Lana Wachowski"}])
+    chain = CypherQAChain.from_llm(
+        FakeListLLM(responses=["Lana Wachowski"]),
+        # Generating a query would fail: there are no responses
+        cypher_llm=FakeListLLM(responses=[]),
+        graph=graph,
+        intent_router=IntentRouter(INDEX),
+        return_intermediate_steps=True,
+    )
+    result = chain.invoke({"query": "Who directed The Matrix?"})
+    assert result["result"] == "Lana Wachowski"
+    assert graph.queries == ["MATCH (d:Director)-[:DIRECTED]->(m:Movie {title: $movie})\nRETURN d.name AS director"]
+    assert result["intermediate_steps"][0]["params"] == {"movie": "Matrix, The"}
@@ -0,0 +1,74 @@
+import numpy as np
+
+from local_vector_search import LocalVectorIndex, LocalVectorStore, export
+
+
+class FakeMovieDriver:
+    # Answers the pages of embed_movie_plots.read_pages() from a list of Movie properties
+    def __init__(self, movies, indexed=True):
+        self.movies = movies
+        self.indexed = indexed
+        self.queries = []
+
+    def execute_query(self, query, batch_size=None, last_key=None, **kwargs):
+        self.queries.append(query)
+        if query.lstrip().startswith("SHOW INDEXES"):
+            return [{"indexes": int(self.indexed)}], None, None
+        if query.startswith("CREATE"):
+            self.indexed = True
+            return [], None, None
+        movies = sorted(
+            (m for m in self.movies if m.get("movieId") is not None and m.get("embedding") is not None),
+            key=lambda m: m["movieId"],
+        )
+        if last_key is not None:
+            movies = [m for m in movies if m["movieId"] > last_key]
+        records = [
+            {
+                "id": f"4:db:{m['movieId']}", "key": m["movieId"], "plot": m["plot"], "embedding": m["embedding"],
+                "metadata": {**m, "embedding": None, "plot": None},
+            }
+            for m in movies[:batch_size]
+        ]
+        return records, None, None
+
+
+def test_export_pages_on_the_indexed_key(tmp_path):
+    movies = [
+        {"movieId": str(i), "title": f"Movie {i}", "plot": f"plot {i}", "embedding": [float(i), 1.0]}
+        for i in range(1, 6)
+    ] + [{"movieId": "9", "title": "No embedding", "plot": "plot"}]
+    driver = FakeMovieDriver(movies, indexed=False)
+
+    assert export(driver, str(tmp_path), batch_size=2) == 5
+
+    pages = [query for query in driver.queries if "MATCH (m:Movie)" in query]
+    # 3 pages of 2, 2 and 1 movies, then an empty one
+    assert len(pages) == 4
+    assert all("ORDER BY m.`movieId`" in query and "elementId(m) >" not in query for query in pages)
+    assert "m.`movieId` > $last_key" in pages[1]
+    assert any("CREATE RANGE INDEX" in query for query in driver.queries)
+
+    index = LocalVectorIndex.load(str(tmp_path))
+    assert [metadata["title"] for metadata in index.metadatas] == [f"Movie {i}" for i in range(1, 6)]
+    assert np.allclose(np.linalg.norm(index.vectors, axis=1), 1)
+
+
+class FixedEmbeddings:
+    def embed_query(self, text):
+        return [1.0, 0.0]
+
+
+def test_documents_have_the_metadata_of_neo4j_vector(tmp_path):
+    movies = [{"movieId": "1", "id": "tt1", "title": "Alien", "plot": "aliens", "embedding": [1.0, 0.0]}]
+    driver = FakeMovieDriver(movies)
+    export(driver, str(tmp_path))
+    # Like Neo4jVector, no text, embedding nor id
+    assert "id: Null" in [query for query in driver.queries if "MATCH (m:Movie)" in query][0]
+
+    # An export made before, with the id
+    index = LocalVectorIndex(np.asarray([[1.0, 0.0]], dtype=np.float32), ["aliens"], [{"id": "tt1", "title": "Alien"}])
+    [(document, score)] = LocalVectorStore(index, FixedEmbeddings()).similarity_search_with_score("aliens", k=1)
+    assert document.page_content == "aliens"
+    assert document.metadata == {"title": "Alien"}
+    assert score == 1
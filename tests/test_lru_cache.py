@@ -0,0 +1,30 @@
+from lru_cache import LRUTTLCache
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def test_contains_does_not_count_or_reorder():
+    cache = LRUTTLCache(maxsize=2, ttl=None)
+    cache.set("a", 1)
+    cache.set("b", 2)
+    assert "a" in cache and "missing" not in cache
+    assert cache.stats.hits == cache.stats.misses == 0
+    # "a" is still the least recently used: it's the one evicted
+    cache.set("c", 3)
+    assert "a" not in cache and "b" in cache
+
+
+def test_contains_is_false_for_expired_entries():
+    clock = FakeClock()
+    cache = LRUTTLCache(ttl=10, clock=clock)
+    cache.set("a", 1)
+    assert "a" in cache
+    clock.now = 10
+    assert "a" not in cache
+    assert cache.stats.expirations == 0
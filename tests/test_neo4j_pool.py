@@ -0,0 +1,29 @@
+import pytest
+from neo4j import READ_ACCESS, WRITE_ACCESS
+from neo4j.exceptions import CypherSyntaxError
+
+from neo4j_pool import SharedNeo4jGraph
+
+
+class FakePool:
+    def __init__(self, driver):
+        self.driver = driver
+        self.database = "neo4j"
+
+
+def test_graph_writes_by_default_and_reads_on_request(fake_driver):
+    driver = fake_driver(rows=[{"title": "Heat"}])
+    assert SharedNeo4jGraph(FakePool(driver)).query("MATCH (m) RETURN m.title AS title") == [{"title": "Heat"}]
+    SharedNeo4jGraph(FakePool(driver), access_mode=READ_ACCESS).query("MATCH (m) RETURN m")
+    assert driver.sessions == [
+        {"database": "neo4j", "default_access_mode": WRITE_ACCESS},
+        {"database": "neo4j", "default_access_mode": READ_ACCESS},
+    ]
+
+
+def test_graph_queries_behave_like_neo4j_graph(fake_driver):
+    graph = SharedNeo4jGraph(FakePool(fake_driver(error=CypherSyntaxError("Invalid input"))))
+    with pytest.raises(ValueError, match="Generated Cypher Statement is not valid"):
+        graph.query("MATCH (m) RETRUN m")
+    graph = SharedNeo4jGraph(FakePool(fake_driver(rows=[{"embedding": [0.1] * 200, "title": "Heat"}])), sanitize=True)
+    assert graph.query("MATCH (m) RETURN m") == [{"title": "Heat"}]
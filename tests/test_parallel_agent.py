@@ -0,0 +1,41 @@
+import threading
+
+from langchain.tools import Tool
+from langchain_community.llms.fake import FakeListLLM
+from langchain_core.prompts import PromptTemplate
+
+from parallel_agent import MultiActionReActParser, ParallelAgentExecutor, create_parallel_react_agent
+
+TWO_LOOKUPS = """Thought: Do I need to use a tool? Yes
+Action: Plot
+Action Input: "Alien"
+Action: Plot
+Action Input: Heat"""
+
+PROMPT = PromptTemplate.from_template("Tools: {tools} ({tool_names})\nBegin!\nQuestion: {input}\n{agent_scratchpad}")
+
+
+def test_several_actions_are_parsed_in_order():
+    actions = MultiActionReActParser().parse(TWO_LOOKUPS)
+    assert [(action.tool, action.tool_input) for action in actions] == [("Plot", "Alien"), ("Plot", "Heat")]
+    # A single action is parsed as before
+    assert MultiActionReActParser().parse("Action: Plot\nAction Input: Alien").tool_input == "Alien"
+
+
+def test_actions_of_a_step_run_concurrently():
+    # Both lookups must be running at the same time to get through the barrier
+    barrier = threading.Barrier(2, timeout=5)
+
+    def plot(title):
+        barrier.wait()
+        return f"the plot of {title}"
+
+    tools = [Tool(name="Plot", func=plot, description="The plot of a movie")]
+    llm = FakeListLLM(responses=[TWO_LOOKUPS, "Final Answer: both"])
+    executor = ParallelAgentExecutor(
+        agent=create_parallel_react_agent(llm, tools, PROMPT), tools=tools, return_intermediate_steps=True,
+    )
+    result = executor.invoke({"input": "Compare Alien and Heat"})
+    assert result["output"] == "both"
+    # Observations in the order of the actions
+    assert [observation for _, observation in result["intermediate_steps"]] == ["the plot of Alien", "the plot of Heat"]
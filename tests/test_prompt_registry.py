@@ -0,0 +1,27 @@
+import pytest
+from langchain_core.prompts import PromptTemplate
+
+from prompt_registry import PROMPT_REGISTRY_DIR, PromptRegistry
+
+
+def test_vendored_prompt_loads_offline():
+    prompt = PromptRegistry(PROMPT_REGISTRY_DIR, offline=True).load("hwchase17/react-chat")
+    assert {"tools", "tool_names", "input", "chat_history", "agent_scratchpad"} <= set(prompt.input_variables)
+
+
+def test_versions_are_kept_and_checked(tmp_path):
+    registry = PromptRegistry(str(tmp_path), offline=True)
+    first = registry.store("me/qa", PromptTemplate.from_template("Answer {question}"))
+    second = registry.store("me/qa", PromptTemplate.from_template("Answer briefly {question}"))
+    assert registry.load("me/qa").template == "Answer briefly {question}"
+    # The old version can still be pinned
+    assert registry.load("me/qa", version=first).template == "Answer {question}"
+    assert set(registry.versions("me/qa")) == {first, second}
+
+    with open(registry._path("me/qa", second), "a") as f:
+        f.write(" ")
+    with pytest.raises(ValueError, match="was modified"):
+        registry.load("me/qa")
+    # Never pulled, and no hub request allowed
+    with pytest.raises(RuntimeError, match="PROMPT_REGISTRY_OFFLINE"):
+        registry.load("me/other")
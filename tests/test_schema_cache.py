@@ -0,0 +1,61 @@
+from schema_cache import compact_schema, load_graph
+
+MOVIE_SCHEMA = {
+    "node_props": {
+        "Movie": [{"property": "title", "type": "STRING"}, {"property": "imdbRating", "type": "FLOAT"}],
+        "Actor": [{"property": "name", "type": "STRING"}],
+        "Director": [{"property": "name", "type": "STRING"}],
+        "Genre": [{"property": "name", "type": "STRING"}],
+        "User": [{"property": "userId", "type": "STRING"}],
+    },
+    "rel_props": {
+        "ACTED_IN": [{"property": "role", "type": "STRING"}],
+        "RATED": [{"property": "rating", "type": "FLOAT"}],
+    },
+    "relationships": [
+        {"start": "Actor", "type": "ACTED_IN", "end": "Movie"},
+        {"start": "Director", "type": "DIRECTED", "end": "Movie"},
+        {"start": "Movie", "type": "IN_GENRE", "end": "Genre"},
+        {"start": "User", "type": "RATED", "end": "Movie"},
+    ],
+}
+
+
+def test_compact_schema_keeps_what_the_question_is_about():
+    schema = compact_schema(MOVIE_SCHEMA, "Who directed The Matrix?")
+    assert "(:Director)-[:DIRECTED]->(:Movie)" in schema
+    assert "Genre" not in schema and "RATED" not in schema
+
+    # Through a property of the relationship
+    schema = compact_schema(MOVIE_SCHEMA, "What role did Tom Hanks play?")
+    assert "ACTED_IN {role: STRING}" in schema and "DIRECTED" not in schema
+
+    # Nothing recognizable: the whole schema
+    assert "(:User)-[:RATED]->(:Movie)" in compact_schema(MOVIE_SCHEMA, "Hello there")
+
+
+def test_the_snapshot_is_used_until_the_graph_changes(fake_graph, tmp_path):
+    class IntrospectedGraph(fake_graph):
+        refreshes = 0
+
+        def refresh_schema(self):
+            IntrospectedGraph.refreshes += 1
+            self.structured_schema = MOVIE_SCHEMA
+            self.schema = "schema"
+
+    class Pool:
+        def __init__(self, labels):
+            self.labels = labels
+
+        def graph(self, **kwargs):
+            return IntrospectedGraph(rows=[{"labels": self.labels, "types": ["ACTED_IN"], "keys": ["title"]}])
+
+    path = str(tmp_path / "schema.json")
+    load_graph(path=path, pool=Pool(["Movie", "Actor"]))
+    # Same labels, in another order
+    graph = load_graph(path=path, pool=Pool(["Actor", "Movie"]))
+    assert IntrospectedGraph.refreshes == 1
+    assert (graph.structured_schema, graph.schema) == (MOVIE_SCHEMA, "schema")
+
+    load_graph(path=path, pool=Pool(["Movie", "Actor", "Genre"]))
+    assert IntrospectedGraph.refreshes == 2
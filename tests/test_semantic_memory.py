@@ -0,0 +1,39 @@
+from langchain_community.llms.fake import FakeListLLM
+from langchain_core.chat_history import InMemoryChatMessageHistory
+from langchain_core.embeddings import Embeddings
+
+from semantic_memory import SemanticHistoryMemory
+
+
+class TopicEmbeddings(Embeddings):
+    TOPICS = ["tatooine", "yoda", "falcon"]
+
+    def embed_documents(self, texts):
+        return [self.embed_query(text) for text in texts]
+
+    def embed_query(self, text):
+        return [float(topic in text.lower()) for topic in self.TOPICS]
+
+
+def test_exchanges_that_left_the_window_are_recalled():
+    memory = SemanticHistoryMemory(
+        llm=FakeListLLM(responses=["summary"] * 10),
+        embeddings=TopicEmbeddings(),
+        chat_memory=InMemoryChatMessageHistory(),
+        max_token_limit=12,
+        k=1,
+        background=False,
+        return_messages=True,
+        input_key="input",
+    )
+    for question, answer in [("Where is Tatooine?", "Outer Rim"), ("Who is Yoda?", "A Jedi master"),
+                             ("What is the Falcon?", "A ship")]:
+        memory.save_context({"input": question + " " + "word " * 10}, {"output": answer})
+    # The history is trimmed from the front: what was indexed stays indexed, nothing is indexed twice
+    del memory.chat_memory.messages[:2]
+    memory.save_context({"input": "And the Death Star? " + "word " * 10}, {"output": "A battle station"})
+
+    assert len(memory._index.texts) == 3
+    prompt = memory.load_memory_variables({"input": "tell me about tatooine"})["history"]
+    recalled = [message.content for message in prompt if message.content.startswith(memory.relevant_prefix)]
+    assert len(recalled) == 1 and "Outer Rim" in recalled[0]
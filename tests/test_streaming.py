@@ -0,0 +1,42 @@
+import io
+
+from langchain.tools import Tool
+from langchain_community.llms.fake import FakeStreamingListLLM
+from langchain_core.prompts import PromptTemplate
+
+from parallel_agent import ParallelAgentExecutor, create_parallel_react_agent
+from streaming import StreamingPrinter
+
+PROMPT = PromptTemplate.from_template("Tools: {tools} ({tool_names})\nBegin!\nQuestion: {input}\n{agent_scratchpad}")
+
+
+def run_agent(printer):
+    tools = [Tool(name="Plot", func=lambda title: f"the plot of {title}", description="The plot of a movie")]
+    llm = FakeStreamingListLLM(responses=[
+        "Thought: Do I need to use a tool? Yes\nAction: Plot\nAction Input: Alien",
+        "Thought: Do I need to use a tool? No\nFinal Answer: Aliens attack a spaceship.",
+    ])
+    agent = ParallelAgentExecutor(agent=create_parallel_react_agent(llm, tools, PROMPT), tools=tools)
+    printer.start()
+    result = agent.invoke({"input": "What is Alien about?"}, config={"callbacks": [printer]})
+    printer.finish(result["output"])
+
+
+def test_only_the_final_answer_and_the_tool_calls_are_printed():
+    out = io.StringIO()
+    printer = StreamingPrinter(answer_prefix="Final Answer:", enabled=True, show_timing=False, file=out)
+    run_agent(printer)
+    lines = out.getvalue().splitlines()
+    assert lines[0] == "[Plot] Alien"
+    assert lines[1].startswith("[Plot done in ")
+    assert lines[2:] == ["Aliens attack a spaceship."]
+    assert printer.streamed and printer.time_to_first_token is not None
+
+
+def test_answer_is_printed_at_the_end_without_streaming():
+    out = io.StringIO()
+    printer = StreamingPrinter(answer_prefix="Final Answer:", enabled=False, file=out)
+    run_agent(printer)
+    lines = out.getvalue().splitlines()
+    assert lines[0] == "Aliens attack a spaceship."
+    assert lines[1].startswith("(first token after ")
@@ -0,0 +1,63 @@
+from langchain_community.llms.fake import FakeListLLM
+from langchain_core.chat_history import InMemoryChatMessageHistory
+from langchain_core.messages import AIMessage, HumanMessage
+
+from summary_memory import RollingSummaryMemory
+
+
+class RecordingLLM(FakeListLLM):
+    # Answers "summary N" and keeps the new lines of every summary request
+    new_lines: list = []
+
+    def _call(self, prompt, stop=None, run_manager=None, **kwargs):
+        self.new_lines.append(prompt.split("New lines of conversation:")[-1].split("New summary:")[0].strip())
+        return f"summary {len(self.new_lines)}"
+
+
+def make_memory(history=None):
+    return RollingSummaryMemory(
+        llm=RecordingLLM(responses=[""], new_lines=[]),
+        chat_memory=history or InMemoryChatMessageHistory(),
+        # About one exchange of the test
+        max_token_limit=12,
+        background=False,
+        return_messages=True,
+    )
+
+
+def say(memory, i):
+    memory.save_context({"input": f"question {i} " + "word " * 10}, {"output": f"answer {i}"})
+
+
+def test_old_exchanges_are_summarized_once():
+    memory = make_memory()
+    for i in range(4):
+        say(memory, i)
+
+    assert memory.window() == memory.chat_memory.messages[-2:]
+    assert memory.summary == "summary 3"
+    # Every exchange is summarized once, in order
+    assert ["question 0" in lines and "answer 0" in lines for lines in memory.llm.new_lines] == [True, False, False]
+    assert "question 2" in memory.llm.new_lines[-1]
+    prompt = memory.load_memory_variables({})["history"]
+    assert prompt[0].content.endswith("summary 3") and prompt[1:] == memory.window()
+
+
+def test_progress_survives_a_history_that_is_not_append_only():
+    memory = make_memory()
+    for i in range(3):
+        say(memory, i)
+    history = memory.chat_memory
+    # The history keeps only a window of the conversation (the first exchange is gone),
+    # and another process added an exchange
+    del history.messages[:2]
+    history.add_messages([HumanMessage(content="from another process"), AIMessage(content="its answer")])
+
+    assert [message.content for message in memory.window()][-2:] == ["from another process", "its answer"]
+    assert "answer 2" in [message.content for message in memory.window()]
+    say(memory, 3)
+    # Nothing is summarized twice: exchange 2 and the one of the other process only
+    summarized = "\n".join(memory.llm.new_lines)
+    assert summarized.count("question 0") == summarized.count("question 1") == 1
+    assert "question 2" in memory.llm.new_lines[-1] or "question 2" in memory.llm.new_lines[-2]
+    assert "from another process" in summarized
@@ -0,0 +1,39 @@
+import sqlite3
+import threading
+
+import pytest
+
+from swapi_cache import SqliteCache
+from swapi_client import SwapiClient, build_cache
+
+
+def test_close_closes_the_connection_of_every_thread(tmp_path):
+    cache = SqliteCache(str(tmp_path / "cache.sqlite3"))
+    cache.set("key", {"name": "Luke"})
+    connections = []
+
+    def worker():
+        assert cache.get("key") == {"name": "Luke"}
+        connections.append(cache._connection())
+
+    thread = threading.Thread(target=worker)
+    thread.start()
+    thread.join()
+    connections.append(cache._connection())
+    assert len(cache._connections) == 2
+
+    cache.close()
+    assert cache._connections == []
+    for conn in connections:
+        with pytest.raises(sqlite3.ProgrammingError):
+            conn.execute("SELECT 1")
+    # Still usable, with a new connection
+    assert cache.get("key") == {"name": "Luke"}
+    cache.close()
+
+
+def test_client_closes_its_cache(tmp_path):
+    client = SwapiClient(cache=build_cache(path=str(tmp_path / "cache.sqlite3")))
+    disk = client.cache.disk
+    client.close()
+    assert disk._connections == []
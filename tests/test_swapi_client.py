@@ -0,0 +1,54 @@
+import json
+
+import pytest
+import requests
+
+from swapi_client import SwapiClient, hydrate, iter_pages
+from swapi_stub import SwapiStubServer
+from swapi_tools import collect_search
+
+
+@pytest.fixture
+def stub():
+    with SwapiStubServer(handshake_delay=0) as server:
+        yield server
+
+
+def test_requests_reuse_one_kept_alive_connection(stub):
+    with SwapiClient(base_url=stub.base_url, retries=0) as client:
+        for i in range(1, 6):
+            assert client.get_json(client.resource_url("people") + f"{i}/")["url"].endswith(f"/people/{i}/")
+        pools = client.session.get_adapter(stub.base_url).poolmanager.pools
+        assert [pools[key].num_connections for key in pools.keys()] == [1]
+        with pytest.raises(requests.HTTPError):
+            client.get_json(client.resource_url("people") + "999/")
+    assert stub.request_count == 6
+
+
+def test_hydrate_fetches_each_url_once_and_groups_by_resource(stub):
+    base = stub.base_url
+    urls = [f"{base}people/1/", f"{base}planets/1/", f"{base}people/1/", f"{base}people/2/", f"{base}people/999/"]
+    with SwapiClient(base_url=base, retries=0) as client:
+        merged = json.loads(hydrate(urls, client=client))
+    assert [person["name"] for person in merged["people"]] == ["Luke Skywalker", "C-3PO"]
+    assert [planet["name"] for planet in merged["planets"]] == ["Tatooine"]
+    # The failed url is reported, the others are still returned
+    assert list(merged["errors"]) == [f"{base}people/999/"]
+    assert stub.request_count == 4
+
+
+def test_search_pages_stop_at_the_limit(stub):
+    # 16 people, 2 pages of 10
+    with SwapiClient(base_url=stub.base_url, retries=0) as client:
+        pages = list(iter_pages(client.resource_url("people"), client=client))
+        assert [len(page["results"]) for page in pages] == [10, 6]
+        assert stub.request_count == 2
+
+        # The first page is enough: the second one is not even prefetched
+        search = collect_search(client, "people", "", limit=5)
+        assert (search["count"], len(search["results"])) == (16, 5)
+        assert stub.request_count == 3
+
+        search = collect_search(client, "people", "", limit=12)
+        assert len(search["results"]) == 12
+        assert stub.request_count == 5
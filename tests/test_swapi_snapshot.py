@@ -0,0 +1,30 @@
+import pytest
+
+from swapi_snapshot import SnapshotNotFound, SwapiSnapshot
+
+
+def person(i, name):
+    return {"name": name, "url": f"https://swapi.dev/api/people/{i}/"}
+
+
+SNAPSHOT = SwapiSnapshot({"people": [person(i, f"Clone {i}") for i in range(1, 13)] + [person(13, "Luke Skywalker")]})
+
+
+def test_search_is_a_case_insensitive_contains_in_id_order():
+    assert [r["name"] for r in SNAPSHOT.search_records("people", "SKYWALKER")] == ["Luke Skywalker"]
+    assert [r["name"] for r in SNAPSHOT.search_records("people", "clone 1")] == ["Clone 1", "Clone 10", "Clone 11",
+                                                                                 "Clone 12"]
+
+
+def test_pages_look_like_the_live_api():
+    first = SNAPSHOT.page("people", "clone")
+    assert first["count"] == 12 and len(first["results"]) == 10 and first["next"]
+    assert len(SNAPSHOT.page("people", "clone", page=2)["results"]) == 2
+    with pytest.raises(SnapshotNotFound):
+        SNAPSHOT.page("people", "clone", page=3)
+
+
+def test_records_resolve_by_path():
+    assert SNAPSHOT.get_record("http://swapi.dev/api/people/13")["name"] == "Luke Skywalker"
+    with pytest.raises(SnapshotNotFound):
+        SNAPSHOT.get_record("https://swapi.dev/api/people/99/")
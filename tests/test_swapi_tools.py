@@ -0,0 +1,68 @@
+import json
+
+import requests
+
+from swapi_snapshot import SnapshotNotFound
+from swapi_tools import RESOURCE_SPECS, describe, make_resource_func
+
+LUKE = {"name": "Luke Skywalker", "url": "https://swapi.dev/api/people/1/", "height": "172", "mass": "77",
+        "homeworld": "https://swapi.dev/api/planets/1/", "created": "2014-12-09"}
+
+
+class FakeSwapi:
+    def __init__(self, records=(), error=None):
+        self.records = list(records)
+        self.error = error
+        self.calls = []
+
+    def resource_url(self, resource):
+        return f"https://swapi.dev/api/{resource}/"
+
+    def get_json(self, url, params=None):
+        self.calls.append((url, params))
+        if self.error:
+            raise self.error
+        if params and "search" in params:
+            results = [r for r in self.records if params["search"].lower() in r["name"].lower()]
+            return {"count": len(results), "next": None, "results": results}
+        for record in self.records:
+            if record["url"] == url:
+                return record
+        raise SnapshotNotFound(url)
+
+
+def http_error(status):
+    response = requests.Response()
+    response.status_code = status
+    return requests.HTTPError(f"{status} error", response=response)
+
+
+def test_search_returns_the_requested_attributes():
+    run = make_resource_func("people", client=FakeSwapi([LUKE]))
+    assert json.loads(run(",Luke,height")) == {
+        "count": 1, "results": [{"name": "Luke Skywalker", "url": LUKE["url"], "height": "172"}],
+    }
+
+
+def test_bad_inputs_are_observations():
+    run = make_resource_func("people", client=FakeSwapi([LUKE]))
+    assert run(",,height").startswith("Invalid input:")
+    assert run(",Luke,limit=abc").startswith("Invalid input:")
+    assert run(",Luke,wingspan").startswith("Invalid input:")
+
+
+def test_failed_lookups_are_observations():
+    assert make_resource_func("people", client=FakeSwapi([LUKE]))("https://swapi.dev/api/people/999/,") == (
+        "Not found: https://swapi.dev/api/people/999/"
+    )
+    assert make_resource_func("people", client=FakeSwapi(error=http_error(404)))(",Yoda") == "Not found: Yoda"
+    assert make_resource_func("people", client=FakeSwapi(error=http_error(503)))(",Yoda").startswith("SWAPI error:")
+    timeout = requests.ConnectionError("connection refused")
+    assert make_resource_func("people", client=FakeSwapi(error=timeout))(",Yoda").startswith("SWAPI error:")
+
+
+def test_every_tool_has_its_own_example():
+    for resource, spec in RESOURCE_SPECS.items():
+        value, fields = spec["example"]
+        assert all(field in spec["attributes"] for field in fields)
+        assert f'",{",".join([value, *fields])}"' in describe(resource)
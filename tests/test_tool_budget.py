@@ -0,0 +1,21 @@
+from langchain.tools import Tool
+
+from tool_budget import ObservationBudget
+
+
+def long_output(query):
+    return "word " * 2000
+
+
+def test_observations_are_capped():
+    tool = ObservationBudget(max_tokens=100).wrap(Tool.from_function(name="Search", description="d", func=long_output))
+    assert tool.name == "Search"
+    assert len(tool.run("x")) < len(long_output("x")) / 5
+
+
+def test_return_direct_tools_are_not_wrapped():
+    tool = Tool.from_function(name="Chat", description="d", func=long_output, return_direct=True)
+    budget = ObservationBudget(max_tokens=100)
+    assert budget.wrap_all([tool]) == [tool]
+    assert tool.run("x") == long_output("x")
+    assert budget.stats.calls == 0
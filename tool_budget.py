@@ -0,0 +1,196 @@
+import json
+import logging
+import threading
+
+from langchain.tools import Tool
+
+# Token budget for tool observations
+#
+# Whatever a tool returns is appended to the agent scratchpad, and the scratchpad is sent to the LLM
+# at every following iteration of the AgentExecutor. A single SWAPI search page or a few movie plots
+# can make every later step slower and more expensive.
+# ObservationBudget wraps a tool and shrinks its output until it fits in `max_tokens`, trying
+# strategies from the least to the most destructive:
+# 1. prune_fields: drops noisy JSON fields (timestamps, opening crawls...) and shortens long strings
+# 2. top_k: keeps only the first items of a list (a JSON "results" list, or the lines of a text)
+# 3. head_tail: keeps the beginning and the end of the text, cutting the middle
+# The tokens saved by each call are logged and accumulated in `stats`
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_MAX_TOKENS = 1000
+NOISY_FIELDS = ("created", "edited", "opening_crawl")
+
+
+def _load_encoder(model="gpt-3.5-turbo"):
+    # tiktoken comes with langchain_openai. If it's missing, ~4 characters per token is good enough for a budget
+    try:
+        import tiktoken
+        return tiktoken.encoding_for_model(model)
+    except Exception:
+        return None
+
+
+class TokenCounter:
+    def __init__(self, model="gpt-3.5-turbo"):
+        self.encoder = _load_encoder(model)
+
+    def __call__(self, text):
+        if self.encoder is None:
+            return (len(text) + 3) // 4
+        return len(self.encoder.encode(text))
+
+    def head_tail(self, text, max_tokens):
+        if self.encoder is None:
+            tokens = list(text)
+            per_token = 4
+        else:
+            tokens = self.encoder.encode(text)
+            per_token = 1
+        # Leave some room for the "[N tokens truncated]" marker
+        limit = max(max_tokens - 12, 1) * per_token
+        if len(tokens) <= limit:
+            return text
+
+        head = (limit * 2) // 3
+        tail = limit - head
+        join = "".join if self.encoder is None else self.encoder.decode
+        dropped = (len(tokens) - limit) // per_token
+        return join(tokens[:head]) + f"\n...[{dropped} tokens truncated]...\n" + join(tokens[-tail:])
+
+
+def _dump(data):
+    return json.dumps(data, separators=(",", ":"))
+
+
+# Strategies: (text, max_tokens, count) -> text. They return the text unchanged when they don't apply
+
+def prune_fields(text, max_tokens, count, fields=NOISY_FIELDS, max_string_chars=300):
+    try:
+        data = json.loads(text)
+    except ValueError:
+        return text
+
+    def prune(value):
+        if isinstance(value, dict):
+            return {key: prune(item) for key, item in value.items() if key not in fields}
+        if isinstance(value, list):
+            return [prune(item) for item in value]
+        if isinstance(value, str) and len(value) > max_string_chars:
+            return value[:max_string_chars] + "..."
+        return value
+
+    return _dump(prune(data))
+
+
+def top_k(text, max_tokens, count):
+    try:
+        data = json.loads(text)
+    except ValueError:
+        data = None
+
+    if isinstance(data, (dict, list)):
+        items = data.get("results") if isinstance(data, dict) else data
+        if not isinstance(items, list) or len(items) <= 1:
+            return text
+
+        def render(k):
+            kept = items[:k]
+            if isinstance(data, dict):
+                return _dump({**data, "results": kept, "omitted_results": len(items) - k})
+            return _dump(kept + [f"...{len(items) - k} more items omitted"])
+    else:
+        # Plain text, like the retriever output: one item per line
+        items = [line for line in text.splitlines() if line.strip()]
+        if len(items) <= 1:
+            return text
+
+        def render(k):
+            return "\n".join(items[:k]) + f"\n...{len(items) - k} more results omitted"
+
+    # Halve k until it fits, keeping at least one item
+    k = len(items)
+    while k > 1:
+        k //= 2
+        candidate = render(k)
+        if count(candidate) <= max_tokens:
+            return candidate
+    return render(1)
+
+
+def head_tail(text, max_tokens, count):
+    return count.head_tail(text, max_tokens)
+
+
+DEFAULT_STRATEGIES = (prune_fields, top_k, head_tail)
+
+
+class BudgetStats:
+    def __init__(self):
+        self.calls = 0
+        self.truncated_calls = 0
+        self.tokens_in = 0
+        self.tokens_out = 0
+
+    @property
+    def tokens_saved(self):
+        return self.tokens_in - self.tokens_out
+
+    def __repr__(self):
+        return (f"BudgetStats(calls={self.calls}, truncated_calls={self.truncated_calls}, "
+                f"tokens_in={self.tokens_in}, tokens_out={self.tokens_out}, tokens_saved={self.tokens_saved})")
+
+
+class ObservationBudget:
+    def __init__(self, max_tokens=DEFAULT_MAX_TOKENS, strategies=DEFAULT_STRATEGIES, counter=None, verbose=False):
+        self.max_tokens = max_tokens
+        self.strategies = strategies
+        self.count = counter or TokenCounter()
+        self.verbose = verbose
+        self.stats = BudgetStats()
+        # Tools of the same agent step can run at the same time (see parallel_agent.py)
+        self._lock = threading.Lock()
+
+    def apply(self, text, max_tokens=None):
+        max_tokens = max_tokens or self.max_tokens
+        text = text if isinstance(text, str) else str(text)
+        tokens_in = self.count(text)
+        tokens_out = tokens_in
+
+        for strategy in self.strategies:
+            if tokens_out <= max_tokens:
+                break
+            text = strategy(text, max_tokens, self.count)
+            tokens_out = self.count(text)
+
+        with self._lock:
+            self.stats.calls += 1
+            self.stats.tokens_in += tokens_in
+            self.stats.tokens_out += tokens_out
+            if tokens_out < tokens_in:
+                self.stats.truncated_calls += 1
+        return text, tokens_in, tokens_out
+
+    def wrap(self, tool, max_tokens=None):
+        # Returns a new Tool with the same name and description, whose output fits the budget.
+        # A return_direct tool is returned as it is: its output is the final answer, not an observation
+        if tool.return_direct:
+            return tool
+        run = tool.func if getattr(tool, "func", None) else tool.run
+
+        def budgeted(*args, **kwargs):
+            text, tokens_in, tokens_out = self.apply(run(*args, **kwargs), max_tokens)
+            message = f"{tool.name}: observation {tokens_in} -> {tokens_out} tokens (saved {tokens_in - tokens_out})"
+            logger.info(message)
+            if self.verbose:
+                print(message)
+            return text
+
+        return Tool.from_function(
+            name=tool.name,
+            description=tool.description,
+            func=budgeted,
+        )
+
+    def wrap_all(self, tools, max_tokens=None):
+        return [self.wrap(tool, max_tokens) for tool in tools]